@@ -0,0 +1 @@
+"""Logika backend Absensi QR (tanpa UI Streamlit)."""
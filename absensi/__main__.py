@@ -0,0 +1,5 @@
+import sys
+
+from absensi.cli import main
+
+sys.exit(main())
@@ -0,0 +1,88 @@
+from typing import Dict, List, Optional, Tuple
+
+from absensi.roster import Roster, phone_key
+
+NO_POS_LABEL = "Tanpa Posisi"
+
+
+class AbsenteeTracker:
+    """
+    "Belum hadir" = roster dikurangi orang hadir hari ini (cocok lewat No HP
+    kanonik, lalu nama). Di-update inkremental: ``all_people`` rekap hanya
+    bertambah di belakang, jadi tiap ``update`` cukup memproses orang baru.
+    Jumlah per posisi memakai posisi dari roster.
+    """
+
+    def __init__(self, roster: Roster, day: str):
+        self.roster = roster
+        self.day = day
+        self._reset()
+
+    def _reset(self):
+        self.pending = set(range(len(self.roster)))
+        self.seen = 0
+        self.unmatched = 0  # hadir tapi tidak ada di roster
+        self.roster_by_pos: Dict[str, int] = {}
+        self.absent_by_pos: Dict[str, int] = {}
+        for e in self.roster.entries:
+            pos = e["Posisi"] or NO_POS_LABEL
+            self.roster_by_pos[pos] = self.roster_by_pos.get(pos, 0) + 1
+        self.absent_by_pos = dict(self.roster_by_pos)
+
+    def _match(self, person: Dict) -> Optional[int]:
+        hp = str(person.get("No HP/WA", "")).strip()
+        if hp and hp != "-":
+            idx = self.roster.by_phone.get(phone_key(hp))
+            if idx is not None:
+                return idx
+        # nama kembar di roster -> ambil yang belum tercatat hadir
+        ids = self.roster.by_name.get(str(person.get("Nama", "")).lower(), [])
+        return next((i for i in ids if i in self.pending), ids[0] if ids else None)
+
+    def update(self, people: List[Dict]):
+        if len(people) < self.seen:
+            # rekap dibangun ulang (resync penuh) -> hitung ulang dari awal
+            self._reset()
+        for p in people[self.seen:]:
+            idx = self._match(p)
+            if idx is None:
+                self.unmatched += 1
+            elif idx in self.pending:
+                self.pending.discard(idx)
+                pos = self.roster.entries[idx]["Posisi"] or NO_POS_LABEL
+                self.absent_by_pos[pos] -= 1
+        self.seen = len(people)
+
+    def summary(self) -> Dict:
+        by_pos = [
+            {
+                "Posisi": pos,
+                "Roster": n,
+                "Hadir": n - self.absent_by_pos[pos],
+                "Belum Hadir": self.absent_by_pos[pos],
+            }
+            for pos, n in self.roster_by_pos.items()
+        ]
+        by_pos.sort(key=lambda x: (-x["Belum Hadir"], x["Posisi"].lower()))
+        absent = [self.roster.entries[i] for i in sorted(self.pending)]
+        absent.sort(key=lambda e: ((e["Posisi"] or NO_POS_LABEL).lower(), e["Nama"].lower()))
+        return {
+            "today": self.day,
+            "roster_total": len(self.roster),
+            "present": len(self.roster) - len(self.pending),
+            "absent": len(self.pending),
+            "unmatched": self.unmatched,
+            "by_pos": by_pos,
+            "absent_people": [
+                {"Nama": e["Nama"], "No HP/WA": e["No HP/WA"] or "-", "Posisi": e["Posisi"] or "-"}
+                for e in absent
+            ],
+        }
+
+
+def build_export_absentees(summary: Dict) -> Tuple[List[str], List[List[str]]]:
+    header = ["No", "Nama", "No HP/WA", "Posisi"]
+    rows = []
+    for i, p in enumerate(summary.get("absent_people", []), start=1):
+        rows.append([str(i), str(p.get("Nama", "")), str(p.get("No HP/WA", "")), str(p.get("Posisi", ""))])
+    return header, rows
@@ -0,0 +1,131 @@
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Iterator, Optional
+
+
+class Overloaded(RuntimeError):
+    """Submit ditolak karena antrean penuh / menunggu terlalu lama. ``retry_after`` = saran detik."""
+
+    def __init__(self, retry_after: int, reason: str = "ramai"):
+        super().__init__(f"Server {reason}, coba lagi dalam {retry_after} detik")
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionController:
+    """
+    Pintu masuk pipeline submit (optimasi foto + upload + tulis baris): maksimal
+    ``max_inflight`` submit jalan bersamaan, sisanya antre FIFO (maks.
+    ``max_queue``, menunggu maks. ``max_wait`` detik). Perkiraan waktu tunggu
+    memakai rata-rata bergerak (EWMA) lama 1 submit.
+
+    ``admit(on_wait)`` memanggil ``on_wait(posisi, eta_detik)`` dari thread
+    pemanggil selama antre (tiap ``poll`` detik) -> aman untuk update UI.
+    """
+
+    def __init__(self, max_inflight: int = 4, max_queue: int = 50, max_wait: float = 45.0,
+                 poll: float = 0.5, initial_service: float = 3.0):
+        self.max_inflight = max(1, int(max_inflight))
+        self.max_queue = max(0, int(max_queue))
+        self.max_wait = max(0.0, float(max_wait))
+        self.poll = max(0.05, float(poll))
+        self._cond = threading.Condition()
+        self._queue: Deque[int] = deque()
+        self._next_ticket = 0
+        self._inflight = 0
+        self._service = float(initial_service)  # EWMA detik per submit
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.peak_queue = 0
+
+    def _eta(self, position: int) -> float:
+        # posisi 1 = berikutnya masuk; tiap "gelombang" max_inflight submit butuh ~1x lama submit
+        return math.ceil(position / self.max_inflight) * self._service
+
+    def retry_after(self) -> int:
+        """Saran detik sebelum coba lagi = perkiraan antrean sekarang habis."""
+        with self._cond:
+            return max(1, math.ceil(self._eta(len(self._queue) + 1)))
+
+    def _can_enter(self, ticket: int) -> bool:
+        return self._queue[0] == ticket and self._inflight < self.max_inflight
+
+    @contextmanager
+    def admit(self, on_wait: Optional[Callable[[int, float], None]] = None) -> Iterator[Dict]:
+        """``with ctl.admit(cb) as info:`` -> ``info["waited"]`` detik antre; raise ``Overloaded``."""
+        t0 = time.monotonic()
+        with self._cond:
+            if not self._queue and self._inflight < self.max_inflight:
+                ticket = None
+                self._inflight += 1
+            elif len(self._queue) >= self.max_queue:
+                self.rejected += 1
+                raise Overloaded(max(1, math.ceil(self._eta(len(self._queue) + 1))))
+            else:
+                ticket = self._next_ticket
+                self._next_ticket += 1
+                self._queue.append(ticket)
+                self.queued += 1
+                self.peak_queue = max(self.peak_queue, len(self._queue))
+
+        if ticket is not None:
+            self._wait_turn(ticket, t0 + self.max_wait, on_wait)
+
+        with self._cond:
+            self.admitted += 1
+        started = time.monotonic()
+        try:
+            yield {"waited": started - t0}
+        finally:
+            with self._cond:
+                self._inflight -= 1
+                self._service = 0.8 * self._service + 0.2 * (time.monotonic() - started)
+                self._cond.notify_all()
+
+    def _wait_turn(self, ticket: int, deadline: float, on_wait):
+        try:
+            while True:
+                with self._cond:
+                    if self._can_enter(ticket):
+                        self._queue.popleft()
+                        self._inflight += 1
+                        # yang di belakang ikut maju 1 posisi
+                        self._cond.notify_all()
+                        return
+                    if time.monotonic() >= deadline:
+                        self.timed_out += 1
+                        raise Overloaded(max(1, math.ceil(self._eta(len(self._queue)))), "sibuk")
+                    position = self._queue.index(ticket) + 1
+                    eta = self._eta(position)
+                if on_wait is not None:
+                    on_wait(position, eta)
+                with self._cond:
+                    if not self._can_enter(ticket):
+                        self._cond.wait(min(self.poll, max(0.0, deadline - time.monotonic())))
+        except BaseException:
+            # timeout / session ditutup / rerun saat antre -> keluar dari antrean
+            with self._cond:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                    self._cond.notify_all()
+            raise
+
+    def status(self) -> Dict:
+        with self._cond:
+            return {
+                "inflight": self._inflight,
+                "max_inflight": self.max_inflight,
+                "queue": len(self._queue),
+                "max_queue": self.max_queue,
+                "avg_submit_s": round(self._service, 2),
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "peak_queue": self.peak_queue,
+            }
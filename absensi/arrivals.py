@@ -0,0 +1,134 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+BIN_CHOICES = (1, 5, 15)
+MINUTES_PER_DAY = 24 * 60
+
+
+def minute_of_day(ts: str) -> Optional[int]:
+    """'09-01-2026 08:15:42' -> 495 (menit sejak 00:00); None kalau jam tidak terbaca."""
+    s = str(ts or "").strip()
+    try:
+        h, m = int(s[11:13]), int(s[14:16])
+    except ValueError:
+        return None
+    if not (0 <= h < 24 and 0 <= m < 60):
+        return None
+    return h * 60 + m
+
+
+def _hhmm(minute: int) -> str:
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+class ArrivalCounts:
+    """
+    Jumlah per menit hari itu, ditambah inkremental bersama rekap: ``arrivals``
+    = orang hadir (sudah dedup) per posisi, ``scans`` = semua submit (termasuk
+    duplikat) -> beban stasiun QR. Bin 5/15 menit dihitung dari data per menit.
+    """
+
+    def __init__(self):
+        self.arrivals: Dict[str, Dict[int, int]] = {}
+        self.scans: Dict[int, int] = {}
+
+    def add_scan(self, ts: str):
+        m = minute_of_day(ts)
+        if m is not None:
+            self.scans[m] = self.scans.get(m, 0) + 1
+
+    def add_arrival(self, ts: str, posisi: str):
+        m = minute_of_day(ts)
+        if m is not None:
+            per_min = self.arrivals.setdefault(posisi, {})
+            per_min[m] = per_min.get(m, 0) + 1
+
+    def to_dict(self) -> Dict:
+        # key JSON harus string
+        return {
+            "arrivals": {p: {str(m): n for m, n in c.items()} for p, c in self.arrivals.items()},
+            "scans": {str(m): n for m, n in self.scans.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, d: Optional[Dict]) -> "ArrivalCounts":
+        out = cls()
+        d = d or {}
+        out.arrivals = {p: {int(m): int(n) for m, n in c.items()} for p, c in (d.get("arrivals") or {}).items()}
+        out.scans = {int(m): int(n) for m, n in (d.get("scans") or {}).items()}
+        return out
+
+
+def _binned(per_min: Dict[int, int], bin_minutes: int) -> Dict[int, int]:
+    out: Dict[int, int] = {}
+    for m, n in per_min.items():
+        b = m - m % bin_minutes
+        out[b] = out.get(b, 0) + n
+    return out
+
+
+def histogram(counts: Dict, bin_minutes: int = 5, checkin_seconds: float = 30.0) -> Dict:
+    """
+    Histogram kedatangan dari ``ArrivalCounts.to_dict()``: baris per bin (hadir,
+    scan, kumulatif, per posisi), puncak, dan estimasi stasiun QR =
+    ceil(scan/menit di puncak x ``checkin_seconds`` / 60).
+    """
+    bin_minutes = max(1, int(bin_minutes))
+    c = ArrivalCounts.from_dict(counts)
+    positions = sorted(c.arrivals, key=lambda p: (-sum(c.arrivals[p].values()), p.lower()))
+    by_pos = {p: _binned(c.arrivals[p], bin_minutes) for p in positions}
+    scans = _binned(c.scans, bin_minutes)
+
+    starts = set(scans)
+    for b in by_pos.values():
+        starts.update(b)
+    rows: List[Dict] = []
+    cumulative: List[Dict] = []
+    if starts:
+        total = 0
+        cum_pos = {p: 0 for p in positions}
+        for b in range(min(starts), max(starts) + bin_minutes, bin_minutes):
+            hadir = sum(by_pos[p].get(b, 0) for p in positions)
+            total += hadir
+            row = {
+                "Mulai": _hhmm(b),
+                "Selesai": _hhmm(min(b + bin_minutes, MINUTES_PER_DAY) % MINUTES_PER_DAY),
+                "Hadir": hadir,
+                "Scan": scans.get(b, 0),
+                "Kumulatif": total,
+            }
+            cum = {"Mulai": row["Mulai"]}
+            for p in positions:
+                row[p] = by_pos[p].get(b, 0)
+                cum_pos[p] += row[p]
+                cum[p] = cum_pos[p]
+            rows.append(row)
+            cumulative.append(cum)
+
+    peak = max(rows, key=lambda r: r["Hadir"]) if rows else None
+    peak_scan = max(rows, key=lambda r: r["Scan"]) if rows else None
+    scan_per_min = peak_scan["Scan"] / bin_minutes if peak_scan else 0.0
+    return {
+        "bin_minutes": bin_minutes,
+        "positions": positions,
+        "rows": rows,
+        "cumulative": cumulative,
+        "peak": {
+            "Mulai": peak["Mulai"] if peak else "-",
+            "Hadir": peak["Hadir"] if peak else 0,
+            "per_menit": round(peak["Hadir"] / bin_minutes, 2) if peak else 0.0,
+        },
+        "peak_scan": {
+            "Mulai": peak_scan["Mulai"] if peak_scan else "-",
+            "Scan": peak_scan["Scan"] if peak_scan else 0,
+            "per_menit": round(scan_per_min, 2),
+        },
+        "checkin_seconds": checkin_seconds,
+        "stations": math.ceil(scan_per_min * checkin_seconds / 60.0) if scan_per_min else 0,
+    }
+
+
+def build_export_arrivals(hist: Dict) -> Tuple[List[str], List[List[str]]]:
+    header = ["Mulai", "Selesai", "Hadir", "Scan", "Kumulatif"] + list(hist.get("positions", []))
+    rows = [[str(r.get(h, 0)) for h in header] for r in hist.get("rows", [])]
+    return header, rows
@@ -0,0 +1,249 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, Optional
+
+from absensi.snapshot import write_bytes_atomic, write_json_atomic
+
+SELFIE_DIR = "selfie"
+OTHER_DIR = "selfie_lain"  # selfie di luar folder root app (path lengkap)
+
+# progress(selesai, total, path terakhir)
+ProgressFn = Callable[[int, int, str], None]
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _path_lock(path: str) -> threading.Lock:
+    # 1 penulis per arsip (admin yang klik bersamaan menunggu, bukan menulis ZIP yang sama)
+    with _locks_guard:
+        return _locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+def selfie_entry_name(dbx_path: str, root: str = "") -> str:
+    """
+    '/Absensi_Selfie/Budi/2026-01-09_08-15-00_selfie.jpg' -> 'selfie/Budi/2026-01-09_08-15-00_selfie.jpg'.
+    Path di luar ``root`` disimpan lengkap di bawah 'selfie_lain/' (tidak bentrok antar folder).
+    """
+    path = str(dbx_path).replace("\\", "/")
+    root = root.rstrip("/")
+    if root and path.lower().startswith(root.lower() + "/"):
+        top, parts = SELFIE_DIR, path[len(root):].split("/")
+    else:
+        top, parts = OTHER_DIR, path.split("/")
+    return "/".join([top] + [p for p in parts if p and p not in (".", "..")])
+
+
+def entry_names(paths: Iterable[str], root: str = "") -> Dict[str, str]:
+    """path -> nama entry unik (nama yang bentrok, mis. beda huruf besar/kecil, diberi akhiran ~2, ~3, ...)."""
+    out: Dict[str, str] = {}
+    taken = set()
+    for path in paths:
+        name = selfie_entry_name(path, root)
+        stem, dot, ext = name.rpartition(".")
+        if not dot or "/" in ext:
+            stem, dot, ext = name, "", ""
+        n = 1
+        while name.lower() in taken:
+            n += 1
+            name = f"{stem}~{n}{dot}{ext}"
+        taken.add(name.lower())
+        out[path] = name
+    return out
+
+
+def _download_with_retry(download: Callable[[str], bytes], path: str, retries: int, backoff: float) -> bytes:
+    for attempt in range(retries + 1):
+        try:
+            return download(path)
+        except Exception:
+            if attempt >= retries:
+                raise
+            time.sleep(backoff * (2 ** attempt))
+
+
+def _part_path(parts_dir: str, name: str) -> str:
+    return os.path.join(parts_dir, *name.split("/"))
+
+
+def _old_entries(out_path: str) -> set:
+    if not os.path.exists(out_path):
+        return set()
+    try:
+        with zipfile.ZipFile(out_path) as zf:
+            return set(zf.namelist())
+    except zipfile.BadZipFile:
+        return set()  # arsip rusak -> foto yang belum ada di folder parts diunduh ulang
+
+
+def _assemble(out_path: str, parts_dir: str, files: Dict[str, bytes], names: List[str], old: set):
+    # ZIP baru dari tabel log run ini + foto (folder parts / ZIP lama), lalu os.replace -> ZIP lama utuh kalau gagal
+    folder = os.path.dirname(os.path.abspath(out_path))
+    fd, tmp = tempfile.mkstemp(prefix=".tmp_", suffix=".zip", dir=folder)
+    os.close(fd)
+    try:
+        src = zipfile.ZipFile(out_path) if old else None
+        try:
+            with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+                for name, data in files.items():
+                    zf.writestr(name, data)
+                for name in names:
+                    part = _part_path(parts_dir, name)
+                    # foto sudah JPEG/PNG -> simpan tanpa kompresi ulang
+                    if os.path.exists(part):
+                        zf.write(part, name, compress_type=zipfile.ZIP_STORED)
+                    elif name in old:
+                        zf.writestr(name, src.read(name), compress_type=zipfile.ZIP_STORED)
+        finally:
+            if src is not None:
+                src.close()
+        os.replace(tmp, out_path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _build_evidence_zip(
+    out_path: str,
+    files: Dict[str, bytes],
+    selfie_paths: Iterable[str],
+    download: Callable[[str], bytes],
+    workers: int = 4,
+    retries: int = 2,
+    backoff: float = 1.0,
+    progress: Optional[ProgressFn] = None,
+    root: str = "",
+) -> Dict:
+    state_path = f"{out_path}.json"
+    parts_dir = f"{out_path}.parts"
+    paths: List[str] = list(dict.fromkeys(
+        p for p in (str(p or "").strip() for p in selfie_paths) if p and p != "-"
+    ))
+    names = entry_names(paths, root)
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+
+    old = _old_entries(out_path)
+    failed: Dict[str, str] = {}
+    todo = [p for p in paths if names[p] not in old and not os.path.exists(_part_path(parts_dir, names[p]))]
+    total = len(paths)
+    n_done = total - len(todo)
+    t0 = time.monotonic()
+
+    if progress:
+        progress(n_done, total, "")
+
+    with ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="bundle") as pool:
+        pending = {}
+        queue = iter(todo)
+        while True:
+            while len(pending) < 2 * max(1, int(workers)):
+                path = next(queue, None)
+                if path is None:
+                    break
+                pending[pool.submit(_download_with_retry, download, path, retries, backoff)] = path
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                path = pending.pop(fut)
+                try:
+                    # langsung ke disk per file: proses mati di tengah jalan tidak menghapus yang sudah terunduh
+                    write_bytes_atomic(_part_path(parts_dir, names[path]), fut.result())
+                    n_done += 1
+                except Exception as e:
+                    failed[path] = str(e)[:200]
+                if progress:
+                    progress(n_done, total, path)
+
+    # tabel log selalu dari run ini -> ZIP hanya berisi selfie yang ada di log-nya
+    _assemble(out_path, parts_dir, files, [names[p] for p in paths], old)
+    shutil.rmtree(parts_dir, ignore_errors=True)
+
+    result = {
+        "out_path": out_path,
+        "total": total,
+        "done": n_done,
+        "skipped": total - len(todo),
+        "failed": failed,
+        "files": {name: len(data) for name, data in files.items()},
+        "seconds": round(time.monotonic() - t0, 3),
+        "complete": not failed,
+    }
+    write_json_atomic(state_path, result)
+    return result
+
+
+def build_evidence_zip(out_path: str, *args, **kwargs) -> Dict:
+    """
+    ZIP bukti audit: ``files`` (mis. log.xlsx / log.csv) + semua selfie di
+    ``selfie_paths`` (nama entry relatif ke ``root``), diunduh paralel lewat
+    ``download(path)`` (maks. ``workers`` sekaligus). Tiap foto langsung ditulis
+    ke ``<out_path>.parts/``; di akhir run ZIP disusun ulang dari tabel log run
+    ini + foto yang sudah ada, jadi isi ZIP selalu sesuai log-nya.
+
+    Bisa dilanjutkan: foto yang sudah ada di ZIP lama atau folder parts (juga
+    setelah proses mati di tengah jalan) tidak diunduh ulang; memanggil ulang
+    hanya mengunduh file yang gagal / belum sempat / baris baru. Status per
+    file disimpan di ``<out_path>.json``.
+    """
+    with _path_lock(out_path):
+        return _build_evidence_zip(out_path, *args, **kwargs)
+
+
+class BundleJobs:
+    """
+    ZIP bukti dibuat di background thread, bukan di rerun Streamlit: ``start(key, run)``
+    menjalankan ``run(progress)`` (mis. ``Core.export_evidence``) sekali per ``key``
+    (path arsip), ``status(key)`` untuk ditampilkan di rerun berikutnya. Klik ulang
+    saat job ``key`` masih jalan tidak membuat job kedua.
+    """
+
+    def __init__(self, thread_hook: Optional[Callable] = None):
+        self.thread_hook = thread_hook
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict] = {}
+
+    def _run(self, key: str, run: Callable[[ProgressFn], Dict]):
+        job = self._jobs[key]
+
+        def progress(done: int, total: int, _path: str):
+            job["done"], job["total"] = done, total
+
+        try:
+            job["result"] = run(progress)
+        except Exception as e:
+            job["error"] = str(e)[:300]
+            print(f"Evidence Bundle Error: {e}")
+        finally:
+            job["running"] = False
+            job["finished_at"] = time.time()
+
+    def start(self, key: str, run: Callable[[ProgressFn], Dict]) -> bool:
+        """Mulai job ``key``; False kalau job yang sama masih jalan."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job["running"]:
+                return False
+            self._jobs[key] = {"running": True, "done": 0, "total": 0, "result": None, "error": None,
+                               "started_at": time.time(), "finished_at": None}
+        t = threading.Thread(target=self._run, args=(key, run), name="evidence-bundle", daemon=True)
+        if self.thread_hook is not None:
+            try:
+                self.thread_hook(t)
+            except Exception:
+                pass
+        t.start()
+        return True
+
+    def status(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(key)
+            return dict(job) if job is not None else None
@@ -0,0 +1,209 @@
+"""
+CLI headless Absensi QR: rekap, export, dan cek konsistensi tanpa membuka UI.
+Memakai secrets.toml yang sama dengan Streamlit.
+
+    python -m absensi rekap                              # rekap hari ini
+    python -m absensi rekap --date 2026-01-09 --json
+    python -m absensi export --format xlsx --from 2026-01-01 --to 2026-01-31 --out log_jan.xlsx
+    python -m absensi export --format parquet --out log.parquet
+    python -m absensi export --scope rekap --format csv --date 2026-01-09
+    python -m absensi export --scope belum_hadir --format xlsx   # roster yang belum absen hari ini
+    python -m absensi export --scope kedatangan --bin 15 --format csv
+    python -m absensi bundle --from 2026-01-09 --workers 8   # ZIP log + selfie
+    python -m absensi reconcile --from 2026-01-01       # exit 1 kalau ada temuan
+    python -m absensi reconcile --dropbox --backfill     # + selfie yatim / hilang
+    python -m absensi migrate-layout --layout date --dry-run
+    python -m absensi archive                           # arsipkan partisi Log tertutup
+
+Secrets: ``--secrets PATH``, env ABSENSI_SECRETS, .streamlit/secrets.toml,
+lalu ~/.streamlit/secrets.toml.
+"""
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+from datetime import date, datetime
+from typing import Optional
+
+from absensi.config import Settings, load_secrets
+from absensi.core import Core
+
+FORMATS = ("xlsx", "csv", "parquet")
+
+
+def parse_date(text: str) -> date:
+    for fmt in ("%Y-%m-%d", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(text.strip(), fmt).date()
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"tanggal tidak valid: {text!r} (pakai YYYY-MM-DD atau DD-MM-YYYY)")
+
+
+def make_core(secrets_path: Optional[str]) -> Core:
+    secrets = load_secrets(secrets_path)
+    # job batch: jangan timpa snapshot rekap milik server
+    return Core(secrets, Settings(secrets.get("app", {})), rekap_snapshot=False)
+
+
+def cmd_rekap(core: Core, args) -> int:
+    rekap = core.rekap(args.date)
+    if args.json:
+        print(json.dumps(rekap, ensure_ascii=False, indent=2))
+        return 0
+    print(f"Rekap {rekap['today']}: {rekap['total']} hadir (duplikat dibuang: {rekap['dup_removed']})")
+    for p in rekap["by_pos"]:
+        print(f"  {p['Jumlah']:>5}  {p['Posisi']}")
+    return 0
+
+
+def cmd_export(core: Core, args) -> int:
+    if args.bin:
+        core.settings.arrival_bin_minutes = args.bin
+    base, files, n = core.export_files(args.scope, (args.format,), day=args.date,
+                                       date_from=args.date_from, date_to=args.date_to)
+    data = files[args.format]
+    out = args.out or f"{base}.{args.format}"
+    if out == "-":
+        sys.stdout.buffer.write(data)
+        return 0
+    tmp = f"{out}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, out)
+    print(f"{n} baris -> {out} ({len(data)} byte)", file=sys.stderr)
+    return 0
+
+
+def cmd_bundle(core: Core, args) -> int:
+    today = core.now().date()
+    date_from = args.date_from or today
+    date_to = args.date_to or date_from
+
+    def progress(done: int, total: int, _path: str):
+        print(f"\r{done}/{total} selfie", end="", file=sys.stderr, flush=True)
+
+    res = core.export_evidence(date_from, date_to, out_path=args.out or None, workers=args.workers,
+                               progress=progress)
+    print(file=sys.stderr)
+    print(f"{res['done']}/{res['total']} selfie -> {res['out_path']} ({res['seconds']:.1f}s)")
+    for path, err in res["failed"].items():
+        print(f"  gagal: {path}: {err}")
+    if res["failed"]:
+        print("Jalankan ulang perintah yang sama untuk melanjutkan.")
+    return 0 if res["complete"] else 1
+
+
+def cmd_migrate_layout(core: Core, args) -> int:
+    def progress(done: int, total: int):
+        print(f"\r{done}/{total} file", end="", file=sys.stderr, flush=True)
+
+    res = core.migrate_dropbox_layout(args.layout or None, batch_size=args.batch, dry_run=args.dry_run,
+                                      relink=args.relink, progress=progress)
+    print(file=sys.stderr)
+    if args.dry_run:
+        print(f"Layout {res['layout']}: {res['files']} file akan dipindah ({res['rows']} baris, "
+              f"{res['skipped']} sudah sesuai / bukan file app)")
+        for old, new in res["sample"]:
+            print(f"  {old} -> {new}")
+        return 0
+    print(f"{res['moved']}/{res['files']} file dipindah, {res['rows_updated']} baris diperbarui, "
+          f"{len(res['failed'])} gagal")
+    for path, err in res["failed"].items():
+        print(f"  gagal: {path}: {err}")
+    return 1 if res["failed"] else 0
+
+
+def cmd_reconcile(core: Core, args) -> int:
+    result = core.reconcile(args.date_from, args.date_to, dropbox=args.dropbox or args.backfill,
+                            backfill=args.backfill)
+    issues = result["issues"]
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print(f"{result['tabs']} tab, {result['rows']} baris dicek, {len(issues)} temuan")
+        if "dropbox" in result:
+            d = result["dropbox"]
+            print(f"Dropbox ({d['mode']}): {d['files']} file, +{d['added']} / -{d['removed']}, "
+                  f"{d['pages']} halaman, {d['seconds']:.1f}s")
+        if "backfilled" in result:
+            print(f"Backfill: {result['backfilled']} baris ditulis")
+        for kind, n in sorted(Counter(i["kind"] for i in issues).items()):
+            print(f"  {kind}: {n}")
+        for i in issues[: args.limit]:
+            where = f"{i['tab']}!{i['row']}" if i["row"] else i["tab"]
+            print(f"  [{i['kind']}] {where}: {i['detail']}")
+        if len(issues) > args.limit:
+            print(f"  ... {len(issues) - args.limit} temuan lain (pakai --json untuk daftar lengkap)")
+    return 1 if issues else 0
+
+
+def cmd_archive(core: Core, args) -> int:
+    moved = core.archive_partitions(force=True)
+    print(f"{moved} partisi diarsipkan ({core.settings.archive_mode})")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="python -m absensi", description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--secrets", default=None, help="path secrets.toml")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("rekap", help="rekap kehadiran 1 hari")
+    p.add_argument("--date", type=parse_date, default=None, help="default hari ini")
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=cmd_rekap)
+
+    p = sub.add_parser("export", help="export log / rekap ke file")
+    p.add_argument("--format", choices=FORMATS, default="xlsx")
+    p.add_argument("--scope", choices=("log", "rekap", "belum_hadir", "kedatangan"), default="log")
+    p.add_argument("--from", dest="date_from", type=parse_date, default=None)
+    p.add_argument("--to", dest="date_to", type=parse_date, default=None)
+    p.add_argument("--date", type=parse_date, default=None, help="tanggal untuk --scope rekap / belum_hadir / kedatangan")
+    p.add_argument("--bin", type=int, default=None, help="menit per bin untuk --scope kedatangan (default app.arrival_bin_minutes)")
+    p.add_argument("--out", default="", help="path output ('-' = stdout); default nama file seperti di app")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("bundle", help="ZIP bukti audit: log + semua selfie (bisa dilanjutkan)")
+    p.add_argument("--from", dest="date_from", type=parse_date, default=None, help="default hari ini")
+    p.add_argument("--to", dest="date_to", type=parse_date, default=None, help="default = --from")
+    p.add_argument("--out", default="", help="path ZIP; default <state_dir>/bundles/bukti_absensi_<rentang>.zip")
+    p.add_argument("--workers", type=int, default=None, help="download selfie paralel (default app.bundle_workers)")
+    p.set_defaults(func=cmd_bundle)
+
+    p = sub.add_parser("migrate-layout", help="pindahkan selfie lama ke layout folder baru + update sheet")
+    p.add_argument("--layout", default="", help="person / date / template (default app.dropbox_layout)")
+    p.add_argument("--batch", type=int, default=500, help="file per files_move_batch_v2 (maks. 1000)")
+    p.add_argument("--relink", action="store_true", help="buat ulang link Bukti Selfie (default: hanya yang kosong)")
+    p.add_argument("--dry-run", action="store_true", help="hanya tampilkan rencana")
+    p.set_defaults(func=cmd_migrate_layout)
+
+    p = sub.add_parser("reconcile", help="cek konsistensi sheet (exit 1 kalau ada temuan)")
+    p.add_argument("--from", dest="date_from", type=parse_date, default=None)
+    p.add_argument("--to", dest="date_to", type=parse_date, default=None)
+    p.add_argument("--dropbox", action="store_true",
+                   help="bandingkan juga dengan folder selfie (inkremental via cursor list_folder)")
+    p.add_argument("--backfill", action="store_true", help="tulis baris untuk selfie yatim (implies --dropbox)")
+    p.add_argument("--limit", type=int, default=50, help="maksimum temuan yang dicetak")
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=cmd_reconcile)
+
+    p = sub.add_parser("archive", help="arsipkan partisi Log yang sudah tertutup (app.archive_mode)")
+    p.set_defaults(func=cmd_archive)
+    return ap
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        core = make_core(args.secrets)
+        return args.func(core, args)
+    except Exception as e:
+        print(f"X Error: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import os
+from typing import Dict, Mapping, Optional
+
+from absensi.lazy import optional_import
+
+SECRETS_ENV = "ABSENSI_SECRETS"
+SECRETS_CANDIDATES = (
+    os.path.join(".streamlit", "secrets.toml"),
+    os.path.join("~", ".streamlit", "secrets.toml"),
+)
+
+
+def _toml():
+    mod = optional_import("tomllib") or optional_import("tomli")
+    if mod is None:
+        raise RuntimeError("Butuh Python 3.11+ (tomllib) atau paket 'tomli' untuk membaca secrets.toml")
+    return mod
+
+
+def find_secrets(path: Optional[str] = None) -> Optional[str]:
+    """``path`` -> env ABSENSI_SECRETS -> .streamlit/secrets.toml -> ~/.streamlit/secrets.toml."""
+    for p in (path, os.environ.get(SECRETS_ENV)) + SECRETS_CANDIDATES:
+        if p and os.path.isfile(os.path.expanduser(p)):
+            return os.path.expanduser(p)
+    return None
+
+
+def load_secrets(path: Optional[str] = None) -> Dict:
+    """Baca secrets.toml yang sama dengan Streamlit (untuk CLI / job batch tanpa UI)."""
+    found = find_secrets(path)
+    if found is None:
+        raise RuntimeError(f"secrets.toml tidak ditemukan (set --secrets atau env {SECRETS_ENV})")
+    with open(found, "rb") as f:
+        return _toml().load(f)
+
+
+class Settings:
+    """Konfigurasi backend dari section ``[app]`` secrets (default sama dengan app.py)."""
+
+    def __init__(self, cfg: Optional[Mapping] = None):
+        cfg = cfg or {}
+        self.sheet_name = cfg.get("sheet_name", "Absensi_Karyawan")
+        self.worksheet_name = cfg.get("worksheet_name", "Log")
+        self.dropbox_folder = cfg.get("dropbox_folder", "/Absensi_Selfie")
+        # Layout path selfie: "person" ({root}/{name}/{ts}_selfie.ext), "date" ({root}/YYYY/MM/DD/...), atau template
+        self.dropbox_layout = str(cfg.get("dropbox_layout", "person")).strip() or "person"
+        self.timezone = cfg.get("timezone", "Asia/Jakarta")
+
+        # Storage log + foto: "sheets" (Google Sheets + Dropbox) atau "sqlite" (file SQLite + folder foto lokal)
+        self.storage = str(cfg.get("storage", "sheets")).strip().lower() or "sheets"
+        # relatif ke folder app; kosong = <state_dir>/absensi.sqlite3 & <state_dir>/selfie
+        self.sqlite_path = str(cfg.get("sqlite_path", "")).strip()
+        self.photo_dir = str(cfg.get("photo_dir", "")).strip()
+
+        # Ukuran awal tab log baru (kecil: append_row menyisipkan baris sendiri, cursor menambah per chunk)
+        self.sheet_rows = int(cfg.get("sheet_rows", 200))
+        # Tulis baris via row-pointer eksplisit: sheet ditambah per chunk saat hampir penuh
+        self.sheet_grow_rows = int(cfg.get("sheet_grow_rows", 2000))
+        self.sheet_grow_margin = int(cfg.get("sheet_grow_margin", 50))
+        self.row_resync_seconds = float(cfg.get("row_resync_seconds", 300))
+        # "append" (append_row server-side: 1 write per submit, aman untuk banyak penulis),
+        # "cursor" (row-pointer opt-in, 1 replica: cek baris kosong + 1 write + 1 read verifikasi per submit),
+        # "auto" = append kalau shared_cache aktif (beberapa replica), selain itu cursor
+        self.row_write = str(cfg.get("row_write", "append")).strip().lower()
+
+        # Partisi tab Log: "none" (1 tab), "month" (Log_YYYY_MM), "rows" (Log_002 dst saat penuh)
+        self.partition_mode = str(cfg.get("partition_mode", "none")).strip().lower()
+        self.partition_max_rows = int(cfg.get("partition_max_rows", 50000))
+        # Arsip partisi tertutup: "none", "tab" (rename Arsip_*), "spreadsheet" (pindah ke spreadsheet arsip).
+        # Jalan di thread warm-up setelah rollover (app.warmup) atau lewat `python -m absensi archive`
+        self.archive_mode = str(cfg.get("archive_mode", "none")).strip().lower()
+        self.archive_keep = int(cfg.get("archive_keep", 1))
+        self.archive_sheet_name = str(cfg.get("archive_sheet_name", "")).strip() or f"{self.sheet_name}_Arsip"
+
+        # Kuota Sheets API per menit (per service account) + retry 429/5xx
+        self.quota_read_per_min = float(cfg.get("quota_read_per_min", 60))
+        self.quota_write_per_min = float(cfg.get("quota_write_per_min", 60))
+        self.quota_burst = int(cfg.get("quota_burst", 10))
+        self.quota_max_retries = int(cfg.get("quota_max_retries", 5))
+
+        # Pool client API untuk session paralel (tiap client punya HTTP session keep-alive sendiri)
+        self.gsheet_pool_size = int(cfg.get("gsheet_pool_size", 4))
+        self.dropbox_pool_size = int(cfg.get("dropbox_pool_size", 4))
+        self.pool_timeout = float(cfg.get("pool_timeout", 30))
+
+        # Snapshot rekap ke disk (atomic) -> restart cukup mengejar baris baru sejak snapshot
+        self.state_dir = str(cfg.get("state_dir", ".absensi_state")).strip() or ".absensi_state"
+        self.rekap_snapshot = bool(cfg.get("rekap_snapshot", True))
+        self.rekap_snapshot_seconds = float(cfg.get("rekap_snapshot_seconds", 60))
+        self.rekap_full_resync_seconds = float(cfg.get("rekap_full_resync_seconds", 1800))
+
+        # Cache bersama antar replica: "" (nonaktif), "sqlite:///path/shared.sqlite3", atau "redis://host:6379/0"
+        self.shared_cache = str(cfg.get("shared_cache", "")).strip()
+        # state rekap bersama dipakai tanpa baca Sheets selama umurnya < ini (dan belum di-invalidate)
+        self.shared_fresh_seconds = float(cfg.get("shared_fresh_seconds", 30))
+        self.shared_wait_seconds = float(cfg.get("shared_wait_seconds", 15))
+
+        # Optimasi foto untuk HP spek rendah / internet lambat
+        self.img_max_side = int(cfg.get("img_max_side", 1280))
+        self.img_jpeg_quality = int(cfg.get("img_jpeg_quality", 78))
+
+        # Galeri admin: thumbnail Dropbox (w64h64 / w128h128 / w256h256) + batas cache di disk
+        self.thumb_size = str(cfg.get("thumb_size", "w128h128")).strip() or "w128h128"
+        self.thumb_cache_mb = float(cfg.get("thumb_cache_mb", 50))
+
+        # Roster karyawan (tab Nama / No HP/WA / Posisi) untuk autofill form absen; opt-in, "" = nonaktif
+        self.roster_sheet = str(cfg.get("roster_sheet", "")).strip()
+        self.roster_ttl_seconds = float(cfg.get("roster_ttl_seconds", 600))
+
+        # Pola kedatangan: lebar bin default (menit) + lama 1 check-in per stasiun QR (estimasi kapasitas)
+        self.arrival_bin_minutes = int(cfg.get("arrival_bin_minutes", 5))
+        self.checkin_seconds = float(cfg.get("checkin_seconds", 30))
+
+        # ZIP bukti audit: jumlah download selfie paralel (client Dropbox terpisah dari pool submit)
+        self.bundle_workers = int(cfg.get("bundle_workers", 4))
@@ -0,0 +1,714 @@
+"""
+Backend Absensi QR tanpa Streamlit: koneksi Sheets/Dropbox (pool + kuota),
+tab log & partisi, tulis baris, rekap, dan export. Dipakai app.py (lewat
+``st.cache_resource``) maupun CLI / job batch (``python -m absensi``).
+"""
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from absensi.absentees import AbsenteeTracker, build_export_absentees
+from absensi.arrivals import build_export_arrivals, histogram
+from absensi.bundle import build_evidence_zip
+from absensi.config import Settings
+from absensi.dropbox_index import DropboxIndex
+from absensi.export import (
+    build_export_rekap_today,
+    extract_hyperlink_url,
+    make_csv_bytes,
+    make_hyperlink,
+    make_parquet_bytes,
+    make_xlsx_bytes,
+)
+from absensi.layout_migration import MOVE_BATCH_MAX, MoveJournal, move_batch, target_path
+from absensi.lazy import lazy_import
+from absensi.metrics import maybe_span
+from absensi.partitions import PARTITION_NONE, STATUS_ACTIVE, PartitionManager, parse_ts_date
+from absensi.pool import ClientPool, is_broken_client_error, make_refresh_threadsafe
+from absensi.quota import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_EXPORT,
+    READ,
+    ScheduledSpreadsheet,
+    SheetsScheduler,
+    sheets_priority,
+)
+from absensi.reconcile import (
+    BACKFILL_MARK,
+    ORPHAN_FILE,
+    TAB_MISSING,
+    check_partitions,
+    check_rows,
+    diff_dropbox,
+    issue,
+)
+from absensi.rekap import RekapStore
+from absensi.roster import Roster
+from absensi.sheet_format import ensure_sheet_format, format_row_range
+from absensi.shared_cache import open_shared_cache
+from absensi.selfie import parse_selfie_path, resolve_layout, shared_link_url
+from absensi.sheets import RowCursor
+from absensi.storage import STORAGE_SHEETS, STORAGE_SQLITE, STORAGES, SheetsDropboxStorage, SqliteStorage, Storage
+from absensi.thumbs import ThumbCache
+
+COL_TIMESTAMP = "Timestamp"
+COL_NAMA = "Nama"
+COL_HP = "No HP/WA"
+COL_POSISI = "Posisi"
+COL_LINK_SELFIE = "Bukti Selfie"
+COL_DBX_PATH = "Dropbox Path"
+
+SHEET_COLUMNS = [COL_TIMESTAMP, COL_NAMA, COL_HP, COL_POSISI, COL_LINK_SELFIE, COL_DBX_PATH]
+SHEET_COL_WIDTHS = [170, 180, 150, 180, 140, 340]
+# ✅ Naikkan kalau kolom / format sheet berubah -> format ulang sekali saja per sheet
+SHEET_FORMAT_VERSION = "1"
+
+EXPORT_HEADER = ["No", COL_TIMESTAMP, COL_NAMA, COL_HP, COL_POSISI, "Bukti Selfie (URL)", COL_DBX_PATH]
+
+# ✅ Header atas untuk file XLSX (merged di atas tabel)
+EXPORT_TOP_HEADER_LINES = [
+    "JALA",
+    "Eastparc Hotel Yogyakarta, 09 January 2026",
+    "Kick Off Meeting 2026",
+]
+
+GSHEET_SCOPES = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
+
+
+def _gspread():
+    return lazy_import("gspread")
+
+
+class Core:
+    """
+    Semua resource backend satu proses. ``secrets`` = mapping seperti
+    ``st.secrets`` (section ``gcp_service_account`` & ``dropbox``);
+    ``base_dir`` = folder relatif untuk ``state_dir``.
+    ``rekap_snapshot=False`` untuk job batch yang tidak boleh menimpa snapshot server.
+    """
+
+    def __init__(self, secrets: Mapping, settings: Optional[Settings] = None, base_dir: Optional[str] = None,
+                 rekap_snapshot: Optional[bool] = None):
+        self.secrets = secrets
+        self.settings = settings or Settings(secrets.get("app", {}))
+        self.base_dir = base_dir or os.getcwd()
+        s = self.settings
+
+        self._lock = threading.Lock()
+        self._credentials = None
+        self._verified_ws = set()
+        self._cursors: Dict[int, RowCursor] = {}
+        self._dropbox_index: Optional[DropboxIndex] = None
+        self._thumb_cache: Optional[ThumbCache] = None
+        self._roster: Optional[Roster] = None
+        self._roster_at = 0.0
+        self._roster_load_lock = threading.Lock()
+        self._absentees: Optional[AbsenteeTracker] = None
+        self._storage: Optional[Storage] = None
+        self.rows_written = 0  # baris log yang ditulis proses ini (pemicu snapshot export)
+        # cache bersama antar replica (None = tiap proses sendiri-sendiri)
+        self.shared = open_shared_cache(s.shared_cache, self.base_dir)
+
+        # semua call Sheets lewat sini: token bucket read/write + backoff
+        self.scheduler = SheetsScheduler(
+            read_per_min=s.quota_read_per_min,
+            write_per_min=s.quota_write_per_min,
+            burst=s.quota_burst,
+            max_retries=s.quota_max_retries,
+        )
+        self.gsheet_pool = ClientPool(self.connect_gsheet, size=s.gsheet_pool_size, name="gsheet")
+        self.dropbox_pool = ClientPool(self.connect_dropbox, size=s.dropbox_pool_size, name="dropbox")
+        self.partitions = PartitionManager(
+            base_title=s.worksheet_name,
+            mode=s.partition_mode,
+            max_rows=s.partition_max_rows,
+            archive_mode=s.archive_mode,
+            archive_keep=s.archive_keep,
+            archive_name=s.archive_sheet_name,
+            ensure_ws=self.get_or_create_ws,
+            open_archive=lambda sh: self.open_spreadsheet_by_name(sh, s.archive_sheet_name),
+        )
+
+        if s.storage not in STORAGES:
+            raise RuntimeError(f"app.storage tidak dikenal: {s.storage!r} (pilih {', '.join(STORAGES)})")
+        use_snapshot = s.rekap_snapshot if rekap_snapshot is None else rekap_snapshot
+        source = f"{s.sheet_name}/{s.worksheet_name}" if s.storage == STORAGE_SHEETS else f"sqlite:{self.sqlite_path()}"
+        self.rekap_store = RekapStore(
+            source=source,
+            snapshot_path=os.path.join(self.state_path(), "rekap_snapshot.json") if use_snapshot else None,
+            snapshot_interval=s.rekap_snapshot_seconds,
+            full_resync_seconds=s.rekap_full_resync_seconds,
+            shared=self.shared,
+            shared_fresh=s.shared_fresh_seconds,
+            shared_wait=s.shared_wait_seconds,
+            # rekap tanggal lain (CLI --date, export) tidak mengganti state hari ini / state bersama
+            live_day=lambda: self.now().strftime("%d-%m-%Y"),
+        )
+
+    # ---------- umum
+    def state_path(self, *parts: str) -> str:
+        return os.path.join(self.base_dir, self.settings.state_dir, *parts)
+
+    def now(self) -> datetime:
+        return datetime.now(tz=ZoneInfo(self.settings.timezone))
+
+    # ---------- storage (log + foto)
+    def sqlite_path(self) -> str:
+        return os.path.join(self.base_dir, self.settings.sqlite_path or self.state_path("absensi.sqlite3"))
+
+    @property
+    def storage(self) -> Storage:
+        with self._lock:
+            if self._storage is None:
+                s = self.settings
+                if s.storage == STORAGE_SQLITE:
+                    self._storage = SqliteStorage(
+                        self.sqlite_path(),
+                        os.path.join(self.base_dir, s.photo_dir or self.state_path("selfie")),
+                    )
+                else:
+                    self._storage = SheetsDropboxStorage(self)
+            return self._storage
+
+    def require_sheets(self, what: str):
+        # fitur yang memang khusus struktur Google Sheets / Dropbox
+        if self.settings.storage != STORAGE_SHEETS:
+            raise RuntimeError(f"{what} hanya tersedia untuk app.storage = \"{STORAGE_SHEETS}\"")
+
+    def append_row(self, when: datetime, row: List[str], metrics=None):
+        """Tulis 1 baris log (URL selfie polos di kolom E) ke storage aktif."""
+        self.storage.append_row(when, row, metrics=metrics)
+        with self._lock:
+            self.rows_written += 1
+        self.note_rows_changed()
+
+    def has_row(self, when: datetime, dbx_path: str) -> bool:
+        """Baris dengan path selfie ``dbx_path`` sudah tertulis? Untuk error setelah request tulis terkirim."""
+        return self.storage.has_path(when, dbx_path)
+
+    def note_rows_changed(self):
+        # replica lain: rekap bersama tidak segar lagi, counter snapshot export naik
+        if self.shared is not None:
+            try:
+                self.rekap_store.invalidate()
+            except Exception as e:
+                print(f"Shared Cache Error: {e}")
+
+    def rows_counter(self) -> int:
+        """Jumlah baris baru: semua replica (revisi cache bersama) atau hanya proses ini."""
+        return self.rekap_store.revision() if self.shared is not None else self.rows_written
+
+    def put_selfie(self, path: str, data: bytes, metrics=None) -> str:
+        return self.storage.put_file(path, data, metrics=metrics)
+
+    # ---------- Google Sheets
+    def credentials(self):
+        # 1 objek credentials dipakai semua client di pool; refresh token dikunci
+        with self._lock:
+            if self._credentials is None:
+                if "gcp_service_account" not in self.secrets:
+                    raise RuntimeError("GSheet secrets tidak ditemukan: gcp_service_account")
+                creds_dict = dict(self.secrets["gcp_service_account"])
+                if "private_key" in creds_dict:
+                    creds_dict["private_key"] = creds_dict["private_key"].replace("\\n", "\n")
+                Credentials = lazy_import("google.oauth2.service_account").Credentials
+                creds = Credentials.from_service_account_info(creds_dict, scopes=GSHEET_SCOPES)
+                self._credentials = make_refresh_threadsafe(creds)
+            return self._credentials
+
+    def connect_gsheet(self):
+        """Buka 1 client gspread baru. Jangan dipanggil langsung; pakai ``use_gsheet()``."""
+        gc = _gspread().authorize(self.credentials())
+        return ScheduledSpreadsheet(self.scheduler.call(READ, gc.open, self.settings.sheet_name), self.scheduler)
+
+    @contextmanager
+    def _lease(self, pool: ClientPool):
+        with pool.lease(timeout=self.settings.pool_timeout) as client:
+            try:
+                yield client
+            except Exception as e:
+                # token dicabut / session putus -> client dibuang, lease berikutnya membuat yang baru
+                if is_broken_client_error(e):
+                    pool.discard(client)
+                raise
+
+    def use_gsheet(self):
+        """``with core.use_gsheet() as sh:`` -> spreadsheet dari pool (eksklusif untuk thread ini)."""
+        return self._lease(self.gsheet_pool)
+
+    def open_spreadsheet_by_name(self, spreadsheet, name: str):
+        # pakai client yang sama dengan spreadsheet utama (sudah di-lease)
+        return ScheduledSpreadsheet(self.scheduler.call(READ, spreadsheet.client.open, name), self.scheduler)
+
+    def auto_format(self, ws, force: bool = False):
+        """Format sheet sekali per SHEET_FORMAT_VERSION (marker di developer metadata)."""
+        try:
+            ensure_sheet_format(ws, SHEET_FORMAT_VERSION, SHEET_COL_WIDTHS, force=force)
+        except Exception as e:
+            print(f"Format Absensi Error: {e}")
+
+    def format_new_rows(self, ws, start_row: int, end_row: int):
+        # hanya range baris yang baru ditambah, bukan seluruh row_count
+        try:
+            format_row_range(ws, start_row, end_row)
+        except Exception as e:
+            print(f"Format Absensi Error: {e}")
+
+    def get_or_create_ws(self, spreadsheet, title: Optional[str] = None):
+        title = title or self.settings.worksheet_name
+        try:
+            ws = spreadsheet.worksheet(title)
+        except _gspread().WorksheetNotFound:
+            # tab baru kecil (format penuh murah); selanjutnya append_row / cursor yang menambah baris
+            ws = spreadsheet.add_worksheet(title=title, rows=self.settings.sheet_rows, cols=len(SHEET_COLUMNS))
+            ws.update("A1", [SHEET_COLUMNS], value_input_option="USER_ENTERED")
+            self.auto_format(ws)
+            self._verified_ws.add(ws.id)
+            return ws
+
+        # sheet id yang header/format-nya sudah dicek di proses ini
+        if ws.id in self._verified_ws:
+            return ws
+
+        header = ws.row_values(1)
+        if header != SHEET_COLUMNS:
+            ws.resize(cols=max(ws.col_count, len(SHEET_COLUMNS)))
+            ws.update("A1", [SHEET_COLUMNS], value_input_option="USER_ENTERED")
+        self.auto_format(ws)
+
+        self._verified_ws.add(ws.id)
+        return ws
+
+    def row_cursor(self, sheet_id: int) -> RowCursor:
+        # 1 cursor per worksheet per proses (shared antar session)
+        with self._lock:
+            cursor = self._cursors.get(sheet_id)
+            if cursor is None:
+                s = self.settings
+                cursor = self._cursors[sheet_id] = RowCursor(
+                    n_cols=len(SHEET_COLUMNS),
+                    grow_rows=s.sheet_grow_rows,
+                    grow_margin=s.sheet_grow_margin,
+                    resync_seconds=s.row_resync_seconds,
+                    on_grow=self.format_new_rows,
+                    # path selfie: unik per submit dan tidak diubah render Sheets -> penanda tulisan sendiri
+                    verify_col=SHEET_COLUMNS.index(COL_DBX_PATH),
+                )
+            return cursor
+
+    def server_append(self) -> bool:
+        mode = self.settings.row_write
+        if mode == "auto":
+            # cursor hanya untuk 1 replica; dengan shared_cache ada banyak penulis
+            return bool(self.settings.shared_cache)
+        return mode == "append"
+
+    def append_log_row(self, ws, row: List[str]) -> int:
+        """Tulis 1 baris log (append_row server-side, atau row-pointer eksplisit). Return nomor baris."""
+        if self.server_append():
+            # atomic di server: penulis lain tidak bisa menimpa baris yang sama
+            resp = ws.append_row(row, value_input_option="USER_ENTERED", insert_data_option="INSERT_ROWS",
+                                 table_range="A1")
+            rng = str(((resp or {}).get("updates") or {}).get("updatedRange", ""))
+            digits = re.search(r"(\d+)$", rng)
+            written = int(digits.group(1)) if digits else 0
+        else:
+            written = self.row_cursor(ws.id).append(ws, row)
+        if written:
+            self.partitions.note_written(ws.title, written)
+        return written
+
+    def get_write_ws(self, spreadsheet, when: datetime):
+        """Worksheet tujuan tulis untuk timestamp ``when`` (partisi aktif)."""
+        title = self.partitions.write_title(spreadsheet, when.date())
+        return self.get_or_create_ws(spreadsheet, title)
+
+    def iter_log_ws(self, spreadsheet, date_from: Optional[date] = None, date_to: Optional[date] = None) -> Iterator:
+        """Worksheet partisi yang overlap dengan rentang tanggal (None = semua)."""
+        for part in self.partitions.partitions_for_range(spreadsheet, date_from, date_to):
+            if part.location:
+                try:
+                    yield self.open_spreadsheet_by_name(spreadsheet, part.location).worksheet(part.title)
+                except _gspread().WorksheetNotFound:
+                    continue
+            elif part.status == STATUS_ACTIVE:
+                yield self.get_or_create_ws(spreadsheet, part.title)
+            else:
+                # partisi tertutup yang hilang tidak dibuat ulang kosong (datanya bukan di tab baru)
+                try:
+                    yield spreadsheet.worksheet(part.title)
+                except _gspread().WorksheetNotFound:
+                    print(f"Partisi Error: tab {part.title} tidak ditemukan")
+                    continue
+
+    def archive_partitions(self, force: bool = False) -> int:
+        """Arsipkan partisi tertutup (setelah rollover, atau semua kalau ``force``). Return jumlah tab."""
+        self.require_sheets("archive")
+        if not (force or self.partitions.archive_pending):
+            return 0
+        with self.use_gsheet() as sh, sheets_priority(PRIORITY_BACKGROUND):
+            return self.partitions.archive_closed(sh)
+
+    # ---------- Dropbox
+    def connect_dropbox(self):
+        """Buka 1 client Dropbox baru. Jangan dipanggil langsung; pakai ``use_dropbox()``."""
+        dropbox = lazy_import("dropbox")
+        cfg = self.secrets.get("dropbox", {})
+        session = dropbox.create_session(max_connections=2)
+
+        # refresh_token + app_key: token diperbarui otomatis oleh SDK (per client, tidak dibagi antar thread)
+        if cfg.get("refresh_token") and cfg.get("app_key"):
+            dbx = dropbox.Dropbox(
+                oauth2_refresh_token=cfg["refresh_token"],
+                app_key=cfg["app_key"],
+                app_secret=cfg.get("app_secret"),
+                session=session,
+            )
+        elif cfg.get("access_token"):
+            dbx = dropbox.Dropbox(cfg["access_token"], session=session)
+        else:
+            raise RuntimeError("Dropbox secrets tidak ditemukan: dropbox.access_token")
+
+        dbx.users_get_current_account()
+        return dbx
+
+    def use_dropbox(self):
+        """``with core.use_dropbox() as dbx:`` -> client Dropbox dari pool."""
+        return self._lease(self.dropbox_pool)
+
+    # ---------- rekap & export
+    def rekap(self, day: Optional[date] = None, metrics=None) -> Dict:
+        """Rekap hadir ``day`` (default hari ini): hanya partisi yang mencakup hari itu."""
+        day = day or self.now().date()
+        with self.storage.rekap_sources(day, metrics) as sources, maybe_span(metrics, "rekap.refresh"):
+            return self.rekap_store.refresh_sources(day.strftime("%d-%m-%Y"), sources)
+
+    def fetch_log(self, date_from: Optional[date] = None,
+                  date_to: Optional[date] = None) -> Tuple[List[str], List[List[str]]]:
+        """Log lengkap; kalau ``date_from``/``date_to`` diisi, hanya partisi & baris di rentang itu."""
+        return EXPORT_HEADER, self.storage.read_rows(date_from, date_to)
+
+    @property
+    def dropbox_index(self) -> DropboxIndex:
+        # dibuat saat pertama dipakai (file state bisa besar; app biasa tidak butuh)
+        with self._lock:
+            if self._dropbox_index is None:
+                self._dropbox_index = DropboxIndex(self.settings.dropbox_folder,
+                                                   self.state_path("dropbox_index.json"))
+            return self._dropbox_index
+
+    def _roster_fresh(self) -> bool:
+        return bool(self._roster_at) and (time.monotonic() - self._roster_at) < self.settings.roster_ttl_seconds
+
+    def roster(self, force: bool = False) -> Optional[Roster]:
+        """
+        Roster karyawan dari tab ``roster_sheet`` (dibaca sekali, di-cache ``roster_ttl_seconds``).
+        None kalau nonaktif / tab belum ada; kalau baca gagal, roster lama tetap dipakai.
+        """
+        s = self.settings
+        if not s.roster_sheet:
+            return None
+        if not force and self._roster_fresh():
+            return self._roster
+        with self._roster_load_lock:
+            # session lain mungkin baru saja memuat
+            if not force and self._roster_fresh():
+                return self._roster
+            try:
+                values = self.storage.read_table(s.roster_sheet)
+                self._roster = Roster.from_values(values) if values is not None else None
+            except Exception as e:
+                print(f"Roster Error: {e}")
+            self._roster_at = time.monotonic()
+            return self._roster
+
+    def arrivals(self, rekap: Optional[Dict] = None, day: Optional[date] = None,
+                 bin_minutes: Optional[int] = None) -> Dict:
+        """Histogram kedatangan dari hitungan per menit yang dibawa rekap (tanpa parse ulang timestamp)."""
+        rekap = rekap if rekap is not None else self.rekap(day)
+        hist = histogram(rekap.get("arrivals") or {}, bin_minutes or self.settings.arrival_bin_minutes,
+                         self.settings.checkin_seconds)
+        hist["today"] = rekap["today"]
+        return hist
+
+    def absentees(self, rekap: Optional[Dict] = None, day: Optional[date] = None) -> Optional[Dict]:
+        """
+        Yang belum hadir menurut roster (None kalau roster nonaktif). ``rekap`` dari
+        ``rekap()`` kalau sudah ada; hanya orang hadir baru yang diproses tiap panggilan.
+        """
+        roster = self.roster()
+        if roster is None:
+            return None
+        rekap = rekap if rekap is not None else self.rekap(day)
+        with self._lock:
+            tracker = self._absentees
+            # roster dimuat ulang / ganti hari -> mulai lagi dari roster penuh
+            if tracker is None or tracker.roster is not roster or tracker.day != rekap["today"]:
+                tracker = self._absentees = AbsenteeTracker(roster, rekap["today"])
+            tracker.update(rekap["all_people"])
+            return tracker.summary()
+
+    @property
+    def thumb_cache(self) -> ThumbCache:
+        with self._lock:
+            if self._thumb_cache is None:
+                self._thumb_cache = ThumbCache(self.state_path("thumbs"),
+                                               int(self.settings.thumb_cache_mb * 1024 * 1024))
+            return self._thumb_cache
+
+    def thumbnails(self, paths: List[str]) -> Dict[str, bytes]:
+        """Thumbnail JPEG kecil per path selfie: dari cache disk, sisanya 1 batch call Dropbox per 25 file."""
+        cache = self.thumb_cache
+        out: Dict[str, bytes] = {}
+        missing = []
+        for p in dict.fromkeys(paths):
+            if not p or p == "-":
+                continue
+            data = cache.get(p)
+            if data is not None:
+                out[p] = data
+            elif not cache.recently_missed(p):
+                missing.append(p)
+        if missing:
+            got = self.storage.thumbnails(missing, self.settings.thumb_size)
+            for p in missing:
+                if p in got:
+                    cache.put(p, got[p])
+                    out[p] = got[p]
+                else:
+                    cache.note_miss(p)
+            cache.note_fetched(len(got))
+        return out
+
+    def reconcile(self, date_from: Optional[date] = None, date_to: Optional[date] = None,
+                  dropbox: bool = False, backfill: bool = False) -> Dict:
+        """
+        Cek konsistensi sheet (index partisi vs tab, isi tiap tab log). ``dropbox=True``:
+        bandingkan juga kolom Dropbox Path dengan isi folder selfie (file yatim / hilang).
+        ``backfill=True``: file yatim ditulis sebagai baris baru; selain itu tidak mengubah apa pun.
+        """
+        self.require_sheets("reconcile")
+        issues: List[Dict] = []
+        sheet_paths: Dict[str, Tuple] = {}
+        tabs = rows = 0
+        with self.use_gsheet() as sh, sheets_priority(PRIORITY_EXPORT):
+            parts = self.partitions.partitions_for_range(sh, date_from, date_to)
+            if self.settings.partition_mode != PARTITION_NONE:
+                titles = [ws.title for ws in sh.worksheets()]
+                issues += check_partitions(self.partitions.entries(sh, force=True), titles,
+                                           self.settings.worksheet_name)
+            for part in parts:
+                try:
+                    src = self.open_spreadsheet_by_name(sh, part.location) if part.location else sh
+                    ws = src.worksheet(part.title)
+                except _gspread().WorksheetNotFound:
+                    # tab utama yang hilang sudah dilaporkan check_partitions
+                    if part.location or self.settings.partition_mode == PARTITION_NONE:
+                        issues.append(issue(TAB_MISSING, part.title, None, part.location or "spreadsheet utama"))
+                    continue
+                values = ws.get_all_values()
+                tabs += 1
+                rows += max(0, len(values) - 1)
+                entry = part if self.settings.partition_mode != PARTITION_NONE else None
+                issues += check_rows(part.title, values, SHEET_COLUMNS, entry, date_from, date_to)
+                for idx, r in enumerate(values[1:], start=2):
+                    path = str(r[5]).strip() if len(r) > 5 else ""
+                    if path and path != "-":
+                        sheet_paths[path.lower()] = (part.title, idx, parse_ts_date(r[0]), path)
+
+        result = {"tabs": tabs, "rows": rows, "issues": issues}
+        if dropbox:
+            with self.use_dropbox() as dbx:
+                result["dropbox"] = self.dropbox_index.sync(dbx)
+            found = diff_dropbox(sheet_paths, self.dropbox_index.files, date_from, date_to)
+            if backfill:
+                result["backfilled"] = self.backfill_orphans([i for i in found if i["kind"] == ORPHAN_FILE])
+            issues += found
+        return result
+
+    def backfill_orphans(self, orphans: List[Dict]) -> int:
+        """
+        Tulis baris log untuk selfie yatim (upload sukses, tulis baris gagal). Nama & waktu
+        dari path file, Posisi = BACKFILL_MARK. Return jumlah baris ditulis.
+        """
+        self.require_sheets("backfill")
+        written = 0
+        with self.use_gsheet() as sh, self.use_dropbox() as dbx, sheets_priority(PRIORITY_BACKGROUND):
+            ws = self.get_write_ws(sh, self.now())
+            for it in orphans:
+                path = it["detail"]
+                parsed = parse_selfie_path(path)
+                if parsed is None:
+                    continue
+                nama, ts = parsed[0].replace("_", " "), parsed[1]
+                url = shared_link_url(dbx, path)
+                row = self.append_log_row(ws, [ts.strftime("%d-%m-%Y %H:%M:%S"), nama, "-", BACKFILL_MARK,
+                                               make_hyperlink(url), path])
+                it["detail"] = f"{path} -> backfill {ws.title}!{row}"
+                written += 1
+        with self._lock:
+            self.rows_written += written
+        if written:
+            self.note_rows_changed()
+        return written
+
+    def migrate_dropbox_layout(self, layout: Optional[str] = None, batch_size: int = 500, dry_run: bool = False,
+                               relink: bool = False, progress=None) -> Dict:
+        """
+        Pindahkan selfie lama ke ``layout`` (default ``settings.dropbox_layout``) per batch
+        ``files_move_batch_v2``, lalu tulis ulang kolom Dropbox Path (dan link kalau kosong
+        atau ``relink``) di semua tab log. Aman dijalankan ulang: yang sudah pindah dilewati.
+        """
+        self.require_sheets("migrate-layout")
+        layout = resolve_layout(layout or self.settings.dropbox_layout)
+        root = self.settings.dropbox_folder
+        batch_size = max(1, min(int(batch_size), MOVE_BATCH_MAX))
+        journal = MoveJournal(self.state_path("layout_migration.json"))
+
+        result = {"layout": layout, "rows": 0, "files": 0, "moved": 0, "rows_updated": 0, "skipped": 0,
+                  "failed": {}}
+        with self.use_gsheet() as sh, sheets_priority(PRIORITY_BACKGROUND):
+            # old_lower -> (old, new); rows: (ws, baris, old_lower, formula link)
+            moves: Dict[str, Tuple[str, str]] = {}
+            rows: List[Tuple] = []
+            for ws in self.iter_log_ws(sh):
+                cells = ws.get("E:F", value_render_option="FORMULA") or []
+                for idx, r in enumerate(cells[1:], start=2):
+                    link, path = [str(v).strip() for v in (list(r) + ["", ""])[:2]]
+                    if not path or path == "-":
+                        continue
+                    result["rows"] += 1
+                    new = target_path(path, root, layout)
+                    if new is None or new == path:
+                        result["skipped"] += 1
+                        continue
+                    moves.setdefault(path.lower(), (path, new))
+                    rows.append((ws, idx, path.lower(), link))
+            result["files"] = len(moves)
+            if dry_run:
+                result["sample"] = [list(v) for v in list(moves.values())[:10]]
+                return result
+
+            rows_by_old: Dict[str, List[Tuple]] = {}
+            for row in rows:
+                rows_by_old.setdefault(row[2], []).append(row)
+
+            keys = list(moves)
+            with self.use_dropbox() as dbx:
+                for start in range(0, len(keys), batch_size):
+                    batch = keys[start:start + batch_size]
+                    pending = [k for k in batch if journal.moved.get(k) != moves[k][1]]
+                    errors = move_batch(dbx, [moves[k] for k in pending]) if pending else []
+                    ok = [k for k in batch if k not in pending]
+                    for k, err in zip(pending, errors):
+                        if err is None:
+                            ok.append(k)
+                        else:
+                            result["failed"][moves[k][0]] = err
+                    journal.record([moves[k] for k in ok])
+                    result["moved"] += len(ok)
+
+                    # tulis ulang sheet per worksheet (1 batch_update per tab per batch file)
+                    updates: Dict[int, Tuple] = {}
+                    for k in ok:
+                        new = moves[k][1]
+                        url = None
+                        for ws, idx, _, link in rows_by_old.get(k, []):
+                            data = updates.setdefault(ws.id, (ws, []))[1]
+                            data.append({"range": f"F{idx}", "values": [[new]]})
+                            if relink or not extract_hyperlink_url(link):
+                                url = url or shared_link_url(dbx, new)
+                                data.append({"range": f"E{idx}", "values": [[make_hyperlink(url)]]})
+                    for ws, data in updates.values():
+                        ws.batch_update(data, value_input_option="USER_ENTERED")
+                        result["rows_updated"] += sum(1 for d in data if d["range"].startswith("F"))
+                    if progress:
+                        progress(min(start + batch_size, len(keys)), len(keys))
+        return result
+
+    def export_table(self, scope: str, day: Optional[date] = None, date_from: Optional[date] = None,
+                     date_to: Optional[date] = None, metrics=None) -> Tuple[str, str, List[str], List[List[str]], Optional[int]]:
+        """Tabel export ``scope`` "rekap" / "belum_hadir" / "kedatangan" / "log" -> (nama dasar file, nama sheet, header, baris, kolom hyperlink)."""
+        ts_tag = self.now().strftime("%Y-%m-%d_%H-%M")
+        if scope == "rekap":
+            rekap = self.rekap(day)
+            header, rows = build_export_rekap_today(rekap)
+            base = f"rekap_hadir_{rekap['today'].replace('-', '')}_{ts_tag}"
+            return base, "Rekap Hari Ini", header, rows, None
+        if scope == "kedatangan":
+            hist = self.arrivals(day=day)
+            header, rows = build_export_arrivals(hist)
+            base = f"kedatangan_{hist['today'].replace('-', '')}_{hist['bin_minutes']}m_{ts_tag}"
+            return base, "Pola Kedatangan", header, rows, None
+        if scope == "belum_hadir":
+            summary = self.absentees(day=day)
+            if summary is None:
+                raise RuntimeError(f"Roster tidak tersedia (tab '{self.settings.roster_sheet}' tidak ada / nonaktif)")
+            header, rows = build_export_absentees(summary)
+            base = f"belum_hadir_{summary['today'].replace('-', '')}_{ts_tag}"
+            return base, "Belum Hadir", header, rows, None
+
+        with maybe_span(metrics, "export.fetch_log"):
+            header, rows = self.fetch_log(date_from, date_to)
+        base = f"log_absensi_{ts_tag}"
+        if date_from or date_to:
+            lo = f"{date_from:%Y%m%d}" if date_from else ""
+            hi = f"{date_to:%Y%m%d}" if date_to else ""
+            base = f"log_absensi_{lo}-{hi}_{ts_tag}"
+        # hyperlink_col = kolom "Bukti Selfie (URL)" => index 5 (karena ada kolom "No" di depan)
+        return base, "Log Absensi", header, rows, 5
+
+    @staticmethod
+    def render_export(sheet: str, header: List[str], rows: List[List[str]], hyperlink_col: Optional[int],
+                      formats: Tuple[str, ...], metrics=None) -> Dict[str, bytes]:
+        files = {}
+        for fmt in formats:
+            with maybe_span(metrics, f"export.{fmt}", rows=len(rows)):
+                if fmt == "xlsx":
+                    files[fmt] = make_xlsx_bytes(sheet, header, rows, hyperlink_col=hyperlink_col,
+                                                 top_header_lines=EXPORT_TOP_HEADER_LINES)
+                elif fmt == "csv":
+                    files[fmt] = make_csv_bytes(header, rows)
+                elif fmt == "parquet":
+                    files[fmt] = make_parquet_bytes(header, rows)
+                else:
+                    raise ValueError(f"format export tidak dikenal: {fmt}")
+        return files
+
+    def export_files(self, scope: str, formats: Tuple[str, ...] = ("xlsx", "csv"), day: Optional[date] = None,
+                     date_from: Optional[date] = None, date_to: Optional[date] = None,
+                     metrics=None) -> Tuple[str, Dict[str, bytes], int]:
+        """
+        File export ``scope`` "rekap" / "belum_hadir" / "kedatangan" (hari ``day``) atau "log" (rentang opsional).
+        Return (nama dasar file, {format: bytes}, jumlah baris); nama sama dengan tombol di app.
+        """
+        base, sheet, header, rows, hyperlink_col = self.export_table(scope, day, date_from, date_to, metrics)
+        return base, self.render_export(sheet, header, rows, hyperlink_col, formats, metrics), len(rows)
+
+    def evidence_path(self, date_from: date, date_to: date) -> str:
+        # nama tetap per rentang -> klik / jalankan ulang melanjutkan arsip yang sama
+        return self.state_path("bundles", f"bukti_absensi_{date_from:%Y%m%d}-{date_to:%Y%m%d}.zip")
+
+    def export_evidence(self, date_from: date, date_to: date, out_path: Optional[str] = None,
+                        workers: Optional[int] = None, progress=None, metrics=None) -> Dict:
+        """ZIP log (XLSX + CSV) + semua selfie di kolom Dropbox Path untuk rentang tanggal."""
+        _, sheet, header, rows, hyperlink_col = self.export_table("log", None, date_from, date_to, metrics)
+        tables = self.render_export(sheet, header, rows, hyperlink_col, ("xlsx", "csv"), metrics)
+        name = f"log_absensi_{date_from:%Y%m%d}-{date_to:%Y%m%d}"
+        col = header.index(COL_DBX_PATH)
+
+        with maybe_span(metrics, "export.evidence", rows=len(rows)):
+            return build_evidence_zip(
+                out_path or self.evidence_path(date_from, date_to),
+                {f"{name}.{fmt}": data for fmt, data in tables.items()},
+                [r[col] for r in rows if len(r) > col],
+                self.storage.downloader(),
+                workers=workers or self.settings.bundle_workers,
+                progress=progress,
+                root=self.settings.dropbox_folder,
+            )
@@ -0,0 +1,110 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from absensi.lazy import lazy_import
+from absensi.snapshot import load_json, write_json_atomic
+
+LIST_LIMIT = 2000
+
+
+class DropboxIndex:
+    """
+    Daftar file di bawah ``root`` Dropbox (rekursif), diperbarui inkremental:
+    run pertama ``files_list_folder`` penuh, run berikutnya cukup
+    ``files_list_folder_continue`` dari cursor tersimpan (hanya perubahan).
+    Cursor + daftar file disimpan atomic di ``state_path`` supaya job berikutnya
+    (proses lain / CLI) juga mulai dari delta.
+    """
+
+    def __init__(self, root: str, state_path: Optional[str] = None):
+        self.root = root.rstrip("/") or ""
+        self.state_path = state_path
+        self._lock = threading.Lock()
+        self.cursor: Optional[str] = None
+        self.files: Dict[str, Dict] = {}  # path_lower -> {"path", "size", "modified"}
+        self.synced_at: Optional[float] = None
+        self._load()
+
+    def _load(self):
+        if not self.state_path:
+            return
+        data = load_json(self.state_path)
+        # root berubah -> cursor lama tidak berlaku
+        if isinstance(data, dict) and data.get("root") == self.root:
+            self.cursor = data.get("cursor") or None
+            self.files = dict(data.get("files") or {})
+            self.synced_at = data.get("synced_at")
+
+    def _save(self):
+        if self.state_path:
+            write_json_atomic(self.state_path, {
+                "root": self.root,
+                "cursor": self.cursor,
+                "files": self.files,
+                "synced_at": self.synced_at,
+            })
+
+    def _apply(self, entries) -> Dict[str, int]:
+        files_mod = lazy_import("dropbox.files")
+        added = removed = 0
+        for e in entries:
+            if isinstance(e, files_mod.FileMetadata):
+                if e.path_lower not in self.files:
+                    added += 1
+                self.files[e.path_lower] = {
+                    "path": e.path_display,
+                    "size": int(e.size),
+                    "modified": e.server_modified.isoformat() if e.server_modified else "",
+                }
+            elif isinstance(e, files_mod.DeletedMetadata):
+                # bisa file atau folder: buang path itu dan semua isinya
+                prefix = e.path_lower.rstrip("/") + "/"
+                gone = [p for p in self.files if p == e.path_lower or p.startswith(prefix)]
+                for p in gone:
+                    del self.files[p]
+                removed += len(gone)
+        return {"added": added, "removed": removed}
+
+    def sync(self, dbx) -> Dict:
+        """Perbarui daftar file. Return statistik (mode full/delta, halaman, file tambah/hapus)."""
+        ApiError = lazy_import("dropbox.exceptions").ApiError
+        with self._lock:
+            t0 = time.monotonic()
+            mode = "delta" if self.cursor else "full"
+            try:
+                if self.cursor:
+                    res = dbx.files_list_folder_continue(self.cursor)
+                else:
+                    res = dbx.files_list_folder(self.root, recursive=True, limit=LIST_LIMIT)
+            except ApiError as e:
+                err = getattr(e, "error", None)
+                reset = err is not None and hasattr(err, "is_reset") and err.is_reset()
+                if not (self.cursor and reset):
+                    raise
+                # cursor kedaluwarsa (mis. folder dipindah) -> scan ulang penuh
+                self.cursor, self.files, mode = None, {}, "full"
+                res = dbx.files_list_folder(self.root, recursive=True, limit=LIST_LIMIT)
+            if mode == "full":
+                self.files = {}
+
+            stats = {"added": 0, "removed": 0}
+            pages = 0
+            while True:
+                pages += 1
+                for k, v in self._apply(res.entries).items():
+                    stats[k] += v
+                self.cursor = res.cursor
+                if not res.has_more:
+                    break
+                res = dbx.files_list_folder_continue(res.cursor)
+
+            self.synced_at = time.time()
+            self._save()
+            return {
+                "mode": mode,
+                "pages": pages,
+                "files": len(self.files),
+                "seconds": round(time.monotonic() - t0, 3),
+                **stats,
+            }
@@ -0,0 +1,293 @@
+import csv
+import io
+import re
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from absensi.lazy import lazy_import, optional_import
+from absensi.partitions import parse_ts_date
+
+HYPERLINK_RE = re.compile(r'=HYPERLINK\("(?P<url>.*?)"\s*,\s*"(?P<label>.*?)"\)', re.IGNORECASE)
+
+SCOPE_REKAP = "Rekap Hari Ini (dedup)"
+SCOPE_LOG = "Log Lengkap (semua data)"
+SCOPE_ARRIVALS = "Pola Kedatangan (per interval)"
+SCOPE_EVIDENCE = "Bukti Audit (ZIP log + selfie)"
+SCOPE_ABSENTEES = "Belum Hadir (roster)"
+
+
+def export_scopes(admin: bool, roster: bool = False) -> List[str]:
+    """Pilihan "Download Rekap". ZIP bukti (semua selfie) & daftar belum hadir hanya dengan admin_key."""
+    scopes = [SCOPE_REKAP, SCOPE_LOG, SCOPE_ARRIVALS]
+    if admin:
+        scopes.append(SCOPE_EVIDENCE)
+        if roster:
+            scopes.append(SCOPE_ABSENTEES)
+    return scopes
+
+
+def make_hyperlink(url: str, label: str = "Bukti Foto") -> str:
+    if not url or url == "-":
+        return "-"
+    safe = url.replace('"', '""')
+    return f'=HYPERLINK("{safe}", "{label}")'
+
+
+def extract_hyperlink_url(formula_or_value: str) -> str:
+    s = str(formula_or_value or "").strip()
+    if not s:
+        return ""
+    m = HYPERLINK_RE.match(s)
+    if not m:
+        if s.startswith("http://") or s.startswith("https://"):
+            return s
+        return ""
+    url = m.group("url").replace('""', '"')
+    return url
+
+
+def make_csv_bytes(header: List[str], rows: List[List[str]]) -> bytes:
+    """
+    CSV rapi untuk Excel Indonesia:
+    - delimiter ';'
+    - tambah baris pertama 'sep=;' agar Excel auto-parse
+    - encoding utf-8-sig agar aman untuk Excel
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter=";", quoting=csv.QUOTE_MINIMAL)
+    buf.write("sep=;\n")
+    writer.writerow(header)
+    for r in rows:
+        writer.writerow(r)
+    return buf.getvalue().encode("utf-8-sig")
+
+
+def make_parquet_bytes(header: List[str], rows: List[List[str]]) -> bytes:
+    """Parquet (semua kolom string) untuk analisis di pandas / DuckDB. Butuh pandas + pyarrow."""
+    pd = optional_import("pandas")
+    if pd is None or (optional_import("pyarrow") is None and optional_import("fastparquet") is None):
+        raise RuntimeError("Export parquet butuh 'pandas' dan 'pyarrow' (pip install pandas pyarrow)")
+    df = pd.DataFrame([(list(r) + [""] * len(header))[: len(header)] for r in rows], columns=header, dtype=str)
+    out = io.BytesIO()
+    df.to_parquet(out, index=False)
+    return out.getvalue()
+
+
+def make_xlsx_bytes(
+    sheet_name: str,
+    header: List[str],
+    rows: List[List[str]],
+    hyperlink_col: Optional[int] = None,
+    top_header_lines: Optional[List[str]] = None,
+) -> bytes:
+    openpyxl = optional_import("openpyxl")
+    if openpyxl is None:
+        raise RuntimeError("openpyxl belum terpasang. Tambahkan 'openpyxl' ke requirements.txt")
+    Workbook = openpyxl.Workbook
+    styles = lazy_import("openpyxl.styles")
+    Font, Alignment, PatternFill = styles.Font, styles.Alignment, styles.PatternFill
+    get_column_letter = lazy_import("openpyxl.utils").get_column_letter
+
+    top_header_lines = top_header_lines or []
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = sheet_name[:31]
+
+    n_cols = len(header)
+
+    # --- Styles
+    title_font = Font(bold=True, size=18, color="0A2540")
+    subtitle_font = Font(bold=True, size=12, color="0A2540")
+    center = Alignment(horizontal="center", vertical="center", wrap_text=True)
+
+    header_fill = PatternFill("solid", fgColor="EAF3FF")
+    header_font = Font(bold=True, color="0A2540")
+    header_align = Alignment(horizontal="center", vertical="center", wrap_text=True)
+
+    body_align = Alignment(vertical="top", wrap_text=True)
+
+    current_row = 0
+
+    # --- Top header (3 baris) + merge A..last
+    if top_header_lines:
+        for i, line in enumerate(top_header_lines, start=1):
+            ws.append([line] + [""] * (n_cols - 1))
+            current_row += 1
+
+            ws.merge_cells(start_row=current_row, start_column=1, end_row=current_row, end_column=n_cols)
+            c = ws.cell(row=current_row, column=1)
+            c.alignment = center
+            c.font = title_font if i == 1 else subtitle_font
+
+            ws.row_dimensions[current_row].height = 26 if i == 1 else 18
+
+        # spacer row
+        ws.append([""] * n_cols)
+        current_row += 1
+        ws.row_dimensions[current_row].height = 8
+
+    # --- Table header (kolom-kolom)
+    ws.append(header)
+    current_row += 1
+    table_header_row = current_row
+
+    for col_idx in range(1, n_cols + 1):
+        c = ws.cell(row=table_header_row, column=col_idx)
+        c.fill = header_fill
+        c.font = header_font
+        c.alignment = header_align
+
+    ws.row_dimensions[table_header_row].height = 20
+
+    # Freeze sampai baris header tabel
+    data_start_row = table_header_row + 1
+    ws.freeze_panes = f"A{data_start_row}"
+
+    # --- Data rows
+    for r in rows:
+        ws.append(r)
+
+    # --- Body alignment
+    for row in ws.iter_rows(min_row=data_start_row, max_row=ws.max_row, min_col=1, max_col=n_cols):
+        for cell in row:
+            cell.alignment = body_align
+
+    # --- Hyperlink handling (kolom URL)
+    if hyperlink_col is not None and 0 <= hyperlink_col < len(header):
+        col_excel = hyperlink_col + 1
+        for row_idx in range(data_start_row, ws.max_row + 1):
+            cell = ws.cell(row=row_idx, column=col_excel)
+            url = str(cell.value or "").strip()
+            if url.startswith("http://") or url.startswith("https://"):
+                cell.value = "Bukti Foto"
+                cell.hyperlink = url
+                cell.font = Font(color="0B66E4", underline="single")
+
+    # --- Column widths
+    preset_widths = {}
+    for i, col_name in enumerate(header):
+        name = col_name.lower().strip()
+        if name in ("no", "nomor"):
+            preset_widths[i + 1] = 6
+        elif "timestamp" in name:
+            preset_widths[i + 1] = 20
+        elif "nama" in name:
+            preset_widths[i + 1] = 24
+        elif "no hp" in name or "wa" in name:
+            preset_widths[i + 1] = 16
+        elif "posisi" in name:
+            preset_widths[i + 1] = 18
+        elif "dropbox" in name:
+            preset_widths[i + 1] = 46
+        elif "bukti" in name or "selfie" in name:
+            preset_widths[i + 1] = 18
+        else:
+            preset_widths[i + 1] = 18
+
+    for col_idx, w in preset_widths.items():
+        ws.column_dimensions[get_column_letter(col_idx)].width = w
+
+    out = io.BytesIO()
+    wb.save(out)
+    return out.getvalue()
+
+
+# ✅ Export rekap hari ini: sudah ada kolom "No"
+def build_export_rekap_today(rekap: Dict) -> Tuple[List[str], List[List[str]]]:
+    header = ["No", "Timestamp", "Nama", "No HP/WA", "Posisi"]
+    rows = []
+    for i, p in enumerate(rekap.get("all_people", []), start=1):
+        rows.append([
+            str(i),
+            str(p.get("Timestamp", "")),
+            str(p.get("Nama", "")),
+            str(p.get("No HP/WA", "")),
+            str(p.get("Posisi", "")),
+        ])
+    return header, rows
+
+
+# ✅ FIX Timestamp export:
+# - A:D ambil FORMATTED_VALUE (biar Timestamp tidak jadi 46082.xxx)
+# - E ambil FORMULA (biar bisa ekstrak URL HYPERLINK)
+# - F ambil FORMATTED_VALUE
+def fetch_log_rows(ws) -> List[List[str]]:
+    # A:D formatted
+    try:
+        ad = ws.get("A:D", value_render_option="FORMATTED_VALUE")
+    except TypeError:
+        ad = ws.get("A:D")
+
+    # E formula
+    try:
+        e_col = ws.get("E:E", value_render_option="FORMULA")
+    except TypeError:
+        e_col = ws.get("E:E")
+
+    # F formatted
+    try:
+        f_col = ws.get("F:F", value_render_option="FORMATTED_VALUE")
+    except TypeError:
+        f_col = ws.get("F:F")
+
+    if not ad or len(ad) < 2:
+        return []
+
+    max_len = max(len(ad), len(e_col) if e_col else 0, len(f_col) if f_col else 0)
+
+    rows = []
+    for i in range(1, max_len):  # start from data row (skip header)
+        row_ad = ad[i] if i < len(ad) else []
+        row_e = e_col[i] if (e_col and i < len(e_col)) else []
+        row_f = f_col[i] if (f_col and i < len(f_col)) else []
+
+        row_ad = (row_ad + [""] * 4)[:4]
+        ts, nama, hp, pos = row_ad
+
+        bukti_formula = (row_e[0] if row_e else "") or ""
+        dbx_path = (row_f[0] if row_f else "") or ""
+
+        url = extract_hyperlink_url(bukti_formula)
+        bukti_out = url if url else ""
+
+        if not (
+            str(ts).strip()
+            or str(nama).strip()
+            or str(hp).strip()
+            or str(pos).strip()
+            or str(bukti_out).strip()
+            or str(dbx_path).strip()
+        ):
+            continue
+
+        rows.append([
+            str(ts).strip(),
+            str(nama).strip(),
+            str(hp).strip(),
+            str(pos).strip(),
+            str(bukti_out).strip(),
+            str(dbx_path).strip(),
+        ])
+    return rows
+
+
+def collect_log_rows(
+    worksheets: Iterable,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> List[List[str]]:
+    """Baris log dari semua ``worksheets`` (filter rentang tanggal opsional), diberi nomor urut."""
+    rows = []
+    for ws in worksheets:
+        for r in fetch_log_rows(ws):
+            if date_from or date_to:
+                d = parse_ts_date(r[0])
+                if d is None or (date_from and d < date_from) or (date_to and d > date_to):
+                    continue
+            rows.append(r)
+
+    numbered_rows = []
+    for idx, r in enumerate(rows, start=1):
+        numbered_rows.append([str(idx)] + r)
+    return numbered_rows
@@ -0,0 +1,226 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from absensi.metrics import maybe_span
+from absensi.snapshot import load_json, write_bytes_atomic, write_json_atomic
+
+# build(kind) -> (nama dasar file, {format: bytes}, jumlah baris)
+BuildFn = Callable[[str], Tuple[str, Dict[str, bytes], int]]
+
+
+class ExportSnapshots:
+    """
+    File export (mis. "rekap" & "log", XLSX + CSV) dibuat ulang di background
+    thread tiap ``interval`` detik, atau lebih cepat kalau sudah ada
+    ``min_new_rows`` baris baru (``counter()``) dan snapshot terakhir lebih tua
+    dari ``min_gap`` detik. Hasil disimpan atomic di ``out_dir`` sehingga
+    tombol download cukup membaca file terakhir.
+
+    ``refresh(kind, max_age)`` untuk permintaan manual: 1 lock per kind, jadi
+    admin yang klik bersamaan menunggu 1 pembuatan yang sama, bukan masing-masing
+    membaca log penuh. ``day_fn()`` dicatat di metadata (rekap hanya valid hari itu).
+
+    ``shared`` (``absensi.shared_cache``, opsional): file + metadata juga disimpan di
+    cache bersama dan pembuatan dikunci lintas replica -> 1 replica yang membuat,
+    replica lain menyalin hasilnya ke ``out_dir`` sendiri.
+
+    ``busy()`` (opsional) True selama ada submit jalan / antre: putaran background
+    dilewati (snapshot yang sudah ada tetap dipakai), ``refresh`` manual tidak.
+    Thread hanya jalan setelah ``start()``; tanpa itu objek ini cukup untuk ``refresh``.
+    """
+
+    def __init__(
+        self,
+        out_dir: str,
+        build: BuildFn,
+        kinds: Iterable[str] = ("rekap", "log"),
+        interval: float = 300.0,
+        min_new_rows: int = 50,
+        min_gap: float = 60.0,
+        poll: float = 5.0,
+        counter: Optional[Callable[[], int]] = None,
+        day_fn: Optional[Callable[[], str]] = None,
+        metrics=None,
+        thread_hook: Optional[Callable] = None,
+        shared=None,
+        busy: Optional[Callable[[], bool]] = None,
+    ):
+        self.out_dir = out_dir
+        self.build = build
+        self.kinds = list(kinds)
+        self.interval = max(10.0, float(interval))
+        self.min_new_rows = int(min_new_rows)
+        self.min_gap = max(0.0, float(min_gap))
+        self.poll = max(0.5, float(poll))
+        self.counter = counter
+        self.day_fn = day_fn
+        self.metrics = metrics
+        self.thread_hook = thread_hook
+        self.shared = shared
+        self.busy = busy
+        self.deferred = 0  # putaran background yang dilewati karena ada submit
+
+        self._locks = {k: threading.Lock() for k in self.kinds}
+        self._errors: Dict[str, Dict] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _meta_path(self, kind: str) -> str:
+        return os.path.join(self.out_dir, f"{kind}.json")
+
+    def _pull_shared(self, kind: str):
+        # snapshot buatan replica lain lebih baru -> salin ke out_dir lokal
+        smeta = self.shared.get_json(f"export:{kind}:meta")
+        if not isinstance(smeta, dict) or not smeta.get("files"):
+            return
+        local = load_json(self._meta_path(kind))
+        if isinstance(local, dict) and float(local.get("generated_at", 0)) >= float(smeta.get("generated_at", 0)):
+            return
+        for fmt, name in smeta["files"].items():
+            data = self.shared.get(f"export:{kind}:{fmt}")
+            if data is None:
+                return
+            write_bytes_atomic(os.path.join(self.out_dir, name), data)
+        write_json_atomic(self._meta_path(kind), smeta)
+
+    def latest(self, kind: str, day: Optional[str] = None) -> Optional[Dict]:
+        """Metadata snapshot terakhir (+ ``age`` detik & path file), None kalau belum ada / beda hari."""
+        if self.shared is not None:
+            try:
+                self._pull_shared(kind)
+            except Exception as e:
+                print(f"Export Snapshot Error ({kind}): {e}")
+        meta = load_json(self._meta_path(kind))
+        if not isinstance(meta, dict) or not meta.get("files"):
+            return None
+        if day is not None and meta.get("day") != day:
+            return None
+        meta["age"] = max(0.0, time.time() - float(meta.get("generated_at", 0)))
+        meta["paths"] = {fmt: os.path.join(self.out_dir, name) for fmt, name in meta["files"].items()}
+        return meta
+
+    def read(self, meta: Dict, fmt: str) -> Optional[bytes]:
+        try:
+            with open(meta["paths"][fmt], "rb") as f:
+                return f.read()
+        except (OSError, KeyError):
+            return None
+
+    def _generate(self, kind: str) -> Dict:
+        count = self.counter() if self.counter else 0
+        t0 = time.monotonic()
+        with maybe_span(self.metrics, "export.snapshot", kind=kind):
+            base, files, rows = self.build(kind)
+        names = {}
+        for fmt, data in files.items():
+            names[fmt] = f"{kind}.{fmt}"
+            write_bytes_atomic(os.path.join(self.out_dir, names[fmt]), data)
+        meta = {
+            "kind": kind,
+            "base": base,
+            "day": self.day_fn() if self.day_fn else "",
+            "rows": rows,
+            "files": names,
+            "generated_at": time.time(),
+            "seconds": round(time.monotonic() - t0, 3),
+            "count": count,
+        }
+        write_json_atomic(self._meta_path(kind), meta)
+        if self.shared is not None:
+            # file dulu, metadata terakhir: replica lain tidak melihat meta tanpa file
+            for fmt, data in files.items():
+                self.shared.set(f"export:{kind}:{fmt}", data)
+            self.shared.set_json(f"export:{kind}:meta", meta)
+        self._errors.pop(kind, None)
+        return self.latest(kind)
+
+    def refresh(self, kind: str, max_age: float = 0.0) -> Dict:
+        """Snapshot ``kind`` yang umurnya <= ``max_age`` detik; buat baru kalau tidak ada."""
+        with self._locks[kind]:
+            meta = self.latest(kind, self.day_fn() if self.day_fn else None)
+            if meta is not None and meta["age"] <= max_age:
+                return meta
+            if self.shared is None:
+                return self._generate(kind)
+            with self.shared.locked(f"export:{kind}:build", ttl=600.0, wait=300.0):
+                # replica lain mungkin baru selesai membuat
+                meta = self.latest(kind, self.day_fn() if self.day_fn else None)
+                if meta is not None and meta["age"] <= max_age:
+                    return meta
+                return self._generate(kind)
+
+    def _due(self, kind: str) -> bool:
+        meta = self.latest(kind, self.day_fn() if self.day_fn else None)
+        if meta is None:
+            return True
+        if meta["age"] >= self.interval:
+            return True
+        if self.counter is None or self.min_new_rows <= 0 or meta["age"] < self.min_gap:
+            return False
+        new_rows = self.counter() - int(meta.get("count", 0))
+        return new_rows >= self.min_new_rows
+
+    def tick(self):
+        if self.busy is not None and self.busy():
+            # check-in didahulukan: build XLSX + baca log penuh menunggu sampai sepi
+            self.deferred += 1
+            return
+        for kind in self.kinds:
+            lock = self._locks[kind]
+            # sedang dibuat oleh permintaan manual -> lewati putaran ini
+            if not lock.acquire(blocking=False):
+                continue
+            try:
+                if self._due(kind):
+                    if self.shared is None:
+                        self._generate(kind)
+                    else:
+                        # replica lain sedang membuat -> lewati, hasilnya disalin di putaran berikut
+                        with self.shared.locked(f"export:{kind}:build", ttl=600.0) as got:
+                            if got and self._due(kind):
+                                self._generate(kind)
+            except Exception as e:
+                self._errors[kind] = {"error": str(e)[:300], "at": time.time()}
+                print(f"Export Snapshot Error ({kind}): {e}")
+            finally:
+                lock.release()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.tick()
+            self._stop.wait(self.poll)
+
+    def start(self) -> "ExportSnapshots":
+        if self._thread is not None:
+            return self
+        t = threading.Thread(target=self._run, name="export-snapshots", daemon=True)
+        if self.thread_hook is not None:
+            try:
+                self.thread_hook(t)
+            except Exception:
+                pass
+        t.start()
+        self._thread = t
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and not self._stop.is_set()
+
+    def status(self) -> Dict:
+        out = {}
+        for kind in self.kinds:
+            meta = self.latest(kind)
+            out[kind] = {
+                "rows": meta["rows"] if meta else None,
+                "age_s": round(meta["age"], 1) if meta else None,
+                "build_s": meta["seconds"] if meta else None,
+                "new_rows": (self.counter() - int(meta.get("count", 0))) if self.counter and meta else None,
+                **self._errors.get(kind, {}),
+            }
+        return out
@@ -0,0 +1,37 @@
+import io
+from typing import Tuple
+
+from absensi.lazy import optional_import
+
+
+def optimize_image_bytes(img_bytes: bytes, ext: str, max_side: int = 1280, quality: int = 78) -> Tuple[bytes, str]:
+    """Perkecil & kompres foto ke JPEG; kalau Pillow tidak ada / gagal, bytes asli dikembalikan."""
+    Image = optional_import("PIL.Image")
+    ImageOps = optional_import("PIL.ImageOps")
+    if Image is None or ImageOps is None:
+        return img_bytes, ext
+    try:
+        img = Image.open(io.BytesIO(img_bytes))
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "L"):
+            bg = Image.new("RGB", img.size, (255, 255, 255))
+            if img.mode in ("RGBA", "LA"):
+                bg.paste(img, mask=img.split()[-1])
+            else:
+                bg.paste(img)
+            img = bg
+        else:
+            img = img.convert("RGB")
+
+        w, h = img.size
+        longest = max(w, h)
+        if longest > max_side:
+            scale = max_side / float(longest)
+            new_size = (max(1, int(w * scale)), max(1, int(h * scale)))
+            img = img.resize(new_size, Image.LANCZOS)
+
+        out = io.BytesIO()
+        img.save(out, format="JPEG", quality=quality, optimize=True, progressive=True)
+        return out.getvalue(), ".jpg"
+    except Exception:
+        return img_bytes, ext
@@ -0,0 +1,81 @@
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from absensi.lazy import lazy_import
+from absensi.selfie import TS_FILE_FMT, parse_selfie_path, selfie_path
+from absensi.snapshot import load_json, write_json_atomic
+
+MOVE_BATCH_MAX = 1000  # batas entries files_move_batch_v2
+
+
+def target_path(path: str, root: str, layout: str) -> Optional[str]:
+    """Path baru untuk selfie ``path`` di ``layout``; None kalau bukan file app / di luar ``root``."""
+    path = str(path or "").strip()
+    if not path.lower().startswith(root.rstrip("/").lower() + "/"):
+        return None
+    parsed = parse_selfie_path(path)
+    if parsed is None:
+        return None
+    name, ts, ext = parsed
+    return selfie_path(root.rstrip("/"), name, ts.strftime(TS_FILE_FMT), ext, layout)
+
+
+class MoveJournal:
+    """
+    Catatan file yang sudah dipindah (old_lower -> new). Kalau proses mati setelah
+    move tapi sebelum sheet diperbarui, run berikutnya cukup menulis ulang sheet.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        data = load_json(path) if path else None
+        self.moved: Dict[str, str] = dict(data or {})
+
+    def record(self, pairs: Sequence[Tuple[str, str]]):
+        for old, new in pairs:
+            self.moved[old.lower()] = new
+        if self.path:
+            write_json_atomic(self.path, self.moved)
+
+
+def _moved_or(dbx, new: str, error: str) -> Optional[str]:
+    # sumber sudah tidak ada tapi tujuan ada -> sudah dipindah (run sebelumnya / sebelum job gagal)
+    try:
+        dbx.files_get_metadata(new)
+        return None
+    except Exception:
+        return error
+
+
+def move_batch(dbx, pairs: Sequence[Tuple[str, str]], poll: float = 1.0, timeout: float = 600.0) -> List[Optional[str]]:
+    """
+    Pindah banyak file dengan 1 ``files_move_batch_v2`` (tunggu job async kalau perlu).
+    Return per pasangan: None = sukses, selain itu pesan error. Job yang gagal
+    total langsung dilaporkan per pasangan (file yang sempat pindah tetap sukses).
+    """
+    files = lazy_import("dropbox.files")
+    launch = dbx.files_move_batch_v2([files.RelocationPath(a, b) for a, b in pairs], autorename=False)
+    if launch.is_complete():
+        result = launch.get_complete()
+    else:
+        job_id = launch.get_async_job_id()
+        deadline = time.monotonic() + timeout
+        while True:
+            status = dbx.files_move_batch_check_v2(job_id)
+            if status.is_complete():
+                result = status.get_complete()
+                break
+            if getattr(status, "is_failed", None) is not None and status.is_failed():
+                error = f"files_move_batch_v2 job {job_id} gagal: {status.get_failed()}"[:200]
+                return [_moved_or(dbx, new, error) for _, new in pairs]
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"files_move_batch_v2 job {job_id} belum selesai setelah {timeout:.0f}s")
+            time.sleep(poll)
+
+    out: List[Optional[str]] = []
+    for (_, new), entry in zip(pairs, result.entries):
+        if entry.is_success():
+            out.append(None)
+        else:
+            out.append(_moved_or(dbx, new, str(entry.get_failure())[:200]))
+    return out
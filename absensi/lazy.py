@@ -0,0 +1,56 @@
+import importlib
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+# modul -> detik untuk import pertama di proses ini (hanya yang lewat lazy_import)
+IMPORT_TIMES: Dict[str, float] = {}
+_lock = threading.Lock()
+_startup: Dict[str, float] = {}
+
+
+def lazy_import(name: str):
+    """Import modul saat pertama dipakai dan catat lamanya."""
+    mod = sys.modules.get(name)
+    if mod is not None:
+        return mod
+    with _lock:
+        t0 = time.perf_counter()
+        mod = importlib.import_module(name)
+        IMPORT_TIMES.setdefault(name, time.perf_counter() - t0)
+    return mod
+
+
+def optional_import(name: str):
+    """Seperti ``lazy_import`` tapi return None kalau paket tidak terpasang."""
+    try:
+        return lazy_import(name)
+    except Exception:
+        return None
+
+
+def loaded(name: str) -> bool:
+    return name in sys.modules
+
+
+def record_startup(seconds: float, budget_ms: float) -> Optional[str]:
+    """
+    Simpan waktu import awal script (sekali per proses). Return pesan warning
+    kalau melebihi ``budget_ms``, selain itu None.
+    """
+    with _lock:
+        if "imports" in _startup:
+            return None
+        _startup["imports"] = seconds
+    ms = seconds * 1000.0
+    if budget_ms > 0 and ms > budget_ms:
+        return f"Import awal {ms:.0f} ms melebihi budget {budget_ms:.0f} ms"
+    return None
+
+
+def import_report() -> Dict:
+    return {
+        "startup_ms": round(_startup.get("imports", 0.0) * 1000.0, 1),
+        "lazy_ms": {k: round(v * 1000.0, 1) for k, v in sorted(IMPORT_TIMES.items())},
+    }
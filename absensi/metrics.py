@@ -0,0 +1,193 @@
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, List, Optional
+
+from absensi.snapshot import write_bytes_atomic
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile dari list yang sudah terurut."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def _label(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+class _Series:
+    def __init__(self, window: int):
+        self.values = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+
+
+class LatencyRecorder:
+    """
+    Timing per tahap (span) untuk pipeline submit / rekap / export, plus nilai
+    lain seperti ukuran foto. Menyimpan ``window`` sampel terakhir per nama
+    untuk p50/p95/p99, dan bisa:
+      - menulis 1 baris JSON per span (``log_json``) ke stdout,
+      - menulis format teks Prometheus ke ``textfile`` (untuk textfile collector
+        node_exporter) paling sering tiap ``textfile_interval`` detik.
+    """
+
+    def __init__(
+        self,
+        window: int = 2048,
+        log_json: bool = False,
+        textfile: Optional[str] = None,
+        textfile_interval: float = 15.0,
+        extra_gauges: Optional[Callable[[], Dict]] = None,
+    ):
+        self.window = max(16, int(window))
+        self.log_json = log_json
+        self.textfile = textfile
+        self.textfile_interval = float(textfile_interval)
+        self.extra_gauges = extra_gauges
+
+        self._lock = threading.Lock()
+        self._spans: Dict[str, _Series] = {}
+        self._values: Dict[str, _Series] = {}
+        self._written_at = 0.0
+
+    def _series(self, table: Dict[str, _Series], name: str) -> _Series:
+        s = table.get(name)
+        if s is None:
+            s = table[name] = _Series(self.window)
+        return s
+
+    def record(self, name: str, seconds: float, ok: bool = True, **fields):
+        with self._lock:
+            s = self._series(self._spans, name)
+            s.values.append(seconds)
+            s.count += 1
+            s.total += seconds
+            if not ok:
+                s.errors += 1
+        if self.log_json:
+            line = {"ts": round(time.time(), 3), "event": "span", "stage": name,
+                    "ms": round(seconds * 1000.0, 2), "ok": ok}
+            line.update(fields)
+            print(json.dumps(line, ensure_ascii=False), flush=True)
+        self._maybe_write_textfile()
+
+    def observe(self, name: str, value: float, **fields):
+        """Catat nilai non-waktu (mis. ukuran foto dalam byte)."""
+        with self._lock:
+            s = self._series(self._values, name)
+            s.values.append(float(value))
+            s.count += 1
+            s.total += float(value)
+        if self.log_json:
+            line = {"ts": round(time.time(), 3), "event": "value", "name": name, "value": value}
+            line.update(fields)
+            print(json.dumps(line, ensure_ascii=False), flush=True)
+
+    @contextmanager
+    def span(self, name: str, **fields):
+        t0 = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            self.record(name, time.perf_counter() - t0, ok=ok, **fields)
+
+    # ---------- laporan
+    @staticmethod
+    def _summarize(name: str, s: _Series, scale: float = 1.0) -> Dict:
+        vals = sorted(s.values)
+        row = {"name": name, "count": s.count, "errors": s.errors}
+        for q in QUANTILES:
+            row[f"p{int(q * 100)}"] = round(percentile(vals, q) * scale, 2)
+        row["max"] = round((vals[-1] if vals else 0.0) * scale, 2)
+        return row
+
+    def summary(self) -> Dict[str, List[Dict]]:
+        """p50/p95/p99 per span (ms) dan per nilai (unit asli)."""
+        with self._lock:
+            spans = [self._summarize(n, s, 1000.0) for n, s in sorted(self._spans.items())]
+            values = [self._summarize(n, s) for n, s in sorted(self._values.items())]
+        return {"spans_ms": spans, "values": values}
+
+    def prometheus_text(self) -> str:
+        lines = [
+            "# HELP absensi_stage_seconds Durasi tiap tahap pipeline (window terakhir).",
+            "# TYPE absensi_stage_seconds summary",
+        ]
+        with self._lock:
+            spans = [(n, sorted(s.values), s.count, s.total, s.errors) for n, s in sorted(self._spans.items())]
+            values = [(n, sorted(s.values), s.count, s.total) for n, s in sorted(self._values.items())]
+
+        for name, vals, count, total, _ in spans:
+            for q in QUANTILES:
+                lines.append(f'absensi_stage_seconds{{stage="{_label(name)}",quantile="{q}"}} {percentile(vals, q):.6f}')
+            lines.append(f'absensi_stage_seconds_count{{stage="{_label(name)}"}} {count}')
+            lines.append(f'absensi_stage_seconds_sum{{stage="{_label(name)}"}} {total:.6f}')
+
+        lines.append("# HELP absensi_stage_errors_total Jumlah span yang gagal.")
+        lines.append("# TYPE absensi_stage_errors_total counter")
+        for name, _, _, _, errors in spans:
+            lines.append(f'absensi_stage_errors_total{{stage="{_label(name)}"}} {errors}')
+
+        lines.append("# HELP absensi_value Nilai terukur lain (mis. ukuran foto, byte).")
+        lines.append("# TYPE absensi_value summary")
+        for name, vals, count, total in values:
+            for q in QUANTILES:
+                lines.append(f'absensi_value{{name="{_label(name)}",quantile="{q}"}} {percentile(vals, q):.1f}')
+            lines.append(f'absensi_value_count{{name="{_label(name)}"}} {count}')
+            lines.append(f'absensi_value_sum{{name="{_label(name)}"}} {total:.1f}')
+
+        if self.extra_gauges is not None:
+            try:
+                gauges = self.extra_gauges()
+            except Exception:
+                gauges = {}
+            if gauges:
+                lines.append("# TYPE absensi_gauge gauge")
+            for key, val in sorted(gauges.items()):
+                lines.append(f'absensi_gauge{{name="{_label(key)}"}} {float(val)}')
+        return "\n".join(lines) + "\n"
+
+    def _maybe_write_textfile(self):
+        if not self.textfile:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._written_at < self.textfile_interval:
+                return
+            self._written_at = now
+        try:
+            # temp file tanpa akhiran .prom -> tidak terbaca collector sebelum di-rename
+            write_bytes_atomic(self.textfile, self.prometheus_text().encode("utf-8"))
+        except Exception as e:
+            print(f"Metrics Textfile Error: {e}")
+
+
+def maybe_span(metrics: Optional[LatencyRecorder], name: str, **fields):
+    """``metrics.span(...)`` kalau recorder ada, selain itu no-op (dipakai modul yang metrics-nya opsional)."""
+    return metrics.span(name, **fields) if metrics is not None else nullcontext()
+
+
+def flatten_numeric(prefix: str, data: Dict) -> Dict[str, float]:
+    """{'read': {'calls': 3}} -> {'prefix_read_calls': 3} (hanya angka)."""
+    out: Dict[str, float] = {}
+    for k, v in (data or {}).items():
+        key = f"{prefix}_{k}"
+        if isinstance(v, dict):
+            out.update(flatten_numeric(key, v))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[key] = v
+    return out
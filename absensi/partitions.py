@@ -0,0 +1,296 @@
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, List, Optional, Tuple
+
+from absensi.lazy import lazy_import
+
+PARTITION_NONE = "none"
+PARTITION_MONTH = "month"
+PARTITION_ROWS = "rows"
+
+ARCHIVE_NONE = "none"
+ARCHIVE_TAB = "tab"
+ARCHIVE_SPREADSHEET = "spreadsheet"
+
+STATUS_ACTIVE = "aktif"
+STATUS_CLOSED = "tutup"
+STATUS_ARCHIVED = "arsip"
+
+INDEX_HEADER = ["Tab", "Lokasi", "Mulai", "Selesai", "Status"]
+DATE_FMT = "%d-%m-%Y"
+
+
+def _gspread():
+    return lazy_import("gspread")
+
+
+def _find_ws(spreadsheet, title: str):
+    try:
+        return spreadsheet.worksheet(title)
+    except _gspread().WorksheetNotFound:
+        return None
+
+
+def parse_ts_date(ts: str) -> Optional[date]:
+    """'09-01-2026 08:15:00' / '09-01-2026' -> date(2026, 1, 9)."""
+    s = str(ts or "").strip()[:10]
+    try:
+        return datetime.strptime(s, DATE_FMT).date()
+    except Exception:
+        return None
+
+
+def _fmt(d: Optional[date]) -> str:
+    return d.strftime(DATE_FMT) if d else ""
+
+
+def month_bounds(d: date) -> Tuple[date, date]:
+    start = d.replace(day=1)
+    nxt = (start + timedelta(days=32)).replace(day=1)
+    return start, nxt - timedelta(days=1)
+
+
+class PartitionEntry:
+    def __init__(self, title: str, location: str = "", start: Optional[date] = None,
+                 end: Optional[date] = None, status: str = STATUS_ACTIVE):
+        self.title = title
+        self.location = location  # "" = spreadsheet utama, selain itu nama spreadsheet arsip
+        self.start = start
+        self.end = end
+        self.status = status
+
+    def overlaps(self, start: Optional[date], end: Optional[date]) -> bool:
+        if start and self.end and self.end < start:
+            return False
+        if end and self.start and self.start > end:
+            return False
+        return True
+
+    def to_row(self) -> List[str]:
+        return [self.title, self.location, _fmt(self.start), _fmt(self.end), self.status]
+
+    @classmethod
+    def from_row(cls, row: List[str]) -> "PartitionEntry":
+        row = (list(row) + [""] * 5)[:5]
+        return cls(
+            title=str(row[0]).strip(),
+            location=str(row[1]).strip(),
+            start=parse_ts_date(row[2]),
+            end=parse_ts_date(row[3]),
+            status=str(row[4]).strip() or STATUS_CLOSED,
+        )
+
+
+class PartitionManager:
+    """
+    Partisi tab Log per bulan atau per jumlah baris, plus arsip partisi lama.
+
+    Daftar partisi disimpan di tab index kecil (``_Partisi``) di spreadsheet
+    utama, jadi reader cukup membaca tab yang rentang tanggalnya overlap dengan
+    range yang diminta. Mode ``none`` = perilaku lama (1 tab ``base_title``).
+
+    ``ensure_ws(spreadsheet, title)`` membuat/menyiapkan tab log (header dsb),
+    ``open_archive(spreadsheet)`` membuka spreadsheet arsip (mode arsip ``spreadsheet``).
+    Rollover hanya menandai ``archive_pending``; ``archive_closed`` dijalankan di
+    luar jalur submit (thread warm-up / ``python -m absensi archive``).
+    """
+
+    def __init__(
+        self,
+        base_title: str,
+        mode: str = PARTITION_NONE,
+        max_rows: int = 50000,
+        archive_mode: str = ARCHIVE_NONE,
+        archive_keep: int = 1,
+        archive_name: str = "",
+        index_title: str = "_Partisi",
+        ensure_ws: Optional[Callable] = None,
+        open_archive: Optional[Callable] = None,
+        index_ttl: float = 60.0,
+    ):
+        self.base_title = base_title
+        self.mode = mode if mode in (PARTITION_MONTH, PARTITION_ROWS) else PARTITION_NONE
+        self.max_rows = max(1, int(max_rows))
+        self.archive_mode = archive_mode if archive_mode in (ARCHIVE_TAB, ARCHIVE_SPREADSHEET) else ARCHIVE_NONE
+        self.archive_keep = max(0, int(archive_keep))
+        self.archive_name = archive_name
+        self.index_title = index_title
+        self.ensure_ws = ensure_ws
+        self.open_archive = open_archive
+        self.index_ttl = float(index_ttl)
+
+        self._lock = threading.RLock()
+        self._entries: Optional[List[PartitionEntry]] = None
+        self._loaded_at = 0.0
+        self._rollover_pending = False
+        self.archive_pending = False
+
+    # ---------- index
+    def _index_ws(self, spreadsheet):
+        try:
+            return spreadsheet.worksheet(self.index_title)
+        except _gspread().WorksheetNotFound:
+            ws = spreadsheet.add_worksheet(title=self.index_title, rows=200, cols=len(INDEX_HEADER))
+            ws.update("A1", [INDEX_HEADER], value_input_option="RAW")
+            return ws
+
+    def entries(self, spreadsheet, force: bool = False) -> List[PartitionEntry]:
+        if self.mode == PARTITION_NONE:
+            return [PartitionEntry(self.base_title)]
+        with self._lock:
+            fresh = (time.monotonic() - self._loaded_at) <= self.index_ttl
+            if self._entries is not None and fresh and not force:
+                return list(self._entries)
+            values = self._index_ws(spreadsheet).get_all_values()
+            entries = [PartitionEntry.from_row(r) for r in values[1:] if r and str(r[0]).strip()]
+            if not entries:
+                entries = self._register_legacy(spreadsheet)
+            self._entries = entries
+            self._loaded_at = time.monotonic()
+            return list(entries)
+
+    def _save(self, spreadsheet, entries: List[PartitionEntry]):
+        ws = self._index_ws(spreadsheet)
+        rows = [INDEX_HEADER] + [e.to_row() for e in entries]
+        # kosongkan sisa baris lama (kalau index menyusut)
+        pad = max(0, len(ws.get_all_values()) - len(rows))
+        rows += [[""] * len(INDEX_HEADER)] * pad
+        ws.update("A1", rows, value_input_option="RAW")
+        self._entries = list(entries)
+        self._loaded_at = time.monotonic()
+
+    def _register_legacy(self, spreadsheet) -> List[PartitionEntry]:
+        """Tab lama (sebelum partisi aktif) didaftarkan sekali dengan rentang tanggal aslinya."""
+        try:
+            ws = spreadsheet.worksheet(self.base_title)
+        except _gspread().WorksheetNotFound:
+            return []
+        dates = [d for d in (parse_ts_date(v) for v in ws.col_values(1)[1:]) if d]
+        start = min(dates) if dates else None
+        end = max(dates) if dates else None
+        status = STATUS_ACTIVE if self.mode == PARTITION_ROWS else STATUS_CLOSED
+        entries = [PartitionEntry(self.base_title, "", start, end if status == STATUS_CLOSED else None, status)]
+        self._save(spreadsheet, entries)
+        return entries
+
+    # ---------- write path
+    def _month_title(self, d: date) -> str:
+        return f"{self.base_title}_{d.year:04d}_{d.month:02d}"
+
+    def _next_rows_title(self, entries: List[PartitionEntry]) -> str:
+        # nomor urut berikutnya, termasuk tab yang sudah di-rename Arsip_*
+        pat = re.compile(rf"(?:Arsip_)?{re.escape(self.base_title)}(?:_(\d+))?$")
+        n = 0
+        for e in entries:
+            m = pat.match(e.title)
+            if m:
+                n = max(n, int(m.group(1) or 1))
+        return f"{self.base_title}_{n + 1:03d}"
+
+    def write_title(self, spreadsheet, today: date) -> str:
+        """Nama tab tujuan tulis untuk ``today`` (rollover otomatis kalau perlu)."""
+        if self.mode == PARTITION_NONE:
+            return self.base_title
+
+        with self._lock:
+            entries = self.entries(spreadsheet)
+            active = [e for e in entries if e.status == STATUS_ACTIVE and not e.location]
+            current = active[-1] if active else None
+
+            if self.mode == PARTITION_MONTH:
+                want = self._month_title(today)
+                if current and current.title == want:
+                    return want
+                m_start, _ = month_bounds(today)
+                return self._rollover(spreadsheet, entries, current, want, m_start, today)
+
+            # PARTITION_ROWS
+            if current and not self._rollover_pending:
+                return current.title
+            self._rollover_pending = False
+            return self._rollover(spreadsheet, entries, current, self._next_rows_title(entries), today, today)
+
+    def _rollover(self, spreadsheet, entries, current, new_title, new_start, today) -> str:
+        # re-read supaya tidak double rollover dari replica lain
+        entries = self.entries(spreadsheet, force=True)
+        if any(e.title == new_title and e.status == STATUS_ACTIVE for e in entries):
+            return new_title
+
+        for e in entries:
+            if e.status == STATUS_ACTIVE and not e.location:
+                e.status = STATUS_CLOSED
+                if self.mode == PARTITION_MONTH and e.start:
+                    e.end = month_bounds(e.start)[1]
+                else:
+                    e.end = today
+
+        if self.ensure_ws is not None:
+            self.ensure_ws(spreadsheet, new_title)
+        entries.append(PartitionEntry(new_title, "", new_start, None, STATUS_ACTIVE))
+        self._save(spreadsheet, entries)
+        # arsip (copy / rename / hapus tab) tidak dijalankan di request check-in yang memicu rollover
+        self.archive_pending = self.archive_mode != ARCHIVE_NONE
+        return new_title
+
+    def note_written(self, title: str, row: int):
+        """Dipanggil setelah menulis baris ``row``: mode rows rollover saat penuh."""
+        if self.mode == PARTITION_ROWS and row - 1 >= self.max_rows:
+            with self._lock:
+                self._rollover_pending = True
+
+    # ---------- read path
+    def partitions_for_range(self, spreadsheet, start: Optional[date], end: Optional[date]) -> List[PartitionEntry]:
+        """Partisi yang overlap dengan [start, end] (None = tak terbatas)."""
+        return [e for e in self.entries(spreadsheet) if e.overlaps(start, end)]
+
+    # ---------- archive
+    def archive_closed(self, spreadsheet) -> int:
+        """Pindahkan partisi tertutup (selain ``archive_keep`` terakhir) ke arsip."""
+        if self.mode == PARTITION_NONE or self.archive_mode == ARCHIVE_NONE:
+            return 0
+
+        with self._lock:
+            entries = self.entries(spreadsheet, force=True)
+            closed = [e for e in entries if e.status == STATUS_CLOSED and not e.location]
+            to_archive = closed[: max(0, len(closed) - self.archive_keep)]
+            if not to_archive:
+                self.archive_pending = False
+                return 0
+
+            archive_sh = None
+            if self.archive_mode == ARCHIVE_SPREADSHEET:
+                if self.open_archive is None:
+                    return 0
+                archive_sh = self.open_archive(spreadsheet)
+
+            moved = 0
+            for e in to_archive:
+                if self.archive_mode == ARCHIVE_TAB:
+                    new_title = f"Arsip_{e.title}"
+                    ws = _find_ws(spreadsheet, e.title)
+                    if ws is not None:
+                        ws.update_title(new_title)
+                    elif _find_ws(spreadsheet, new_title) is None:
+                        raise RuntimeError(f"Tab partisi {e.title} tidak ditemukan")
+                    # ws None: sudah di-rename run sebelumnya, index belum sempat disimpan
+                    e.title = new_title
+                else:
+                    ws = _find_ws(spreadsheet, e.title)
+                    # sudah tersalin run sebelumnya -> jangan copy lagi ("Copy of ..." dobel)
+                    if _find_ws(archive_sh, e.title) is None:
+                        if ws is None:
+                            raise RuntimeError(f"Tab partisi {e.title} tidak ditemukan")
+                        res = ws.copy_to(archive_sh.id)
+                        archive_sh.get_worksheet_by_id(res["sheetId"]).update_title(e.title)
+                    if ws is not None:
+                        spreadsheet.del_worksheet(ws)
+                    e.location = self.archive_name
+                e.status = STATUS_ARCHIVED
+                moved += 1
+                # simpan per entry: kalau entry berikutnya gagal, index tetap menunjuk lokasi tab yang benar
+                self._save(spreadsheet, entries)
+
+            self.archive_pending = False
+            return moved
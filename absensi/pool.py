@@ -0,0 +1,180 @@
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+
+class PoolTimeout(RuntimeError):
+    pass
+
+
+# error yang berarti client / session HTTP-nya rusak -> jangan dikembalikan ke pool
+BROKEN_ERROR_NAMES = {
+    "AuthError", "RefreshError", "TransportError",
+    "ConnectionError", "ChunkedEncodingError", "ProtocolError", "RemoteDisconnected", "SSLError",
+}
+
+
+def is_broken_client_error(exc: BaseException) -> bool:
+    """Auth dicabut / token tidak bisa di-refresh / koneksi putus (nama class, tanpa import library)."""
+    if type(exc).__name__ in BROKEN_ERROR_NAMES:
+        return True
+    resp = getattr(exc, "response", None)
+    return getattr(resp, "status_code", None) == 401
+
+
+class ClientPool:
+    """
+    Pool kecil client API (gspread / Dropbox) untuk session Streamlit yang jalan
+    paralel. Client dibuat lazy sampai ``size``; tiap client hanya dipakai satu
+    thread dalam satu waktu (lease), jadi HTTP session keep-alive & refresh token
+    per client tidak pernah balapan.
+    """
+
+    def __init__(self, factory: Callable, size: int = 4, name: str = ""):
+        self._factory = factory
+        self.size = max(1, int(size))
+        self.name = name
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._leased = 0
+        self._waits = 0
+        self._discarded = set()
+
+    def _acquire(self, timeout: Optional[float]):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+        if can_create:
+            try:
+                return self._factory()
+            except BaseException:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        with self._lock:
+            self._waits += 1
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise PoolTimeout(f"Semua koneksi {self.name or 'pool'} sedang dipakai ({self.size}).")
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = 30.0):
+        client = self._acquire(timeout)
+        with self._lock:
+            self._leased += 1
+        try:
+            yield client
+        finally:
+            with self._lock:
+                self._leased -= 1
+                dropped = id(client) in self._discarded
+                if dropped:
+                    self._discarded.discard(id(client))
+                    self._created = max(0, self._created - 1)
+            if not dropped:
+                self._idle.put(client)
+
+    def discard(self, client):
+        """Tandai client (yang sedang di-lease) rusak, mis. token dicabut; tidak dikembalikan ke pool."""
+        with self._lock:
+            self._discarded.add(id(client))
+
+    def warm(self, n: Optional[int] = None) -> int:
+        """Isi pool sampai ``n`` client idle (default: size). Return jumlah dibuat."""
+        made = []
+        target = self.size if n is None else min(self.size, int(n))
+        while True:
+            with self._lock:
+                if self._created >= target:
+                    break
+                self._created += 1
+            try:
+                made.append(self._factory())
+            except BaseException:
+                with self._lock:
+                    self._created -= 1
+                raise
+        for c in made:
+            self._idle.put(c)
+        return len(made)
+
+    def _take_oldest(self):
+        # client idle paling lama tidak dipakai (dasar LifoQueue) = yang paling perlu di-ping
+        with self._idle.mutex:
+            return self._idle.queue.pop(0) if self._idle.queue else None
+
+    def each_idle(self, fn: Callable) -> int:
+        """
+        Panggil ``fn(client)`` untuk client idle (keep-alive ping), satu per satu:
+        hanya 1 client yang dipinjam dalam satu waktu dan langsung dikembalikan,
+        jadi submit tidak menunggu di belakang ping. Berhenti begitu ada client
+        yang di-lease (ada beban nyata, ping tidak perlu).
+
+        Client yang ping-nya gagal karena rusak (``is_broken_client_error``)
+        dibuang, bukan dikembalikan; error lain tidak menghentikan putaran.
+        Error pertama di-raise lagi setelah putaran selesai supaya tetap tercatat.
+        Return jumlah client yang berhasil di-ping.
+        """
+        done = 0
+        first_error: Optional[BaseException] = None
+        for _ in range(self._idle.qsize()):
+            with self._lock:
+                if self._leased > 0:
+                    break
+            client = self._take_oldest()
+            if client is None:
+                break
+            try:
+                fn(client)
+            except Exception as e:
+                first_error = first_error or e
+                if is_broken_client_error(e):
+                    with self._lock:
+                        self._created = max(0, self._created - 1)
+                    continue
+            else:
+                done += 1
+            # kembali ke atas tumpukan -> putaran berikutnya mengambil client lain
+            self._idle.put(client)
+        if first_error is not None:
+            raise first_error
+        return done
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": self.size,
+                "created": self._created,
+                "leased": self._leased,
+                "idle": self._idle.qsize(),
+                "waits": self._waits,
+            }
+
+
+def make_refresh_threadsafe(credentials):
+    """
+    Bungkus ``credentials.refresh`` dengan lock supaya banyak client yang
+    berbagi 1 objek credentials tidak refresh token bersamaan (race saat token
+    expired). Thread yang kalah cukup memakai token hasil refresh pertama.
+    """
+    lock = threading.Lock()
+    original = credentials.refresh
+
+    def refresh(request):
+        with lock:
+            if credentials.valid:
+                return
+            original(request)
+
+    credentials.refresh = refresh
+    return credentials
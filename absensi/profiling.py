@@ -0,0 +1,232 @@
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from absensi.lazy import optional_import
+
+ENGINE_AUTO = "auto"
+ENGINE_CPROFILE = "cprofile"
+ENGINE_PYINSTRUMENT = "pyinstrument"
+
+INDEX_FILE = "index.jsonl"
+
+
+def _short(path: str, root: str) -> str:
+    try:
+        rel = os.path.relpath(path, root)
+    except ValueError:
+        return path
+    return path if rel.startswith("..") else rel
+
+
+def _in_project(path: str, root: str) -> bool:
+    # builtin (mis. "~") tidak punya file .py
+    if not str(path or "").endswith(".py"):
+        return False
+    path = os.path.abspath(path)
+    return path.startswith(root + os.sep) and f"{os.sep}site-packages{os.sep}" not in path
+
+
+def cprofile_top(profile: cProfile.Profile, root: str, limit: int = 15) -> List[Dict]:
+    """Fungsi terberat (waktu kumulatif) yang berasal dari kode project ini."""
+    stats = pstats.Stats(profile)
+    rows = []
+    for (path, line, func), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+        if not _in_project(path, root):
+            continue
+        rows.append({
+            "func": f"{_short(path, root)}:{line}({func})",
+            "calls": ncalls,
+            "cum_ms": round(cumtime * 1000.0, 2),
+            "self_ms": round(tottime * 1000.0, 2),
+        })
+    rows.sort(key=lambda r: r["cum_ms"], reverse=True)
+    return rows[:limit]
+
+
+def pyinstrument_top(session, root: str, limit: int = 15) -> List[Dict]:
+    """Sama seperti ``cprofile_top`` tapi dari pohon sampel pyinstrument."""
+    frame = session.root_frame() if session is not None else None
+    agg: Dict[str, Dict] = {}
+
+    def walk(f, active):
+        path = getattr(f, "file_path", "") or ""
+        key = None
+        if _in_project(path, root):
+            key = f"{_short(path, root)}:{getattr(f, 'line_no', 0)}({f.function})"
+            row = agg.setdefault(key, {"func": key, "calls": 0, "cum_ms": 0.0, "self_ms": 0.0})
+            row["calls"] += 1
+            row["self_ms"] += f.total_self_time * 1000.0
+            # rekursi tidak dihitung dua kali untuk waktu kumulatif
+            if key not in active:
+                row["cum_ms"] += f.time * 1000.0
+        nxt = active | {key} if key else active
+        for child in f.children:
+            walk(child, nxt)
+
+    if frame is not None:
+        walk(frame, frozenset())
+    rows = sorted(agg.values(), key=lambda r: r["cum_ms"], reverse=True)[:limit]
+    for r in rows:
+        r["cum_ms"] = round(r["cum_ms"], 2)
+        r["self_ms"] = round(r["self_ms"], 2)
+    return rows
+
+
+class RerunProfiler:
+    """
+    Profil satu rerun script Streamlit ke folder ``out_dir`` (rotasi: hanya
+    ``keep`` profil terakhir yang disimpan).
+
+    Engine ``pyinstrument`` (sampling, kalau terpasang) menulis ``.html`` +
+    ``.speedscope.json``; ``cprofile`` (deterministik) menulis ``.prof`` yang
+    bisa dibuka snakeviz / flameprof / gprof2dot. Tiap rerun juga menambah
+    1 baris ringkasan (wall time + fungsi terberat) ke ``index.jsonl``.
+
+    Hanya 1 profiler boleh aktif per proses (cProfile 3.12+ dan pyinstrument
+    menolak yang kedua): rerun lain yang datang bersamaan jalan tanpa profil.
+    Profiling tidak pernah membuat halaman gagal.
+    """
+
+    def __init__(self, out_dir: str, keep: int = 50, engine: str = ENGINE_AUTO,
+                 root: Optional[str] = None, top: int = 15):
+        self.out_dir = out_dir
+        self.keep = max(1, int(keep))
+        self.engine = engine if engine in (ENGINE_CPROFILE, ENGINE_PYINSTRUMENT) else ENGINE_AUTO
+        self.root = os.path.abspath(root or os.getcwd())
+        self.top = int(top)
+        self.last: Optional[Dict] = None
+        self.skipped = 0
+        self._busy = threading.Lock()
+
+    def _engine(self) -> str:
+        if self.engine == ENGINE_CPROFILE:
+            return ENGINE_CPROFILE
+        if optional_import("pyinstrument") is not None:
+            return ENGINE_PYINSTRUMENT
+        return ENGINE_CPROFILE
+
+    def _start(self, engine: str):
+        if engine == ENGINE_PYINSTRUMENT:
+            prof = optional_import("pyinstrument").Profiler(interval=0.001)
+            prof.start()
+        else:
+            prof = cProfile.Profile()
+            prof.enable()
+        return prof
+
+    @contextmanager
+    def profile(self, label: str = "rerun"):
+        if not self._busy.acquire(blocking=False):
+            # session lain sedang diprofil -> rerun ini jalan biasa
+            self.skipped += 1
+            yield
+            return
+        try:
+            engine = self._engine()
+            prof = self._start(engine)
+        except Exception as e:
+            # mis. profiler lain (di luar app) sudah aktif
+            self._busy.release()
+            print(f"Profiler Error: {e}")
+            yield
+            return
+
+        stamp = time.strftime("%Y%m%d-%H%M%S") + f"-{int(time.time() * 1000) % 1000:03d}"
+        base = os.path.join(self.out_dir, f"{stamp}_{label}")
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - t0
+            try:
+                if engine == ENGINE_PYINSTRUMENT:
+                    session = prof.stop()
+                    files, top = self._dump_pyinstrument(prof, session, base)
+                else:
+                    prof.disable()
+                    files, top = self._dump_cprofile(prof, base)
+                self.last = {
+                    "ts": round(time.time(), 3),
+                    "label": label,
+                    "engine": engine,
+                    "wall_ms": round(wall * 1000.0, 2),
+                    "files": [os.path.basename(f) for f in files],
+                    "top": top,
+                }
+                self._append_index(self.last)
+                self._rotate()
+            except Exception as e:
+                print(f"Profiler Error: {e}")
+            finally:
+                self._busy.release()
+
+    def _dump_cprofile(self, prof, base: str):
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = base + ".prof"
+        prof.dump_stats(path)
+        return [path], cprofile_top(prof, self.root, self.top)
+
+    def _dump_pyinstrument(self, prof, session, base: str):
+        os.makedirs(self.out_dir, exist_ok=True)
+        files = []
+        html = base + ".html"
+        with open(html, "w", encoding="utf-8") as f:
+            f.write(prof.output_html())
+        files.append(html)
+        renderers = optional_import("pyinstrument.renderers")
+        speedscope = getattr(renderers, "SpeedscopeRenderer", None)
+        if speedscope is not None:
+            path = base + ".speedscope.json"
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(prof.output(renderer=speedscope()))
+            files.append(path)
+        return files, pyinstrument_top(session, self.root, self.top)
+
+    def _append_index(self, entry: Dict):
+        path = os.path.join(self.out_dir, INDEX_FILE)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+        # index ikut dirotasi supaya tidak tumbuh tanpa batas
+        with open(path, encoding="utf-8") as f:
+            lines = f.readlines()
+        if len(lines) > self.keep * 2:
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.writelines(lines[-self.keep:])
+            os.replace(tmp, path)
+
+    def _rotate(self):
+        runs: Dict[str, List[str]] = {}
+        for name in os.listdir(self.out_dir):
+            if name == INDEX_FILE or name.startswith("."):
+                continue
+            runs.setdefault(name.split(".", 1)[0], []).append(name)
+        for key in sorted(runs)[:-self.keep]:
+            for name in runs[key]:
+                try:
+                    os.remove(os.path.join(self.out_dir, name))
+                except OSError:
+                    pass
+
+    def recent(self, limit: int = 10) -> List[Dict]:
+        """Ringkasan rerun terakhir dari ``index.jsonl`` (terbaru dulu)."""
+        path = os.path.join(self.out_dir, INDEX_FILE)
+        try:
+            with open(path, encoding="utf-8") as f:
+                lines = f.readlines()[-limit:]
+        except OSError:
+            return []
+        out = []
+        for line in reversed(lines):
+            try:
+                out.append(json.loads(line))
+            except ValueError:
+                continue
+        return out
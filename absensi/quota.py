@@ -0,0 +1,276 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+# Angka kecil = didahulukan saat antre token
+PRIORITY_SUBMIT = 0
+PRIORITY_DEFAULT = 5
+PRIORITY_REKAP = 6
+PRIORITY_EXPORT = 8
+PRIORITY_BACKGROUND = 9
+
+READ = "read"
+WRITE = "write"
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+READ_METHODS = {
+    "acell", "batch_get", "cell", "col_values", "fetch_sheet_metadata", "get",
+    "get_all_records", "get_all_values", "get_values", "get_worksheet",
+    "get_worksheet_by_id", "row_values", "worksheet", "worksheets",
+}
+WRITE_METHODS = {
+    "add_cols", "add_rows", "add_worksheet", "append_row", "append_rows", "batch_clear",
+    "batch_update", "clear", "copy_to", "del_worksheet", "delete_rows", "format",
+    "insert_row", "insert_rows", "resize", "update", "update_acell", "update_cell",
+    "update_title", "values_update",
+}
+# write yang TIDAK aman diulang: 5xx / timeout bisa terjadi setelah server menerapkannya
+# (baris / tab dobel, hapus 2x) -> tidak di-retry, pemanggil cek state dulu sebelum mengulang.
+# Tulis ke range eksplisit (update, values_update, batch_update, format, resize, ...) aman diulang.
+NON_IDEMPOTENT_METHODS = {
+    "add_cols", "add_rows", "add_worksheet", "append_row", "append_rows", "copy_to",
+    "del_worksheet", "delete_rows", "insert_row", "insert_rows",
+}
+# method yang hasilnya worksheet -> ikut dibungkus
+WS_RETURNING = {"worksheet", "add_worksheet", "get_worksheet", "get_worksheet_by_id"}
+
+_local = threading.local()
+
+
+def current_priority() -> int:
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else PRIORITY_DEFAULT
+
+
+@contextmanager
+def sheets_priority(priority: int):
+    """Set prioritas antrean token untuk semua call Sheets di thread ini."""
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    stack.append(priority)
+    try:
+        yield
+    finally:
+        stack.pop()
+
+
+class TokenBucket:
+    """Token bucket dengan antrean prioritas (FIFO di dalam prioritas yang sama)."""
+
+    def __init__(self, rate_per_min: float, burst: int):
+        self.rate = max(0.01, float(rate_per_min)) / 60.0
+        self.capacity = max(1, int(burst))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._seq = itertools.count()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority: int = PRIORITY_DEFAULT) -> float:
+        """Ambil 1 token, blok sampai tersedia. Return lama menunggu (detik)."""
+        t0 = time.monotonic()
+        ticket = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    self._refill()
+                    if self._waiters[0] == ticket and self._tokens >= 1.0:
+                        self._tokens -= 1.0
+                        heapq.heappop(self._waiters)
+                        self._cond.notify_all()
+                        return time.monotonic() - t0
+                    if self._waiters[0] == ticket:
+                        self._cond.wait(timeout=max(0.005, (1.0 - self._tokens) / self.rate))
+                    else:
+                        self._cond.wait(timeout=0.5)
+            except BaseException:
+                if ticket in self._waiters:
+                    self._waiters.remove(ticket)
+                    heapq.heapify(self._waiters)
+                    self._cond.notify_all()
+                raise
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+
+def _status_of(exc: Exception) -> Optional[int]:
+    resp = getattr(exc, "response", None)
+    code = getattr(resp, "status_code", None)
+    if code is None:
+        code = getattr(exc, "code", None)
+    try:
+        return int(code) if code is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def is_rejected(exc: Exception) -> bool:
+    """429: request ditolak limiter sebelum diproses -> aman diulang, termasuk write non-idempotent."""
+    return _status_of(exc) == 429
+
+
+def is_retryable(exc: Exception) -> bool:
+    status = _status_of(exc)
+    if status is not None:
+        return status in RETRY_STATUS
+    # error jaringan (requests ConnectionError / Timeout) juga layak diulang
+    name = type(exc).__name__
+    return name in ("ConnectionError", "Timeout", "ReadTimeout", "ConnectTimeout", "ChunkedEncodingError")
+
+
+class SheetsScheduler:
+    """
+    Satu pintu untuk semua call Google Sheets: token bucket terpisah untuk
+    read/write (sesuai kuota per menit), prioritas submit > rekap > export,
+    retry 429/5xx dengan exponential backoff + jitter, dan metrik tunggu/retry.
+    """
+
+    def __init__(
+        self,
+        read_per_min: float = 60,
+        write_per_min: float = 60,
+        burst: int = 10,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 32.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.buckets = {
+            READ: TokenBucket(read_per_min, burst),
+            WRITE: TokenBucket(write_per_min, burst),
+        }
+        self.max_retries = max(0, int(max_retries))
+        self.base_delay = float(base_delay)
+        self.max_delay = float(max_delay)
+        self._sleep = sleep
+
+        self._mlock = threading.Lock()
+        self._metrics: Dict[str, Dict[str, float]] = {
+            kind: {"calls": 0, "waits": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0,
+                   "retries": 0, "errors": 0}
+            for kind in (READ, WRITE)
+        }
+        self._status_counts: Dict[str, int] = {}
+
+    def _backoff(self, attempt: int) -> float:
+        cap = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(cap / 2.0, cap)
+
+    def _record(self, kind: str, **inc):
+        with self._mlock:
+            m = self._metrics[kind]
+            for k, v in inc.items():
+                if k == "max_wait_seconds":
+                    m[k] = max(m[k], v)
+                else:
+                    m[k] += v
+
+    def call(self, kind: str, fn: Callable, *args, **kwargs):
+        """Call idempotent: diulang untuk 429 / 5xx / error jaringan."""
+        return self._call(kind, fn, args, kwargs, idempotent=True)
+
+    def call_once(self, kind: str, fn: Callable, *args, **kwargs):
+        """Call non-idempotent (append, add_worksheet, ...): hanya 429 yang diulang."""
+        return self._call(kind, fn, args, kwargs, idempotent=False)
+
+    def _call(self, kind: str, fn: Callable, args, kwargs, idempotent: bool):
+        bucket = self.buckets[kind]
+        priority = current_priority()
+        attempt = 0
+        while True:
+            waited = bucket.acquire(priority)
+            self._record(kind, calls=1, wait_seconds=waited, max_wait_seconds=waited,
+                         waits=1 if waited > 0.001 else 0)
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                status = _status_of(e)
+                if status is not None:
+                    with self._mlock:
+                        self._status_counts[str(status)] = self._status_counts.get(str(status), 0) + 1
+                retry = is_retryable(e) if idempotent else is_rejected(e)
+                if attempt >= self.max_retries or not retry:
+                    self._record(kind, errors=1)
+                    raise
+                self._record(kind, retries=1)
+                self._sleep(self._backoff(attempt))
+                attempt += 1
+
+    def metrics(self) -> Dict:
+        with self._mlock:
+            out = {kind: dict(m) for kind, m in self._metrics.items()}
+            out["status"] = dict(self._status_counts)
+        for kind, bucket in self.buckets.items():
+            out[kind]["queued"] = bucket.queued
+        return out
+
+
+class _Scheduled:
+    def __init__(self, target, scheduler: SheetsScheduler):
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_scheduler", scheduler)
+
+    def _wrap_result(self, name: str, result):
+        return result
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+        if name in READ_METHODS:
+            kind = READ
+        elif name in WRITE_METHODS:
+            kind = WRITE
+        else:
+            return attr
+
+        call = self._scheduler.call_once if name in NON_IDEMPOTENT_METHODS else self._scheduler.call
+
+        def scheduled(*args, **kwargs):
+            result = call(kind, attr, *args, **kwargs)
+            return self._wrap_result(name, result)
+
+        return scheduled
+
+    def __setattr__(self, name, value):
+        setattr(self._target, name, value)
+
+    def __repr__(self):
+        return f"<Scheduled {self._target!r}>"
+
+
+class ScheduledWorksheet(_Scheduled):
+    @property
+    def spreadsheet(self):
+        return ScheduledSpreadsheet(self._target.spreadsheet, self._scheduler)
+
+    @property
+    def unwrapped(self):
+        return self._target
+
+
+class ScheduledSpreadsheet(_Scheduled):
+    def _wrap_result(self, name: str, result):
+        if name in WS_RETURNING and result is not None:
+            return ScheduledWorksheet(result, self._scheduler)
+        if name == "worksheets":
+            return [ScheduledWorksheet(w, self._scheduler) for w in result]
+        return result
+
+    @property
+    def unwrapped(self):
+        return self._target
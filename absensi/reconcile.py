@@ -0,0 +1,146 @@
+import re
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from absensi.partitions import PartitionEntry
+from absensi.selfie import parse_selfie_path
+
+TS_FMT = "%d-%m-%Y %H:%M:%S"
+
+# jenis temuan
+TS_INVALID = "timestamp_invalid"
+FIELD_EMPTY = "field_kosong"
+DUPLICATE = "duplikat"
+OUT_OF_PARTITION = "di_luar_partisi"
+OUT_OF_ORDER = "urutan_waktu"
+BLANK_ROW = "baris_kosong"
+HEADER = "header"
+TAB_MISSING = "tab_hilang"
+TAB_UNLISTED = "tab_tak_terdaftar"
+ORPHAN_FILE = "file_yatim"  # ada di Dropbox, tidak ada barisnya di sheet
+MISSING_FILE = "file_hilang"  # Dropbox Path di sheet, filenya tidak ada
+
+# penanda baris hasil backfill (kolom Posisi) -> tidak dicek urutan waktunya
+BACKFILL_MARK = "(backfill)"
+
+
+def issue(kind: str, tab: str = "", row: Optional[int] = None, detail: str = "") -> Dict:
+    return {"kind": kind, "tab": tab, "row": row, "detail": detail}
+
+
+def _parse_ts(ts: str) -> Optional[datetime]:
+    try:
+        return datetime.strptime(str(ts or "").strip(), TS_FMT)
+    except ValueError:
+        return None
+
+
+def check_rows(
+    title: str,
+    values: List[List[str]],
+    expected_header: List[str],
+    part: Optional[PartitionEntry] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> List[Dict]:
+    """
+    Cek konsistensi isi 1 tab log (``values`` = get_all_values, termasuk header):
+    header, timestamp tidak valid / tidak urut, field wajib kosong, baris kosong
+    di tengah data (memutus high-water mark rekap), tanggal di luar rentang
+    partisi, dan duplikat No HP di hari yang sama.
+    """
+    issues: List[Dict] = []
+    if not values:
+        return [issue(HEADER, title, 1, "tab kosong")]
+    if [str(v).strip() for v in values[0][: len(expected_header)]] != expected_header:
+        issues.append(issue(HEADER, title, 1, f"header {values[0][: len(expected_header)]}"))
+
+    last_ts = None
+    blank_run: List[int] = []
+    seen: Dict[tuple, int] = {}
+    for idx, raw in enumerate(values[1:], start=2):
+        row = (list(raw) + [""] * 6)[:6]
+        ts_s, nama, hp, pos, link, path = [str(v).strip() for v in row]
+        if not any((ts_s, nama, hp, pos, link, path)):
+            blank_run.append(idx)
+            continue
+        if blank_run:
+            issues.append(issue(BLANK_ROW, title, blank_run[0], f"{len(blank_run)} baris kosong sebelum baris {idx}"))
+            blank_run = []
+
+        ts = _parse_ts(ts_s)
+        if ts is None:
+            issues.append(issue(TS_INVALID, title, idx, ts_s or "(kosong)"))
+        else:
+            d = ts.date()
+            if (date_from and d < date_from) or (date_to and d > date_to):
+                continue
+            if last_ts is not None and ts < last_ts and pos != BACKFILL_MARK:
+                issues.append(issue(OUT_OF_ORDER, title, idx, f"{ts_s} < {last_ts.strftime(TS_FMT)}"))
+            last_ts = max(ts, last_ts) if last_ts else ts
+            if part is not None and not part.overlaps(d, d):
+                issues.append(issue(OUT_OF_PARTITION, title, idx, ts_s))
+
+            key = (d, re.sub(r"\D", "", hp) or nama.lower())
+            if key in seen:
+                issues.append(issue(DUPLICATE, title, idx, f"sama dengan baris {seen[key]} ({nama})"))
+            else:
+                seen[key] = idx
+
+        empty = [name for name, v in (("Nama", nama), ("No HP/WA", hp), ("Posisi", pos),
+                                      ("Bukti Selfie", link if link != "-" else ""),
+                                      ("Dropbox Path", path)) if not v]
+        if empty:
+            issues.append(issue(FIELD_EMPTY, title, idx, ", ".join(empty)))
+    return issues
+
+
+def check_partitions(entries: Iterable[PartitionEntry], main_titles: Iterable[str], base_title: str) -> List[Dict]:
+    """Index partisi vs tab yang benar-benar ada di spreadsheet utama."""
+    entries = list(entries)
+    titles = set(main_titles)
+    issues = []
+    for e in entries:
+        if not e.location and e.title not in titles:
+            issues.append(issue(TAB_MISSING, e.title, None, f"terdaftar ({e.status}) tapi tab tidak ada"))
+    listed = {e.title for e in entries}
+    pat = re.compile(rf"^(?:Arsip_)?{re.escape(base_title)}(?:_\d+)*$")
+    for t in sorted(titles):
+        if pat.match(t) and t not in listed:
+            issues.append(issue(TAB_UNLISTED, t, None, "tab log tidak ada di index partisi"))
+    return issues
+
+
+def selfie_ts(path: str) -> Optional[datetime]:
+    """Waktu submit dari nama file selfie, None kalau bukan nama file buatan app."""
+    parsed = parse_selfie_path(path)
+    return parsed[1] if parsed else None
+
+
+def diff_dropbox(
+    sheet_paths: Dict[str, Tuple[str, int, Optional[date], str]],
+    files: Dict[str, Dict],
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> List[Dict]:
+    """
+    ``sheet_paths``: path_lower -> (tab, baris, tanggal baris, path); ``files``: isi
+    ``DropboxIndex.files``. File yatim hanya dilaporkan kalau tanggal di nama
+    filenya masuk rentang; file hilang hanya untuk baris di rentang.
+    """
+    def in_range(d: Optional[date]) -> bool:
+        if d is None:
+            return not (date_from or date_to)
+        return not ((date_from and d < date_from) or (date_to and d > date_to))
+
+    issues = []
+    for key, meta in sorted(files.items()):
+        if key in sheet_paths:
+            continue
+        ts = selfie_ts(key)
+        if in_range(ts.date() if ts else None):
+            issues.append(issue(ORPHAN_FILE, "", None, meta.get("path") or key))
+    for key, (tab, row, d, path) in sorted(sheet_paths.items(), key=lambda kv: (kv[1][0], kv[1][1])):
+        if key not in files and in_range(d):
+            issues.append(issue(MISSING_FILE, tab, row, path))
+    return issues
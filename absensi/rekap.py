@@ -0,0 +1,448 @@
+import difflib
+import re
+import threading
+import time
+from datetime import datetime
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from absensi.arrivals import ArrivalCounts
+from absensi.snapshot import load_json, write_json_atomic
+
+NO_POS = "(tanpa posisi)"
+SNAPSHOT_VERSION = 3
+
+# key di cache bersama antar replica (absensi.shared_cache)
+SHARED_STATE_KEY = "rekap:state"
+SHARED_REV_KEY = "rekap"
+SHARED_LOCK_KEY = "rekap:refresh"
+
+
+def sanitize_name(text: str) -> str:
+    text = str(text).strip()
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"[^A-Za-z0-9 _.-]", "", text)
+    return text.strip()
+
+
+def sanitize_phone(text: str) -> str:
+    text = str(text).strip()
+    if text.startswith("+"):
+        return "+" + re.sub(r"\D", "", text[1:])
+    return re.sub(r"\D", "", text)
+
+
+def normalize_posisi(text: str) -> str:
+    t = str(text or "").strip().lower()
+    t = t.replace("&", " dan ")
+    t = re.sub(r"[/,_\\-\\.]+", " ", t)
+    t = re.sub(r"[^a-z0-9\\s]+", " ", t)
+    t = re.sub(r"\\s+", " ", t).strip()
+    return t
+
+
+POSISI_ALIASES: Dict[str, str] = {
+    "spv": "supervisor",
+    "sup": "supervisor",
+    "super visor": "supervisor",
+    "supervisior": "supervisor",
+    "admin": "administrasi",
+    "adm": "administrasi",
+    "kry": "karyawan",
+    "karyawan": "karyawan",
+    "staf": "staff",
+    "staff": "staff",
+    "teknisi": "teknisi",
+    "technician": "teknisi",
+    "driver": "driver",
+    "drv": "driver",
+    "security": "security",
+    "satpam": "security",
+}
+
+
+def smart_canonical_posisi(raw_pos: str, known_canon: List[str]) -> str:
+    p = normalize_posisi(raw_pos)
+    if not p:
+        return ""
+    if p in POSISI_ALIASES:
+        p = POSISI_ALIASES[p]
+    if known_canon:
+        best = difflib.get_close_matches(p, known_canon, n=1, cutoff=0.88)
+        if best:
+            return best[0]
+    return p
+
+
+def display_posisi(canon: str) -> str:
+    if not canon:
+        return "-"
+    return " ".join(w.capitalize() for w in canon.split())
+
+
+def parse_date_prefix(ts: str) -> str:
+    s = str(ts or "").strip()
+    if not s:
+        return ""
+    try:
+        dt = datetime.strptime(s, "%d-%m-%Y %H:%M:%S")
+        return dt.strftime("%d-%m-%Y")
+    except Exception:
+        return s[:10]
+
+
+def _day_order(day: str) -> str:
+    # "dd-mm-YYYY" -> "YYYYmmdd" supaya bisa dibandingkan
+    d = str(day or "")
+    return d[6:10] + d[3:5] + d[0:2]
+
+
+def _group_contiguous_rows(rows: List[int]) -> List[Tuple[int, int]]:
+    if not rows:
+        return []
+    rows = sorted(rows)
+    ranges = []
+    start = prev = rows[0]
+    for r in rows[1:]:
+        if r == prev + 1:
+            prev = r
+        else:
+            ranges.append((start, prev))
+            start = prev = r
+    ranges.append((start, prev))
+    return ranges
+
+
+def read_rows_for_date(ws, day_str: str) -> Tuple[List[List[str]], int]:
+    """
+    Baca kolom A:F hanya untuk baris bertanggal ``day_str`` (dd-mm-YYYY).
+    Return (rows, jumlah baris terisi di kolom A) -> dipakai sebagai high-water mark.
+    """
+    ts_col = ws.col_values(1)
+    if not ts_col or len(ts_col) < 2:
+        return [], max(1, len(ts_col or []))
+
+    match_rows = []
+    for idx, ts in enumerate(ts_col[1:], start=2):
+        if parse_date_prefix(ts) == day_str:
+            match_rows.append(idx)
+
+    data = []
+    for a, b in _group_contiguous_rows(match_rows):
+        chunk = ws.get(f"A{a}:F{b}")
+        if chunk:
+            data.extend(chunk)
+    return data, len(ts_col)
+
+
+class RekapState:
+    """
+    Rekap 1 hari yang di-update inkremental: dedup key, tabel posisi kanonik,
+    daftar hadir, dan high-water mark (baris terakhir yang sudah diproses) per tab.
+    """
+
+    def __init__(self, day: str):
+        self.day = day
+        self.seen_keys = set()
+        self.dup_removed = 0
+        self.known_canon: List[str] = []
+        self.all_people: List[Dict] = []
+        self.people_by_pos: Dict[str, List[str]] = {}
+        self.arrivals = ArrivalCounts()
+        self.hwm: Dict[str, int] = {}
+
+    def add_row(self, r: List[str]) -> bool:
+        """Proses 1 baris A:F. Return True kalau menambah orang hadir baru."""
+        ts = (r[0] if len(r) > 0 else "") or ""
+        nama = (r[1] if len(r) > 1 else "") or ""
+        hp = (r[2] if len(r) > 2 else "") or ""
+        pos = (r[3] if len(r) > 3 else "") or ""
+        dbx_path = (r[5] if len(r) > 5 else "") or ""
+
+        if parse_date_prefix(ts) != self.day:
+            return False
+
+        nama_clean = sanitize_name(nama)
+        hp_clean = sanitize_phone(hp)
+        key = hp_clean if hp_clean else nama_clean.lower().strip()
+        if not key:
+            return False
+
+        self.arrivals.add_scan(ts)
+        if key in self.seen_keys:
+            self.dup_removed += 1
+            return False
+        self.seen_keys.add(key)
+
+        pos_canon = smart_canonical_posisi(pos, self.known_canon)
+        if pos_canon and pos_canon not in self.known_canon:
+            self.known_canon.append(pos_canon)
+
+        who = nama_clean if nama_clean else (hp_clean if hp_clean else "Tanpa Nama")
+        who_display = f"{who} ({hp_clean})" if hp_clean and who else who
+
+        self.all_people.append({
+            "Nama": who,
+            "No HP/WA": hp_clean or "-",
+            "Posisi": display_posisi(pos_canon) if pos_canon else "-",
+            "Timestamp": ts,
+            # untuk galeri selfie (tidak ikut tabel / export rekap)
+            "Dropbox Path": str(dbx_path).strip(),
+        })
+        self.people_by_pos.setdefault(pos_canon if pos_canon else NO_POS, []).append(who_display)
+        self.arrivals.add_arrival(ts, display_posisi(pos_canon) if pos_canon else "Tanpa Posisi")
+        return True
+
+    def to_rekap(self) -> Dict:
+        by_pos = []
+        for canon, people in self.people_by_pos.items():
+            by_pos.append({
+                "Posisi": display_posisi(canon) if canon != NO_POS else "Tanpa Posisi",
+                "Jumlah": len(people),
+                "Yang Hadir": ", ".join(people),
+            })
+        by_pos.sort(key=lambda x: (-x["Jumlah"], x["Posisi"].lower()))
+
+        return {
+            "today": self.day,
+            "total": len(self.seen_keys),
+            "dup_removed": self.dup_removed,
+            "by_pos": by_pos,
+            "all_people": list(self.all_people),
+            "arrivals": self.arrivals.to_dict(),
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            "day": self.day,
+            "seen_keys": sorted(self.seen_keys),
+            "dup_removed": self.dup_removed,
+            "known_canon": list(self.known_canon),
+            "all_people": list(self.all_people),
+            "people_by_pos": [[k, v] for k, v in self.people_by_pos.items()],
+            "arrivals": self.arrivals.to_dict(),
+            "hwm": dict(self.hwm),
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "RekapState":
+        st = cls(str(d["day"]))
+        st.seen_keys = set(d.get("seen_keys", []))
+        st.dup_removed = int(d.get("dup_removed", 0))
+        st.known_canon = list(d.get("known_canon", []))
+        st.all_people = list(d.get("all_people", []))
+        st.people_by_pos = {k: list(v) for k, v in d.get("people_by_pos", [])}
+        st.arrivals = ArrivalCounts.from_dict(d.get("arrivals"))
+        st.hwm = {str(k): int(v) for k, v in d.get("hwm", {}).items()}
+        return st
+
+
+class RekapStore:
+    """
+    Pemegang ``RekapState`` per proses. Refresh hanya membaca baris setelah
+    high-water mark tiap tab (``A{hwm+1}:F``); scan penuh hanya saat tab belum
+    dikenal atau tiap ``full_resync_seconds``. State disimpan ke snapshot JSON
+    (atomic) paling sering tiap ``snapshot_interval`` detik, dan dimuat saat
+    proses mulai supaya restart cukup mengejar baris baru saja.
+
+    ``live_day()`` (opsional) = hari berjalan (dd-mm-YYYY). Rekap hari lain (CLI
+    ``--date``, export tanggal lain) dibaca ke state sementara tanpa high-water
+    mark, jadi state hari ini, snapshot, dan state bersama tidak tersentuh.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        snapshot_path: Optional[str] = None,
+        snapshot_interval: float = 60.0,
+        full_resync_seconds: float = 1800.0,
+        shared=None,
+        shared_fresh: float = 30.0,
+        shared_wait: float = 15.0,
+        live_day: Optional[Callable[[], str]] = None,
+    ):
+        self.source = source
+        self.live_day = live_day
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = float(snapshot_interval)
+        self.full_resync_seconds = float(full_resync_seconds)
+        self.shared = shared
+        self.shared_fresh = float(shared_fresh)
+        self.shared_wait = float(shared_wait)
+        self._shared_at = 0.0
+        self._shared_rev = -1
+
+        self._lock = threading.RLock()
+        self._state: Optional[RekapState] = None
+        self._full_at = time.monotonic()
+        self._snap_at = 0.0
+        self._dirty = False
+        self.loaded_from_snapshot = False
+        self._load_snapshot()
+
+    # ---------- snapshot
+    def _load_snapshot(self):
+        if not self.snapshot_path:
+            return
+        data = load_json(self.snapshot_path)
+        if not data or data.get("version") != SNAPSHOT_VERSION or data.get("source") != self.source:
+            return
+        try:
+            self._state = RekapState.from_dict(data["state"])
+            self.loaded_from_snapshot = True
+        except Exception as e:
+            print(f"Snapshot Rekap Error: {e}")
+
+    def save_snapshot(self, force: bool = False) -> bool:
+        if not self.snapshot_path:
+            return False
+        with self._lock:
+            if self._state is None or not (self._dirty or force):
+                return False
+            if not force and (time.monotonic() - self._snap_at) < self.snapshot_interval:
+                return False
+            payload = {
+                "version": SNAPSHOT_VERSION,
+                "source": self.source,
+                "written_at": time.time(),
+                "state": self._state.to_dict(),
+            }
+            self._dirty = False
+            self._snap_at = time.monotonic()
+        try:
+            write_json_atomic(self.snapshot_path, payload)
+            return True
+        except Exception as e:
+            print(f"Snapshot Rekap Error: {e}")
+            return False
+
+    # ---------- refresh
+    def reset(self):
+        """Paksa scan penuh di refresh berikutnya."""
+        with self._lock:
+            self._state = None
+            self._full_at = time.monotonic()
+
+    @staticmethod
+    def read_ws_since(ws, day: str, hwm: Optional[int]) -> Tuple[List[List[str]], int]:
+        """Sumber rekap dari 1 worksheet: baris hari ``day`` (tab baru) atau ``A{hwm+1}:F``."""
+        if hwm is None:
+            return read_rows_for_date(ws, day)
+        rows = ws.get(f"A{hwm + 1}:F") or []
+        return rows, hwm + len(rows)
+
+    def _catch_up(self, state: RekapState, key: str, fetch: Callable) -> int:
+        rows, hwm = fetch(state.day, state.hwm.get(key))
+        for r in rows:
+            state.add_row(r)
+        state.hwm[key] = hwm
+        return len(rows)
+
+    def refresh(self, day: str, worksheets: Iterable) -> Dict:
+        return self.refresh_sources(day, ((ws.title, partial(self.read_ws_since, ws)) for ws in worksheets))
+
+    def refresh_sources(self, day: str, sources: Iterable[Tuple[str, Callable]]) -> Dict:
+        """
+        ``sources`` = (key high-water mark, ``fetch(day, hwm) -> (baris A:F, hwm baru)``);
+        ``hwm`` None = sumber belum dikenal (baca semua baris hari itu).
+        """
+        if self.live_day is not None and day != self.live_day():
+            return self._rekap_other_day(day, sources)
+        if self.shared is not None:
+            return self._refresh_shared(day, sources)
+        with self._lock:
+            rekap = self._apply_sources(day, sources)
+        self.save_snapshot()
+        return rekap
+
+    def _rekap_other_day(self, day: str, sources: Iterable[Tuple[str, Callable]]) -> Dict:
+        # hwm milik hari berjalan tidak berlaku untuk hari lain -> baca semua baris hari itu
+        state = RekapState(day)
+        for key, fetch in sources:
+            self._catch_up(state, key, fetch)
+        return state.to_rekap()
+
+    def _apply_sources(self, day: str, sources: Iterable[Tuple[str, Callable]]) -> Dict:
+        # dipanggil dengan self._lock
+        state = self._state
+        if state is not None and (time.monotonic() - self._full_at) > self.full_resync_seconds:
+            state = None
+            self._full_at = time.monotonic()
+        if state is None or state.day != day:
+            fresh = RekapState(day)
+            # ganti ke hari berikutnya: baris sebelum hwm pasti hari sebelumnya (log urut waktu)
+            if state is not None and _day_order(state.day) < _day_order(day):
+                fresh.hwm = dict(state.hwm)
+            state = fresh
+
+        for key, fetch in sources:
+            if self._catch_up(state, key, fetch):
+                self._dirty = True
+        self._state = state
+        return state.to_rekap()
+
+    # ---------- state bersama antar replica
+    def _pull_shared(self):
+        data = self.shared.get_json(SHARED_STATE_KEY)
+        if not data or data.get("version") != SNAPSHOT_VERSION or data.get("source") != self.source:
+            return
+        if float(data.get("at", 0)) <= self._shared_at:
+            return
+        try:
+            self._state = RekapState.from_dict(data["state"])
+        except Exception as e:
+            print(f"Shared Rekap Error: {e}")
+            return
+        self._shared_at = float(data["at"])
+        self._shared_rev = int(data.get("rev", -1))
+
+    def _shared_fresh(self, day: str, rev: int) -> bool:
+        return (
+            self._state is not None
+            and self._state.day == day
+            and self._shared_rev == rev
+            and (time.time() - self._shared_at) < self.shared_fresh
+        )
+
+    def _refresh_shared(self, day: str, sources: Iterable[Tuple[str, Callable]]) -> Dict:
+        """
+        State rekap (termasuk dedup key & high-water mark) disimpan di cache bersama.
+        Masih segar & revisi sama -> langsung dipakai tanpa baca Sheets; kalau tidak,
+        1 replica memegang lock dan mengejar baris baru, replica lain menunggu lalu
+        memakai hasilnya. Invalidasi = ``invalidate()`` (naikkan revisi).
+        """
+        with self._lock:
+            self._pull_shared()
+            if self._shared_fresh(day, self.shared.version(SHARED_REV_KEY)):
+                return self._state.to_rekap()
+            with self.shared.locked(SHARED_LOCK_KEY, ttl=60.0, wait=self.shared_wait):
+                # lock tidak didapat dalam shared_wait -> baca sendiri saja (lebih baik daripada macet)
+                rev = self.shared.version(SHARED_REV_KEY)
+                self._pull_shared()
+                if self._shared_fresh(day, rev):
+                    return self._state.to_rekap()
+                rekap = self._apply_sources(day, sources)
+                self._shared_at = time.time()
+                self._shared_rev = rev
+                self.shared.set_json(SHARED_STATE_KEY, {
+                    "version": SNAPSHOT_VERSION,
+                    "source": self.source,
+                    "rev": rev,
+                    "at": self._shared_at,
+                    "state": self._state.to_dict(),
+                })
+        self.save_snapshot()
+        return rekap
+
+    def invalidate(self):
+        """Ada baris baru (submit di replica mana pun) -> refresh berikutnya membaca Sheets lagi."""
+        if self.shared is not None:
+            self.shared.bump(SHARED_REV_KEY)
+
+    def revision(self) -> int:
+        """Revisi bersama (0 kalau tanpa cache bersama); dipakai sebagai key cache rekap di app."""
+        return self.shared.version(SHARED_REV_KEY) if self.shared is not None else 0
+
+    @property
+    def state(self) -> Optional[RekapState]:
+        return self._state
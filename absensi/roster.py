@@ -0,0 +1,170 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from absensi.rekap import display_posisi, sanitize_name, sanitize_phone, smart_canonical_posisi
+
+MIN_PHONE_PREFIX = 4
+
+
+def phone_key(text: str) -> str:
+    """Nomor HP dalam bentuk pembanding: '+62 812-3456' / '62812...' / '812...' -> '0812...'."""
+    digits = re.sub(r"\D", "", sanitize_phone(text))
+    if digits.startswith("62"):
+        digits = "0" + digits[2:]
+    elif digits.startswith("8"):
+        digits = "0" + digits
+    return digits
+
+
+class PrefixIndex:
+    """Trie sederhana: key -> id entri; ``search(prefix)`` mengembalikan id urut key (maks. ``limit``)."""
+
+    def __init__(self):
+        self._root: Dict = {}
+
+    def add(self, key: str, idx: int):
+        node = self._root
+        for ch in key:
+            node = node.setdefault(ch, {})
+        # "" = daftar id yang key-nya berakhir di node ini
+        node.setdefault("", []).append(idx)
+
+    def search(self, prefix: str, limit: int = 8) -> List[int]:
+        node = self._root
+        for ch in prefix:
+            node = node.get(ch)
+            if node is None:
+                return []
+        out: List[int] = []
+        seen = set()
+        stack = [node]
+        while stack and len(out) < limit:
+            cur = stack.pop()
+            for idx in cur.get("", []):
+                if idx not in seen:
+                    seen.add(idx)
+                    out.append(idx)
+                    if len(out) >= limit:
+                        break
+            # urut abjad: child terkecil diproses duluan
+            stack.extend(cur[ch] for ch in sorted((c for c in cur if c), reverse=True))
+        return out
+
+
+# (nama kolom roster, token judul kolom, index default kalau judul tidak dikenali)
+HEADER_ROLES = (
+    ("Nama", ("nama", "name"), 0),
+    ("No HP/WA", ("hp", "wa", "whatsapp", "phone", "telp", "telepon", "ponsel"), 1),
+    ("Posisi", ("posisi", "jabatan", "position"), 2),
+)
+
+
+def header_columns(header: List[str]) -> Dict[str, int]:
+    """
+    Index kolom per peran dari judul baris 1, dicocokkan per kata utuh ("Nama Karyawan"
+    bukan kolom HP walau mengandung "wa"). Tiap kolom hanya dipakai 1 peran.
+    """
+    tokens = [set(re.findall(r"[a-z0-9]+", str(h).lower())) for h in header]
+    used = set()
+    cols: Dict[str, int] = {}
+    for role, names, default in HEADER_ROLES:
+        col = next((i for i, t in enumerate(tokens) if i not in used and t & set(names)), None)
+        if col is None:
+            col = next(i for i in [default] + list(range(len(header) + len(HEADER_ROLES))) if i not in used)
+        used.add(col)
+        cols[role] = col
+    return cols
+
+
+class Roster:
+    """
+    Daftar karyawan (Nama, No HP/WA, Posisi) dari worksheet Roster, diindeks
+    trie untuk autocomplete: prefix nomor HP dan prefix tiap kata nama.
+    """
+
+    def __init__(self, entries: List[Dict]):
+        self.entries = entries
+        self.by_phone: Dict[str, int] = {}
+        self.by_name: Dict[str, List[int]] = {}
+        self.phone_index = PrefixIndex()
+        self.name_index = PrefixIndex()
+        for idx, e in enumerate(entries):
+            key = e["key"]
+            if key and key not in self.by_phone:
+                self.by_phone[key] = idx
+                self.phone_index.add(key, idx)
+            name = e["Nama"].lower()
+            if name:
+                self.by_name.setdefault(name, []).append(idx)
+            self.name_index.add(name, idx)
+            for token in name.split()[1:]:
+                self.name_index.add(token, idx)
+
+    @classmethod
+    def from_values(cls, values: List[List[str]]) -> "Roster":
+        """``values`` = get_all_values tab Roster (baris 1 header; kolom dicari dari judulnya)."""
+        if not values:
+            return cls([])
+        cols = header_columns(values[0])
+        width = max(cols.values()) + 1
+        known_canon: List[str] = []
+        entries = []
+        for r in values[1:]:
+            r = list(r) + [""] * width
+            nama = sanitize_name(r[cols["Nama"]])
+            hp = sanitize_phone(r[cols["No HP/WA"]])
+            if not (nama or hp):
+                continue
+            # posisi kanonik seperti di rekap ("spv" / "SUPERVISOR " -> "Supervisor") -> grup rekap tidak pecah
+            pos = smart_canonical_posisi(r[cols["Posisi"]], known_canon)
+            if pos and pos not in known_canon:
+                known_canon.append(pos)
+            entries.append({
+                "Nama": nama,
+                "No HP/WA": hp,
+                "Posisi": display_posisi(pos) if pos else "",
+                "key": phone_key(hp),
+            })
+        return cls(entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup_phone(self, text: str) -> Optional[Dict]:
+        idx = self.by_phone.get(phone_key(text))
+        return self.entries[idx] if idx is not None else None
+
+    def suggest(self, text: str, limit: int = 8) -> List[Dict]:
+        """Kandidat untuk input parsial: angka -> prefix nomor HP, selain itu -> prefix kata nama."""
+        text = str(text or "").strip()
+        if not text:
+            return []
+        if re.fullmatch(r"[\d\s+\-()]+", text):
+            key = phone_key(text)
+            if len(key) < MIN_PHONE_PREFIX:
+                return []
+            ids = self.phone_index.search(key, limit)
+        else:
+            ids = self.name_index.search(sanitize_name(text).lower(), limit)
+        return [self.entries[i] for i in ids]
+
+
+def apply_roster_entry(nama: str, hp: str, posisi: str, entry: Optional[Dict],
+                       autofilled: Optional[Dict] = None) -> Tuple[str, str, str]:
+    """
+    Data submit setelah dicocokkan ke roster. ``entry`` = ``lookup_phone(hp)``; nomornya
+    sama, jadi format No HP selalu ikut roster (dedup rekap tepat). Nama & Posisi hanya
+    diganti kalau ``autofilled`` (isian otomatis terakhir) untuk orang yang sama dan
+    kolomnya belum diubah: koreksi manual / nomor rekan yang salah ketik tidak menimpa nama.
+    """
+    if entry is None:
+        return nama, hp, posisi
+    hp = entry["No HP/WA"] or hp
+    filled = autofilled or {}
+    if filled.get("key") != entry["key"]:
+        return nama, hp, posisi
+    if nama == sanitize_name(filled.get("Nama", "")):
+        nama = entry["Nama"] or nama
+    if posisi == str(filled.get("Posisi", "")).strip():
+        posisi = entry["Posisi"] or posisi
+    return nama, hp, posisi
@@ -0,0 +1,95 @@
+import re
+from datetime import datetime
+from typing import Optional, Tuple
+
+from absensi.lazy import lazy_import
+from absensi.metrics import maybe_span
+from absensi.rekap import sanitize_name
+
+
+# Layout path selfie di Dropbox. Placeholder: {root} {name} {ts} {ext} {yyyy} {mm} {dd}
+LAYOUT_PERSON = "{root}/{name}/{ts}_selfie{ext}"
+# per tanggal: list / arsip 1 hari = 1 folder
+LAYOUT_DATE = "{root}/{yyyy}/{mm}/{dd}/{name}_{ts}_selfie{ext}"
+LAYOUTS = {"person": LAYOUT_PERSON, "date": LAYOUT_DATE}
+
+TS_FILE_FMT = "%Y-%m-%d_%H-%M-%S"
+_TS_FILE_RE = re.compile(r"(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})_selfie(\.\w+)$", re.IGNORECASE)
+
+
+def resolve_layout(layout: str) -> str:
+    """'person' / 'date' / template sendiri -> template."""
+    layout = str(layout or "").strip()
+    return LAYOUTS.get(layout.lower(), layout or LAYOUT_PERSON)
+
+
+def selfie_path(root: str, nama: str, ts_file: str, ext: str, layout: str = LAYOUT_PERSON) -> str:
+    clean_name = sanitize_name(nama).replace(" ", "_") or "Unknown"
+    yyyy, mm, dd = (ts_file[:10].split("-") + ["", "", ""])[:3]
+    return resolve_layout(layout).format(root=root, name=clean_name, ts=ts_file, ext=ext, yyyy=yyyy, mm=mm, dd=dd)
+
+
+def parse_selfie_path(path: str) -> Optional[Tuple[str, datetime, str]]:
+    """
+    Kebalikan ``selfie_path`` untuk layout bawaan -> (nama bersih, waktu, ext), None kalau bukan
+    nama file buatan app. Nama dari prefix file ("Budi_<ts>_selfie") atau dari folder induk.
+    """
+    parts = [p for p in str(path or "").split("/") if p]
+    if not parts:
+        return None
+    m = _TS_FILE_RE.search(parts[-1])
+    if not m:
+        return None
+    try:
+        ts = datetime.strptime(m.group(1), TS_FILE_FMT)
+    except ValueError:
+        return None
+    prefix = parts[-1][: m.start()].rstrip("_")
+    name = prefix or (parts[-2] if len(parts) >= 2 else "")
+    return name or "Unknown", ts, m.group(2)
+
+
+def upload_selfie(dbx, img_bytes: bytes, path: str, metrics=None) -> str:
+    """
+    Upload foto ke ``path`` lalu buat shared link publik.
+    Return URL ``?raw=1`` (bisa langsung ditampilkan) atau "-" kalau link gagal dibuat.
+    ``metrics`` (``LatencyRecorder``, opsional) mencatat span upload & shared link.
+    """
+    dropbox = lazy_import("dropbox")
+
+    with maybe_span(metrics, "submit.dropbox_upload", bytes=len(img_bytes)):
+        dbx.files_upload(img_bytes, path, mode=dropbox.files.WriteMode.add)
+
+    with maybe_span(metrics, "submit.shared_link"):
+        return shared_link_url(dbx, path)
+
+
+def shared_link_url(dbx, path: str) -> str:
+    """Shared link publik untuk ``path`` (pakai link lama kalau sudah ada). Return URL ``?raw=1`` atau "-"."""
+    sharing = lazy_import("dropbox.sharing")
+    ApiError = lazy_import("dropbox.exceptions").ApiError
+
+    settings = sharing.SharedLinkSettings(requested_visibility=sharing.RequestedVisibility.public)
+    url = "-"
+    try:
+        link = dbx.sharing_create_shared_link_with_settings(path, settings=settings)
+        url = link.url
+    except ApiError as e:
+        try:
+            if e.error.is_shared_link_already_exists():
+                links = dbx.sharing_list_shared_links(path, direct_only=True).links
+                if links:
+                    url = links[0].url
+        except Exception:
+            url = "-"
+
+    return url.replace("?dl=0", "?raw=1") if url and url != "-" else "-"
+
+
+def download_selfie(dbx, path: str) -> bytes:
+    """Isi file selfie di Dropbox (``files_download``)."""
+    _, resp = dbx.files_download(path)
+    try:
+        return resp.content
+    finally:
+        resp.close()
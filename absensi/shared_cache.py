@@ -0,0 +1,189 @@
+"""
+Cache bersama antar replica app (beberapa proses Streamlit di belakang load
+balancer): nilai bytes/JSON, counter versi untuk invalidasi lintas replica,
+dan lock dengan lease (1 replica yang membaca Sheets, lainnya memakai hasilnya).
+
+- ``sqlite:///path/shared.sqlite3``: file SQLite di disk bersama.
+- ``redis://host:6379/0``: server Redis / yang kompatibel (butuh paket ``redis``).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+from absensi.lazy import optional_import
+
+
+class SharedCache:
+    """Antarmuka cache bersama. Key berupa string; nilai bytes."""
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes):
+        raise NotImplementedError
+
+    def version(self, key: str) -> int:
+        """Nilai counter ``key`` (0 kalau belum pernah di-``bump``)."""
+        raise NotImplementedError
+
+    def bump(self, key: str) -> int:
+        """Naikkan counter ``key`` (atomic antar replica). Return nilai baru."""
+        raise NotImplementedError
+
+    def try_lock(self, key: str, ttl: float) -> Optional[str]:
+        """Ambil lock ``key`` selama maks. ``ttl`` detik. Return token, atau None kalau dipegang replica lain."""
+        raise NotImplementedError
+
+    def unlock(self, key: str, token: str):
+        raise NotImplementedError
+
+    def get_json(self, key: str) -> Optional[Any]:
+        raw = self.get(key)
+        if raw is None:
+            return None
+        try:
+            return json.loads(raw.decode("utf-8"))
+        except ValueError:
+            return None
+
+    def set_json(self, key: str, data: Any):
+        self.set(key, json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+    @contextmanager
+    def locked(self, key: str, ttl: float = 60.0, wait: float = 0.0, poll: float = 0.1) -> Iterator[bool]:
+        """``with cache.locked(k, wait=10) as got:`` -> ``got`` False kalau lock tidak didapat dalam ``wait`` detik."""
+        deadline = time.monotonic() + wait
+        token = self.try_lock(key, ttl)
+        while token is None and time.monotonic() < deadline:
+            time.sleep(poll)
+            token = self.try_lock(key, ttl)
+        try:
+            yield token is not None
+        finally:
+            if token is not None:
+                self.unlock(key, token)
+
+
+class SqliteSharedCache(SharedCache):
+    """
+    1 file SQLite yang dibuka semua replica. Journal rollback biasa (bukan WAL,
+    karena WAL tidak aman di filesystem jaringan); tiap operasi 1 transaksi singkat.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB NOT NULL, updated_at REAL NOT NULL);
+    CREATE TABLE IF NOT EXISTS counters (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+    CREATE TABLE IF NOT EXISTS locks (key TEXT PRIMARY KEY, token TEXT NOT NULL, expires_at REAL NOT NULL);
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._conn().execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return bytes(row[0]) if row else None
+
+    def set(self, key: str, value: bytes):
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO kv (key, value, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                (key, sqlite3.Binary(value), time.time()),
+            )
+
+    def version(self, key: str) -> int:
+        row = self._conn().execute("SELECT value FROM counters WHERE key = ?", (key,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def bump(self, key: str) -> int:
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO counters (key, value) VALUES (?, 1) "
+                "ON CONFLICT(key) DO UPDATE SET value = value + 1",
+                (key,),
+            )
+            return int(conn.execute("SELECT value FROM counters WHERE key = ?", (key,)).fetchone()[0])
+
+    def try_lock(self, key: str, ttl: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        now = time.time()
+        with self._conn() as conn:
+            # lock kedaluwarsa (replica mati saat memegang) boleh diambil alih
+            cur = conn.execute(
+                "INSERT INTO locks (key, token, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET token = excluded.token, expires_at = excluded.expires_at "
+                "WHERE locks.expires_at < ?",
+                (key, token, now + ttl, now),
+            )
+            return token if cur.rowcount == 1 else None
+
+    def unlock(self, key: str, token: str):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM locks WHERE key = ? AND token = ?", (key, token))
+
+
+class RedisSharedCache(SharedCache):
+    """Redis (atau server kompatibel: Valkey, KeyDB, Dragonfly) lewat paket ``redis``."""
+
+    # hapus lock hanya kalau token masih milik kita
+    _UNLOCK = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+    def __init__(self, url: str, prefix: str = "absensi:"):
+        redis = optional_import("redis")
+        if redis is None:
+            raise RuntimeError("shared_cache redis:// butuh paket 'redis' (pip install redis)")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def _k(self, key: str) -> str:
+        return self.prefix + key
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self._k(key))
+
+    def set(self, key: str, value: bytes):
+        self.client.set(self._k(key), value)
+
+    def version(self, key: str) -> int:
+        raw = self.client.get(self._k("ver:" + key))
+        return int(raw) if raw else 0
+
+    def bump(self, key: str) -> int:
+        return int(self.client.incr(self._k("ver:" + key)))
+
+    def try_lock(self, key: str, ttl: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        ok = self.client.set(self._k("lock:" + key), token, nx=True, px=max(1, int(ttl * 1000)))
+        return token if ok else None
+
+    def unlock(self, key: str, token: str):
+        self.client.eval(self._UNLOCK, 1, self._k("lock:" + key), token)
+
+
+def open_shared_cache(url: str, base_dir: str = ".") -> Optional[SharedCache]:
+    """``""`` -> None (nonaktif), ``sqlite:///path`` (relatif ke ``base_dir``), ``redis://...``."""
+    url = str(url or "").strip()
+    if not url:
+        return None
+    if url.startswith("sqlite:///"):
+        # sqlite:///relatif/shared.sqlite3 atau sqlite:////abs/shared.sqlite3 (seperti SQLAlchemy)
+        return SqliteSharedCache(os.path.join(base_dir, url[len("sqlite:///"):]))
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSharedCache(url)
+    raise RuntimeError(f"app.shared_cache tidak dikenal: {url!r} (pakai sqlite:///path atau redis://host:port/db)")
@@ -0,0 +1,165 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+FORMAT_VERSION_KEY = "absensi_format_version"
+
+# (spreadsheet_id, sheet_id) yang sudah dicek di proses ini -> versi
+_checked: Dict[Tuple[str, int], str] = {}
+_checked_lock = threading.Lock()
+
+
+def header_format_requests(sheet_id: int, col_widths: List[int]) -> List[Dict]:
+    requests = []
+    for i, w in enumerate(col_widths):
+        requests.append({
+            "updateDimensionProperties": {
+                "range": {"sheetId": sheet_id, "dimension": "COLUMNS", "startIndex": i, "endIndex": i + 1},
+                "properties": {"pixelSize": w},
+                "fields": "pixelSize"
+            }
+        })
+
+    requests.append({
+        "repeatCell": {
+            "range": {"sheetId": sheet_id, "startRowIndex": 0, "endRowIndex": 1},
+            "cell": {"userEnteredFormat": {
+                "textFormat": {"bold": True},
+                "horizontalAlignment": "CENTER",
+                "verticalAlignment": "MIDDLE",
+                "backgroundColor": {"red": 0.93, "green": 0.95, "blue": 0.99},
+                "wrapStrategy": "WRAP"
+            }},
+            "fields": "userEnteredFormat(textFormat,horizontalAlignment,verticalAlignment,backgroundColor,wrapStrategy)"
+        }
+    })
+
+    requests.append({
+        "updateSheetProperties": {
+            "properties": {"sheetId": sheet_id, "gridProperties": {"frozenRowCount": 1}},
+            "fields": "gridProperties.frozenRowCount"
+        }
+    })
+    return requests
+
+
+def row_format_requests(sheet_id: int, start_index: int, end_index: int) -> List[Dict]:
+    """Format badan tabel untuk baris [start_index, end_index) (0-based, baris 0 = header)."""
+    start_index = max(1, int(start_index))
+    if end_index <= start_index:
+        return []
+
+    def rng(c0: Optional[int] = None, c1: Optional[int] = None) -> Dict:
+        r = {"sheetId": sheet_id, "startRowIndex": start_index, "endRowIndex": end_index}
+        if c0 is not None:
+            r.update({"startColumnIndex": c0, "endColumnIndex": c1})
+        return r
+
+    return [
+        {
+            "repeatCell": {
+                "range": rng(),
+                "cell": {"userEnteredFormat": {"verticalAlignment": "MIDDLE", "wrapStrategy": "CLIP"}},
+                "fields": "userEnteredFormat(verticalAlignment,wrapStrategy)"
+            }
+        },
+        # Center Timestamp & HP
+        {
+            "repeatCell": {
+                "range": rng(0, 1),
+                "cell": {"userEnteredFormat": {"horizontalAlignment": "CENTER"}},
+                "fields": "userEnteredFormat(horizontalAlignment)"
+            }
+        },
+        {
+            "repeatCell": {
+                "range": rng(2, 3),
+                "cell": {"userEnteredFormat": {"horizontalAlignment": "CENTER"}},
+                "fields": "userEnteredFormat(horizontalAlignment)"
+            }
+        },
+        # Wrap Dropbox Path
+        {
+            "repeatCell": {
+                "range": rng(5, 6),
+                "cell": {"userEnteredFormat": {"wrapStrategy": "WRAP"}},
+                "fields": "userEnteredFormat(wrapStrategy)"
+            }
+        },
+    ]
+
+
+def read_format_marker(spreadsheet, sheet_id: int) -> Tuple[Optional[str], Optional[int]]:
+    """Return (versi, metadataId) marker format pada sheet, atau (None, None)."""
+    meta = spreadsheet.fetch_sheet_metadata({"fields": "sheets(properties.sheetId,developerMetadata)"})
+    for sh in meta.get("sheets", []):
+        if sh.get("properties", {}).get("sheetId") != sheet_id:
+            continue
+        for md in sh.get("developerMetadata", []) or []:
+            if md.get("metadataKey") == FORMAT_VERSION_KEY:
+                return md.get("metadataValue"), md.get("metadataId")
+    return None, None
+
+
+def marker_request(sheet_id: int, version: str, metadata_id: Optional[int]) -> Dict:
+    if metadata_id is not None:
+        return {
+            "updateDeveloperMetadata": {
+                "dataFilters": [{"developerMetadataLookup": {"metadataId": metadata_id}}],
+                "developerMetadata": {"metadataValue": str(version)},
+                "fields": "metadataValue",
+            }
+        }
+    return {
+        "createDeveloperMetadata": {
+            "developerMetadata": {
+                "metadataKey": FORMAT_VERSION_KEY,
+                "metadataValue": str(version),
+                "location": {"sheetId": sheet_id},
+                "visibility": "DOCUMENT",
+            }
+        }
+    }
+
+
+def ensure_sheet_format(ws, version: str, col_widths: List[int], force: bool = False) -> bool:
+    """
+    Format penuh (header + semua baris) hanya kalau marker versi di developer
+    metadata sheet != ``version``. Hasil cek di-cache per proses, jadi setelah
+    itu tidak ada request ke API sama sekali. Return True kalau memformat.
+    """
+    version = str(version)
+    key = (ws.spreadsheet.id, ws.id)
+    if not force:
+        with _checked_lock:
+            if _checked.get(key) == version:
+                return False
+
+    current, metadata_id = read_format_marker(ws.spreadsheet, ws.id)
+    if current == version and not force:
+        with _checked_lock:
+            _checked[key] = version
+        return False
+
+    requests = header_format_requests(ws.id, col_widths)
+    requests += row_format_requests(ws.id, 1, ws.row_count)
+    requests.append(marker_request(ws.id, version, metadata_id))
+    ws.spreadsheet.batch_update({"requests": requests})
+
+    with _checked_lock:
+        _checked[key] = version
+    return True
+
+
+def format_row_range(ws, start_row: int, end_row: int):
+    """Format hanya baris baru hasil grow (1-based, inklusif)."""
+    requests = row_format_requests(ws.id, start_row - 1, end_row)
+    if requests:
+        ws.spreadsheet.batch_update({"requests": requests})
+
+
+def forget_checked(ws=None):
+    with _checked_lock:
+        if ws is None:
+            _checked.clear()
+        else:
+            _checked.pop((ws.spreadsheet.id, ws.id), None)
@@ -0,0 +1,146 @@
+import threading
+import time
+from typing import Callable, List, Optional
+
+
+def col_letter(n: int) -> str:
+    """1 -> A, 6 -> F, 27 -> AA."""
+    s = ""
+    while n > 0:
+        n, rem = divmod(n - 1, 26)
+        s = chr(65 + rem) + s
+    return s
+
+
+class RowCollisionError(RuntimeError):
+    pass
+
+
+class RowCursor:
+    """
+    Pointer "baris kosong berikutnya" untuk satu worksheet (``app.row_write = "cursor"``,
+    opt-in untuk 1 replica; default tetap ``append_row`` server-side).
+
+    Pengganti ``ws.append_row`` (yang mengandalkan heuristik "cari tabel" milik
+    Sheets): tulis pakai ``ws.update`` ke range baris eksplisit, pointer di-cache
+    per proses dan hanya di-resync penuh (baca kolom A) saat belum ada / kadaluarsa.
+
+    Sebelum menulis, baris tujuan dibaca dulu: kalau sudah berisi (backfill CLI,
+    edit manual) pointer di-resync ke bawahnya, baris itu tidak ditimpa. Setelah
+    menulis, kolom ``verify_col`` (wajib; penanda unik per tulis, mis. path selfie)
+    dibaca ulang dengan render ``FORMULA``; kalau isinya milik penulis yang masuk
+    di sela cek dan tulis, pointer maju dan baris ditulis ulang di bawahnya.
+    1 submit = 2 baca + 1 update, jadi hanya layak kalau kuota baca longgar.
+    """
+
+    def __init__(
+        self,
+        n_cols: int,
+        verify_col: int,
+        grow_rows: int = 2000,
+        grow_margin: int = 50,
+        resync_seconds: float = 300.0,
+        max_attempts: int = 5,
+        on_grow: Optional[Callable] = None,
+    ):
+        self.n_cols = n_cols
+        self.grow_rows = max(1, int(grow_rows))
+        self.grow_margin = max(0, int(grow_margin))
+        self.resync_seconds = float(resync_seconds)
+        self.max_attempts = max(1, int(max_attempts))
+        # on_grow(ws, first_new_row, last_new_row) -> mis. format baris baru saja
+        self.on_grow = on_grow
+        # index kolom (0-based) yang dibaca ulang setelah tulis
+        self.verify_col = int(verify_col)
+
+        self._lock = threading.Lock()
+        self._next_row: Optional[int] = None
+        self._synced_at = 0.0
+
+        self.occupied = 0
+        self.overwritten = 0
+        self.resyncs = 0
+        self.grows = 0
+
+    @property
+    def next_row(self) -> Optional[int]:
+        return self._next_row
+
+    def invalidate(self):
+        with self._lock:
+            self._next_row = None
+            self._synced_at = 0.0
+
+    def _resync(self, ws) -> int:
+        # col_values membuang sel kosong di ekor kolom -> len + 1 = baris kosong pertama
+        col = ws.col_values(1)
+        self.resyncs += 1
+        self._synced_at = time.monotonic()
+        return max(2, len(col) + 1)
+
+    def sync(self, ws) -> int:
+        """Resync pointer sekarang (mis. saat warm-up). Return baris kosong berikutnya."""
+        with self._lock:
+            self._next_row = self._resync(ws)
+            return self._next_row
+
+    def _ensure_capacity(self, ws, row: int):
+        if row + self.grow_margin <= ws.row_count:
+            return
+        needed = row + self.grow_margin - ws.row_count
+        add = ((needed + self.grow_rows - 1) // self.grow_rows) * self.grow_rows
+        old = ws.row_count
+        ws.add_rows(add)
+        self.grows += 1
+        if self.on_grow is not None:
+            try:
+                self.on_grow(ws, old + 1, old + add)
+            except Exception as e:
+                print(f"Grow Hook Error: {e}")
+
+    def _is_free(self, ws, row: int) -> bool:
+        got = ws.get(f"A{row}:{col_letter(self.n_cols)}{row}", value_render_option="FORMULA") or []
+        return not any(str(v).strip() for r in got for v in r)
+
+    def _is_ours(self, ws, row: int, values: List) -> bool:
+        cell = col_letter(self.verify_col + 1) + str(row)
+        # FORMULA: nilai mentah seperti yang ditulis, bukan hasil render USER_ENTERED
+        got = (ws.get(cell, value_render_option="FORMULA") or [[]])[0]
+        got = got[0] if got else ""
+        return str(got).strip() == str(values[self.verify_col]).strip()
+
+    def append(self, ws, values: List) -> int:
+        """Tulis satu baris ke baris berikutnya. Return nomor baris yang ditulis."""
+        values = (list(values) + [""] * self.n_cols)[: self.n_cols]
+        with self._lock:
+            stale = (time.monotonic() - self._synced_at) > self.resync_seconds
+            if self._next_row is None or stale:
+                self._next_row = self._resync(ws)
+
+            row = self._next_row
+            for _ in range(self.max_attempts):
+                self._ensure_capacity(ws, row)
+                try:
+                    if not self._is_free(ws, row):
+                        # baris sudah diisi penulis lain -> lompat ke baris kosong setelah data terakhir
+                        self.occupied += 1
+                        row = max(row + 1, self._resync(ws))
+                        continue
+                    ws.update(
+                        f"A{row}:{col_letter(self.n_cols)}{row}",
+                        [values],
+                        value_input_option="USER_ENTERED",
+                    )
+                    ours = self._is_ours(ws, row, values)
+                except Exception:
+                    self._next_row = None
+                    raise
+                if ours:
+                    self._next_row = row + 1
+                    return row
+                # penulis lain menimpa baris ini setelah kita tulis -> baris itu miliknya, tulis ulang di bawah
+                self.overwritten += 1
+                row += 1
+
+            self._next_row = None
+            raise RowCollisionError(f"Baris terus ditimpa penulis lain setelah {self.max_attempts} percobaan (row {row}).")
@@ -0,0 +1,280 @@
+"""
+Penyimpanan log absensi + foto selfie di balik 1 antarmuka (``Storage``):
+tulis baris, baca rentang tanggal, simpan / ambil file. Implementasi:
+
+- ``SheetsDropboxStorage``: Google Sheets + Dropbox (perilaku lama, lewat ``Core``).
+- ``SqliteStorage``: SQLite lokal (index tanggal & path selfie) + folder foto;
+  tanpa kuota API, bisa jalan tanpa internet.
+
+Dipilih lewat ``app.storage`` ("sheets" / "sqlite").
+"""
+import csv
+import io
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from absensi.export import collect_log_rows, make_hyperlink
+from absensi.images import optimize_image_bytes
+from absensi.lazy import lazy_import
+from absensi.metrics import maybe_span
+from absensi.quota import PRIORITY_EXPORT, PRIORITY_REKAP, sheets_priority
+from absensi.rekap import RekapStore
+from absensi.selfie import download_selfie, upload_selfie
+from absensi.snapshot import write_bytes_atomic
+from absensi.thumbs import fetch_thumbnails
+
+STORAGE_SHEETS = "sheets"
+STORAGE_SQLITE = "sqlite"
+STORAGES = (STORAGE_SHEETS, STORAGE_SQLITE)
+
+# sumber rekap: (key high-water mark, fetch(day, hwm) -> (baris A:F, hwm baru))
+RekapSource = Tuple[str, Callable]
+
+
+def _thumb_px(size: str) -> int:
+    # "w128h128" -> 128
+    digits = "".join(ch if ch.isdigit() else " " for ch in str(size)).split()
+    return int(digits[0]) if digits else 128
+
+
+class Storage:
+    """Antarmuka penyimpanan. Baris log = [Timestamp, Nama, No HP/WA, Posisi, URL selfie, path selfie]."""
+
+    name = ""
+
+    def append_row(self, when: datetime, row: List[str], metrics=None) -> None:
+        raise NotImplementedError
+
+    def read_rows(self, date_from: Optional[date] = None, date_to: Optional[date] = None) -> List[List[str]]:
+        """Baris export bernomor (kolom seperti ``EXPORT_HEADER``) di rentang tanggal (None = semua)."""
+        raise NotImplementedError
+
+    def has_path(self, when: datetime, path: str) -> bool:
+        """Ada baris log hari ``when`` dengan path selfie ``path``? (cek setelah tulis yang ambigu)"""
+        return any(r[-1] == path for r in self.read_rows(when.date(), when.date()))
+
+    def rekap_sources(self, day: date, metrics=None):
+        """Context manager -> daftar ``RekapSource`` untuk ``RekapStore.refresh_sources``."""
+        raise NotImplementedError
+
+    def put_file(self, path: str, data: bytes, metrics=None) -> str:
+        """Simpan foto di ``path`` (path logis, mis. /Absensi_Selfie/Nama/...). Return URL atau "-"."""
+        raise NotImplementedError
+
+    def downloader(self) -> Callable[[str], bytes]:
+        """Fungsi ambil isi file yang aman dipanggil dari banyak thread worker."""
+        raise NotImplementedError
+
+    def thumbnails(self, paths: Sequence[str], size: str) -> Dict[str, bytes]:
+        raise NotImplementedError
+
+    def read_table(self, name: str) -> Optional[List[List[str]]]:
+        """Tabel pendukung (mis. Roster) sebagai list baris; None kalau tidak ada."""
+        raise NotImplementedError
+
+
+class SheetsDropboxStorage(Storage):
+    """Google Sheets (partisi, kuota, row cursor) + Dropbox, lewat resource milik ``core``."""
+
+    name = STORAGE_SHEETS
+
+    def __init__(self, core):
+        self.core = core
+
+    def append_row(self, when: datetime, row: List[str], metrics=None) -> None:
+        row = list(row)
+        row[4] = make_hyperlink(row[4], "Bukti Foto")
+        t0 = time.perf_counter()
+        with self.core.use_gsheet() as sh:
+            if metrics is not None:
+                metrics.record("submit.lease", time.perf_counter() - t0)
+            with maybe_span(metrics, "submit.get_write_ws"):
+                ws = self.core.get_write_ws(sh, when)
+            with maybe_span(metrics, "submit.append_row"):
+                self.core.append_log_row(ws, row)
+
+    def read_rows(self, date_from: Optional[date] = None, date_to: Optional[date] = None) -> List[List[str]]:
+        with self.core.use_gsheet() as sh, sheets_priority(PRIORITY_EXPORT):
+            return collect_log_rows(self.core.iter_log_ws(sh, date_from, date_to), date_from, date_to)
+
+    def has_path(self, when: datetime, path: str) -> bool:
+        # cukup kolom F (path selfie) tab tujuan tulis, bukan seluruh log hari itu
+        with self.core.use_gsheet() as sh:
+            ws = self.core.get_write_ws(sh, when)
+            return path in ws.col_values(6)
+
+    @contextmanager
+    def rekap_sources(self, day: date, metrics=None) -> Iterator[List[RekapSource]]:
+        # hanya partisi yang mencakup hari itu
+        t0 = time.perf_counter()
+        with self.core.use_gsheet() as sh, sheets_priority(PRIORITY_REKAP):
+            if metrics is not None:
+                metrics.record("rekap.gsheet_lease", time.perf_counter() - t0)
+            yield [(ws.title, partial(RekapStore.read_ws_since, ws)) for ws in self.core.iter_log_ws(sh, day, day)]
+
+    def put_file(self, path: str, data: bytes, metrics=None) -> str:
+        with self.core.use_dropbox() as dbx:
+            return upload_selfie(dbx, data, path, metrics=metrics)
+
+    def downloader(self) -> Callable[[str], bytes]:
+        # client Dropbox per thread worker, di luar pool -> submit absen tidak ikut menunggu
+        local = threading.local()
+
+        def download(path: str) -> bytes:
+            if getattr(local, "dbx", None) is None:
+                local.dbx = self.core.connect_dropbox()
+            return download_selfie(local.dbx, path)
+
+        return download
+
+    def thumbnails(self, paths: Sequence[str], size: str) -> Dict[str, bytes]:
+        with self.core.use_dropbox() as dbx:
+            return fetch_thumbnails(dbx, paths, size)
+
+    def read_table(self, name: str) -> Optional[List[List[str]]]:
+        gspread = lazy_import("gspread")
+        with self.core.use_gsheet() as sh, sheets_priority(PRIORITY_EXPORT):
+            try:
+                return sh.worksheet(name).get_all_values()
+            except gspread.WorksheetNotFound:
+                return None
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS log (
+    id        INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts        TEXT NOT NULL,  -- dd-mm-YYYY HH:MM:SS (sama dengan sheet)
+    day       TEXT NOT NULL,  -- YYYY-MM-DD
+    nama      TEXT NOT NULL,
+    hp        TEXT NOT NULL,
+    posisi    TEXT NOT NULL,
+    link      TEXT NOT NULL,
+    path      TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS log_day ON log (day, id);
+CREATE INDEX IF NOT EXISTS log_path ON log (day, path);
+"""
+
+# file lama: kolom dedup_key ditulis tapi tidak pernah dibaca (dedup ada di RekapStore)
+MIGRATE_DROP_DEDUP = """
+DROP INDEX IF EXISTS log_dedup;
+ALTER TABLE log DROP COLUMN dedup_key;
+"""
+
+LOG_COLS = "ts, nama, hp, posisi, link, path"
+
+
+class SqliteStorage(Storage):
+    """
+    Log di 1 file SQLite (WAL: pembaca tidak menunggu penulis; 1 koneksi per
+    thread), foto di ``photo_dir`` mengikuti path logis selfie. Tabel pendukung
+    (Roster) dibaca dari ``<data_dir>/<nama>.csv``.
+    """
+
+    name = STORAGE_SQLITE
+
+    def __init__(self, db_path: str, photo_dir: str, data_dir: Optional[str] = None):
+        self.db_path = db_path
+        self.photo_dir = photo_dir
+        self.data_dir = data_dir or os.path.dirname(os.path.abspath(db_path))
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+            if "dedup_key" in {r[1] for r in conn.execute("PRAGMA table_info(log)")}:
+                conn.executescript(MIGRATE_DROP_DEDUP)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def append_row(self, when: datetime, row: List[str], metrics=None) -> None:
+        ts, nama, hp, posisi, link, path = [str(v) for v in (list(row) + [""] * 6)[:6]]
+        with maybe_span(metrics, "submit.append_row"), self._conn() as conn:
+            conn.execute(
+                f"INSERT INTO log ({LOG_COLS}, day) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (ts, nama, hp, posisi, link, path, when.date().isoformat()),
+            )
+
+    def has_path(self, when: datetime, path: str) -> bool:
+        # lookup index (day, path), bukan baca semua baris hari itu
+        cur = self._conn().execute(
+            "SELECT 1 FROM log WHERE day = ? AND path = ? LIMIT 1", (when.date().isoformat(), path)
+        )
+        return cur.fetchone() is not None
+
+    def read_rows(self, date_from: Optional[date] = None, date_to: Optional[date] = None) -> List[List[str]]:
+        cur = self._conn().execute(
+            f"SELECT {LOG_COLS} FROM log WHERE day >= ? AND day <= ? ORDER BY id",
+            ((date_from or date.min).isoformat(), (date_to or date.max).isoformat()),
+        )
+        return [[str(i)] + list(r) for i, r in enumerate(cur, start=1)]
+
+    def rows_since(self, day: str, hwm: Optional[int]) -> Tuple[List[List[str]], int]:
+        """Sumber rekap: baris hari ``day`` (dd-mm-YYYY) dengan id > ``hwm``."""
+        iso = datetime.strptime(day, "%d-%m-%Y").date().isoformat()
+        cur = self._conn().execute(
+            f"SELECT id, {LOG_COLS} FROM log WHERE day = ? AND id > ? ORDER BY id", (iso, hwm or 0)
+        )
+        rows, last = [], hwm or 0
+        for r in cur:
+            last = r[0]
+            rows.append(list(r[1:]))
+        return rows, last
+
+    @contextmanager
+    def rekap_sources(self, day: date, metrics=None) -> Iterator[List[RekapSource]]:
+        yield [("sqlite", self.rows_since)]
+
+    def local_path(self, path: str) -> str:
+        full = os.path.abspath(os.path.join(self.photo_dir, path.lstrip("/")))
+        if not full.startswith(os.path.abspath(self.photo_dir) + os.sep):
+            raise ValueError(f"path selfie di luar folder foto: {path}")
+        return full
+
+    def put_file(self, path: str, data: bytes, metrics=None) -> str:
+        full = self.local_path(path)
+        with maybe_span(metrics, "submit.photo_write", bytes=len(data)):
+            write_bytes_atomic(full, data)
+        return Path(full).as_uri()
+
+    def get_file(self, path: str) -> bytes:
+        with open(self.local_path(path), "rb") as f:
+            return f.read()
+
+    def downloader(self) -> Callable[[str], bytes]:
+        return self.get_file
+
+    def thumbnails(self, paths: Sequence[str], size: str) -> Dict[str, bytes]:
+        px = _thumb_px(size)
+        out = {}
+        for p in paths:
+            try:
+                out[p] = optimize_image_bytes(self.get_file(p), "jpg", px, 70)[0]
+            except (OSError, ValueError):
+                continue
+        return out
+
+    def read_table(self, name: str) -> Optional[List[List[str]]]:
+        path = os.path.join(self.data_dir, f"{name}.csv")
+        try:
+            with open(path, "r", encoding="utf-8-sig", newline="") as f:
+                text = f.read()
+        except OSError:
+            return None
+        # export app memakai ';' (Excel Indonesia); file tulisan tangan biasanya ','
+        first = text.splitlines()[0] if text else ""
+        delim = ";" if first.count(";") > first.count(",") else ","
+        return [r for r in csv.reader(io.StringIO(text), delimiter=delim)]
@@ -0,0 +1,152 @@
+import base64
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Sequence
+
+from absensi.lazy import lazy_import
+from absensi.snapshot import write_bytes_atomic
+
+THUMB_BATCH_MAX = 25  # batas entries files_get_thumbnail_batch
+MISS_TTL = 300.0  # file yang gagal dibuat thumbnail-nya tidak dicoba lagi selama ini
+MISS_MAX = 2048  # batas jumlah path gagal yang diingat (yang terlama dibuang)
+
+
+class ThumbCache:
+    """
+    Cache thumbnail di disk dengan batas total ``max_bytes`` (LRU; urutan akses
+    disimpan lewat mtime file supaya tetap berlaku setelah restart).
+    Key = path Dropbox (case-insensitive).
+    """
+
+    def __init__(self, folder: str, max_bytes: int = 50 * 1024 * 1024, max_misses: int = MISS_MAX):
+        self.folder = folder
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        # path gagal -> waktu gagal, urut dari yang terlama (TTL + batas jumlah)
+        self._misses: "OrderedDict[str, float]" = OrderedDict()
+        self.max_misses = int(max_misses)
+        self.hits = 0
+        self.fetched = 0
+        self._scan()
+
+    def _scan(self):
+        try:
+            names = [n for n in os.listdir(self.folder) if n.endswith(".jpg")]
+        except OSError:
+            return
+        entries = []
+        for n in names:
+            try:
+                st = os.stat(os.path.join(self.folder, n))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, n, st.st_size))
+        for _, n, size in sorted(entries):
+            self._sizes[n] = size
+            self._total += size
+
+    @staticmethod
+    def _name(path: str) -> str:
+        return hashlib.sha1(path.lower().encode("utf-8")).hexdigest()[:24] + ".jpg"
+
+    def get(self, path: str):
+        name = self._name(path)
+        full = os.path.join(self.folder, name)
+        with self._lock:
+            if name not in self._sizes:
+                return None
+            self._sizes.move_to_end(name)
+        try:
+            with open(full, "rb") as f:
+                data = f.read()
+            os.utime(full, None)
+        except OSError:
+            with self._lock:
+                self._total -= self._sizes.pop(name, 0)
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, path: str, data: bytes):
+        name = self._name(path)
+        write_bytes_atomic(os.path.join(self.folder, name), data)
+        with self._lock:
+            self._total += len(data) - self._sizes.pop(name, 0)
+            self._sizes[name] = len(data)
+            self._misses.pop(path.lower(), None)
+            evict = []
+            while self._total > self.max_bytes and len(self._sizes) > 1:
+                old, size = self._sizes.popitem(last=False)
+                self._total -= size
+                evict.append(old)
+        for old in evict:
+            try:
+                os.unlink(os.path.join(self.folder, old))
+            except OSError:
+                pass
+
+    def note_fetched(self, n: int):
+        with self._lock:
+            self.fetched += n
+
+    def note_miss(self, path: str):
+        now = time.monotonic()
+        with self._lock:
+            self._misses[path.lower()] = now
+            self._misses.move_to_end(path.lower())
+            # buang yang kedaluwarsa / kelebihan dari depan (paling lama)
+            while self._misses:
+                key, at = next(iter(self._misses.items()))
+                if now - at < MISS_TTL and len(self._misses) <= self.max_misses:
+                    break
+                del self._misses[key]
+
+    def recently_missed(self, path: str) -> bool:
+        with self._lock:
+            at = self._misses.get(path.lower())
+            if at is None:
+                return False
+            if time.monotonic() - at < MISS_TTL:
+                return True
+            del self._misses[path.lower()]
+            return False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "files": len(self._sizes),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "fetched": self.fetched,
+                "misses": len(self._misses),
+            }
+
+
+def fetch_thumbnails(dbx, paths: Sequence[str], size: str = "w128h128") -> Dict[str, bytes]:
+    """Thumbnail JPEG untuk banyak file sekaligus (``files_get_thumbnail_batch``, maks. 25 per call)."""
+    files = lazy_import("dropbox.files")
+    out: Dict[str, bytes] = {}
+    todo: List[str] = list(paths)
+    for start in range(0, len(todo), THUMB_BATCH_MAX):
+        chunk = todo[start:start + THUMB_BATCH_MAX]
+        args = [
+            files.ThumbnailArg(
+                p,
+                format=files.ThumbnailFormat.jpeg,
+                size=getattr(files.ThumbnailSize, size),
+                mode=files.ThumbnailMode.bestfit,
+            )
+            for p in chunk
+        ]
+        res = dbx.files_get_thumbnail_batch(args)
+        for p, entry in zip(chunk, res.entries):
+            if entry.is_success():
+                out[p] = base64.b64decode(entry.get_success().thumbnail)
+    return out
@@ -0,0 +1,111 @@
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+PENDING = "pending"
+RUNNING = "running"
+OK = "ok"
+ERROR = "error"
+
+
+class Warmup:
+    """
+    Pemanasan koneksi & cache di background thread saat proses server mulai,
+    supaya submitter pertama tidak menanggung authorize/open/schema check.
+
+    ``tasks``: nama -> callable, dijalankan paralel sekali.
+    ``pings``: nama -> callable ringan, diulang tiap ``ping_interval`` detik
+    (keep-alive koneksi HTTP & token) setelah semua task selesai.
+    ``thread_hook(thread)`` dipanggil sebelum thread start (mis. attach context).
+    """
+
+    def __init__(
+        self,
+        tasks: Dict[str, Callable],
+        pings: Optional[Dict[str, Callable]] = None,
+        ping_interval: float = 240.0,
+        thread_hook: Optional[Callable] = None,
+    ):
+        self.tasks = dict(tasks)
+        self.pings = dict(pings or {})
+        self.ping_interval = max(5.0, float(ping_interval))
+        self.thread_hook = thread_hook
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._status: Dict[str, Dict] = {name: {"state": PENDING} for name in self.tasks}
+        self._ping_status: Dict[str, Dict] = {}
+        self._started_at: Optional[float] = None
+        self._ready_at: Optional[float] = None
+
+    def _spawn(self, target, name: str) -> threading.Thread:
+        t = threading.Thread(target=target, name=name, daemon=True)
+        if self.thread_hook is not None:
+            try:
+                self.thread_hook(t)
+            except Exception:
+                pass
+        t.start()
+        return t
+
+    def _run_task(self, name: str, fn: Callable):
+        with self._lock:
+            self._status[name] = {"state": RUNNING}
+        t0 = time.monotonic()
+        try:
+            fn()
+            st = {"state": OK}
+        except Exception as e:
+            st = {"state": ERROR, "error": str(e)[:300]}
+        st["seconds"] = round(time.monotonic() - t0, 3)
+        with self._lock:
+            self._status[name] = st
+
+    def start(self) -> "Warmup":
+        if self._started_at is not None:
+            return self
+        self._started_at = time.monotonic()
+        self._spawn(self._main, "warmup")
+        return self
+
+    def _main(self):
+        threads = [self._spawn(lambda n=n, f=f: self._run_task(n, f), f"warmup-{n}") for n, f in self.tasks.items()]
+        for t in threads:
+            t.join()
+        self._ready_at = time.monotonic()
+        print(f"Warmup selesai dalam {self._ready_at - self._started_at:.1f}s: {self.status()['tasks']}")
+        if self.pings:
+            self._keepalive()
+
+    def _keepalive(self):
+        while not self._stop.wait(self.ping_interval):
+            for name, fn in self.pings.items():
+                t0 = time.monotonic()
+                try:
+                    fn()
+                    st = {"state": OK}
+                except Exception as e:
+                    st = {"state": ERROR, "error": str(e)[:300]}
+                st["seconds"] = round(time.monotonic() - t0, 3)
+                st["at"] = time.time()
+                with self._lock:
+                    self._ping_status[name] = st
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready_at is not None
+
+    def status(self) -> Dict:
+        with self._lock:
+            tasks = {k: dict(v) for k, v in self._status.items()}
+            pings = {k: dict(v) for k, v in self._ping_status.items()}
+        return {
+            "ready": self.ready,
+            "all_ok": self.ready and all(v.get("state") == OK for v in tasks.values()),
+            "seconds": round((self._ready_at or time.monotonic()) - (self._started_at or time.monotonic()), 3),
+            "tasks": tasks,
+            "pings": pings,
+        }
@@ -1,40 +1,53 @@
+import time
+_IMPORT_T0 = time.perf_counter()
+
 import streamlit as st
 from datetime import datetime
 from zoneinfo import ZoneInfo
 import re
 import io
-import csv
 import html as html_lib
 from typing import Optional, Tuple, Dict, List
-from collections import defaultdict
-import difflib
 
 import os
+import sys
 import base64
 
-import gspread
-from google.oauth2.service_account import Credentials
-
-import dropbox
-from dropbox.sharing import RequestedVisibility, SharedLinkSettings
-from dropbox.exceptions import ApiError, AuthError
-
-import qrcode
-
-# Optional libs for better export / image optimization
-try:
-    from PIL import Image, ImageOps
-    PIL_AVAILABLE = True
-except Exception:
-    PIL_AVAILABLE = False
-
-try:
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, Alignment, PatternFill
-    from openpyxl.utils import get_column_letter
-    OPENPYXL_AVAILABLE = True
-except Exception:
-    OPENPYXL_AVAILABLE = False
+from absensi.metrics import LatencyRecorder, flatten_numeric
+from absensi.profiling import RerunProfiler
+from absensi.lazy import import_report, lazy_import, record_startup
+from absensi.arrivals import BIN_CHOICES, build_export_arrivals
+from absensi.config import Settings
+from absensi.admission import AdmissionController, Overloaded
+from absensi.core import Core
+from absensi.pool import ClientPool, PoolTimeout
+from absensi.rekap import sanitize_name, sanitize_phone
+from absensi.roster import apply_roster_entry
+from absensi.quota import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_SUBMIT,
+    SheetsScheduler,
+    is_rejected,
+    is_retryable,
+    sheets_priority,
+)
+from absensi.warmup import Warmup
+from absensi.bundle import BundleJobs
+from absensi.export import export_scopes, make_csv_bytes
+from absensi.export_snapshots import ExportSnapshots
+from absensi.images import optimize_image_bytes
+from absensi.selfie import selfie_path
+from absensi.snapshot import load_json
+from absensi.storage import STORAGE_SHEETS
+
+# ✅ Library berat di-load saat pertama dipakai (per mode), bukan di awal script:
+# - halaman QR cuma butuh qrcode
+# - gspread / google-auth / dropbox saat rekap / submit (absensi.core, koneksi pertama)
+# - PIL saat optimasi foto, openpyxl saat export XLSX
+def _is_dropbox_auth_error(e: Exception) -> bool:
+    # kalau dropbox belum pernah di-import, error ini pasti bukan AuthError
+    mod = sys.modules.get("dropbox.exceptions")
+    return mod is not None and isinstance(e, mod.AuthError)
 
 
 # =========================
@@ -48,20 +61,58 @@ st.set_page_config(
 )
 
 APP_CFG = st.secrets.get("app", {})
-SHEET_NAME = APP_CFG.get("sheet_name", "Absensi_Karyawan")
-WORKSHEET_NAME = APP_CFG.get("worksheet_name", "Log")
-DROPBOX_ROOT = APP_CFG.get("dropbox_folder", "/Absensi_Selfie")
-TZ_NAME = APP_CFG.get("timezone", "Asia/Jakarta")
+# Konfigurasi backend (sheet, partisi, kuota, pool, snapshot) -> absensi.config.Settings
+SETTINGS = Settings(APP_CFG)
+DROPBOX_ROOT = SETTINGS.dropbox_folder
+TZ_NAME = SETTINGS.timezone
 
 QR_URL = APP_CFG.get("qr_url", "")
 ENABLE_TOKEN = bool(APP_CFG.get("enable_token", False))
 TOKEN_SECRET = str(APP_CFG.get("token", "")).strip()
 
-DEFAULT_SHEET_ROWS = int(APP_CFG.get("sheet_rows", 10000))
-
-# Optimasi foto untuk HP spek rendah / internet lambat
-IMG_MAX_SIDE = int(APP_CFG.get("img_max_side", 1280))
-IMG_JPEG_QUALITY = int(APP_CFG.get("img_jpeg_quality", 78))
+# Budget waktu import awal script (cold start); lewat budget -> warning di log
+IMPORT_BUDGET_MS = float(APP_CFG.get("import_budget_ms", 250))
+STATE_DIR = SETTINGS.state_dir
+
+# Metrik latensi per tahap: JSON log per span dan/atau file teks Prometheus (textfile collector)
+METRICS_LOG_JSON = bool(APP_CFG.get("metrics_log_json", False))
+METRICS_TEXTFILE = str(APP_CFG.get("metrics_textfile", "")).strip()
+
+# Profiling per rerun (admin): selalu aktif via app.profile, atau per request via ?profile=<app.profile_key>
+PROFILE_ENABLED = bool(APP_CFG.get("profile", False))
+PROFILE_KEY = str(APP_CFG.get("profile_key", "")).strip()
+PROFILE_ENGINE = str(APP_CFG.get("profile_engine", "auto")).strip().lower()
+PROFILE_KEEP = int(APP_CFG.get("profile_keep", 50))
+PROFILE_DIR = str(APP_CFG.get("profile_dir", "")).strip() or os.path.join(STATE_DIR, "profiles")
+
+# Warm-up opsional: koneksi + cache disiapkan di background saat proses mulai
+WARMUP_ENABLED = bool(APP_CFG.get("warmup", False))
+WARMUP_PING_SECONDS = float(APP_CFG.get("warmup_ping_seconds", 240))
+
+# Snapshot export di disk: XLSX/CSV dibuat ulang di background (interval atau setelah N baris baru).
+# Opt-in: tanpa setting ini thread baru jalan kalau admin menyalakannya di Info Admin
+EXPORT_SNAPSHOT = bool(APP_CFG.get("export_snapshot", False))
+EXPORT_SNAPSHOT_SECONDS = float(APP_CFG.get("export_snapshot_seconds", 300))
+EXPORT_SNAPSHOT_MIN_ROWS = int(APP_CFG.get("export_snapshot_min_rows", 50))
+EXPORT_SNAPSHOT_MIN_GAP = float(APP_CFG.get("export_snapshot_min_gap", 60))
+# Klik "Siapkan File" memakai snapshot yang umurnya <= ini (klik bersamaan tidak membaca log berkali-kali)
+EXPORT_SNAPSHOT_FRESH = float(APP_CFG.get("export_snapshot_fresh", 30))
+
+# Tampilan admin di halaman absen (galeri selfie, belum hadir): hanya dengan ?admin=<app.admin_key>; kosong = tidak tampil
+ADMIN_KEY = str(APP_CFG.get("admin_key", "")).strip()
+
+# Galeri selfie admin: jumlah thumbnail per halaman & kolom grid
+GALLERY_PAGE_SIZE = max(1, int(APP_CFG.get("gallery_page_size", 24)))
+GALLERY_COLS = max(1, int(APP_CFG.get("gallery_cols", 6)))
+
+# Roster karyawan: jumlah saran autocomplete di form absen
+ROSTER_SUGGEST_LIMIT = max(1, int(APP_CFG.get("roster_suggest_limit", 8)))
+
+# Admission control submit: maks. submit jalan bersamaan per proses, sisanya antre FIFO
+# (panjang antrean & lama tunggu dibatasi -> lewat batas: "coba lagi dalam N detik")
+SUBMIT_MAX_INFLIGHT = max(1, int(APP_CFG.get("submit_max_inflight", 4)))
+SUBMIT_MAX_QUEUE = max(0, int(APP_CFG.get("submit_max_queue", 40)))
+SUBMIT_MAX_WAIT = float(APP_CFG.get("submit_max_wait", 45))
 
 # Brand / Tema JALA (bisa override via secrets)
 BRAND_NAME = str(APP_CFG.get("brand_name", "JALA")).strip() or "JALA"
@@ -70,33 +121,30 @@ BRAND_PRIMARY = str(APP_CFG.get("brand_primary", "#0B66E4")).strip() or "#0B66E4
 BRAND_ACCENT = str(APP_CFG.get("brand_accent", "#46C2FF")).strip() or "#46C2FF"
 BRAND_BG = str(APP_CFG.get("brand_bg", "#F5FAFF")).strip() or "#F5FAFF"
 
-# ✅ Logo path (default ke assets/jala.png)
-LOGO_PATH = str(APP_CFG.get("logo_path", "assets/jala.png")).strip() or "assets/jala.png"
-
-COL_TIMESTAMP = "Timestamp"
-COL_NAMA = "Nama"
-COL_HP = "No HP/WA"
-COL_POSISI = "Posisi"
-COL_LINK_SELFIE = "Bukti Selfie"
-COL_DBX_PATH = "Dropbox Path"
+# ✅ Logo path (default ke static/jala.png; path lama assets/... otomatis dicari di static/)
+LOGO_PATH = str(APP_CFG.get("logo_path", "static/jala.png")).strip() or "static/jala.png"
+# File di folder static/ dilayani Streamlit (server.enableStaticServing) -> logo bisa di-cache browser
+STATIC_SERVING = bool(APP_CFG.get("static_serving", True))
 
-SHEET_COLUMNS = [COL_TIMESTAMP, COL_NAMA, COL_HP, COL_POSISI, COL_LINK_SELFIE, COL_DBX_PATH]
-
-# ✅ Header atas untuk file XLSX (merged di atas tabel)
-EXPORT_TOP_HEADER_LINES = [
-    "JALA",
-    "Eastparc Hotel Yogyakarta, 09 January 2026",
-    "Kick Off Meeting 2026",
-]
+_import_warning = record_startup(time.perf_counter() - _IMPORT_T0, IMPORT_BUDGET_MS)
+if _import_warning:
+    print(f"Startup Warning: {_import_warning}")
 
 
 # =========================
 # UI THEME (CSS)
 # =========================
-def inject_brand_css():
-    st.markdown(
-        f"""
-<style>
+def minify_css(css: str) -> str:
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{}:;,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+@st.cache_resource
+def brand_css_html() -> str:
+    """CSS tema di-format & di-minify sekali per proses (bukan tiap rerun)."""
+    css = f"""
 /* Force light (mencegah komponen jadi hitam & text tidak kebaca) */
 html, body {{
   color-scheme: light !important;
@@ -359,10 +407,12 @@ table.jala-table td {{
 table.jala-table tr:last-child td {{
   border-bottom: 0;
 }}
-</style>
-        """,
-        unsafe_allow_html=True,
-    )
+"""
+    return f"<style>{minify_css(css)}</style>"
+
+
+def inject_brand_css():
+    st.markdown(brand_css_html(), unsafe_allow_html=True)
 
 
 # ✅ helper logo (diletakkan sebelum render_header agar bisa dipakai)
@@ -387,60 +437,65 @@ def load_logo_data_uri(path: str) -> str:
     return f"data:image/{mime};base64,{b64}"
 
 
-def render_header(chip_text: str, subtitle: str):
-    logo_uri = load_logo_data_uri(LOGO_PATH)
-    logo_html = f'<img class="jala-logo" src="{logo_uri}" alt="{BRAND_NAME} logo"/>' if logo_uri else ""
+@st.cache_resource
+def logo_src(path: str) -> str:
+    """URL logo: file statis (cacheable) kalau ada di static/, selain itu fallback data URI."""
+    if not path:
+        return ""
+    full = _abs_path(path)
+    if not os.path.exists(full):
+        # logo dulu di assets/ (sekarang static/) -> secrets lama logo_path = "assets/..." tetap jalan
+        legacy = os.path.relpath(full, _abs_path("assets"))
+        if legacy.startswith(".."):
+            return ""
+        full = os.path.join(_abs_path("static"), legacy)
+        if not os.path.exists(full):
+            return ""
 
-    st.markdown(
-        f"""
-<div class="jala-topbar">
-  <div class="jala-brand">
-    <div class="jala-brand-center">
-      {logo_html}
-      <div class="jala-subtitle">{subtitle}</div>
-    </div>
-    <div class="jala-chip">{chip_text}</div>
-  </div>
-</div>
-        """,
-        unsafe_allow_html=True,
+    rel = os.path.relpath(full, _abs_path("static")).replace(os.sep, "/")
+    if STATIC_SERVING and not rel.startswith(".."):
+        # ?v=<mtime> supaya cache browser ikut berganti kalau logo diganti
+        return f"app/static/{rel}?v={int(os.path.getmtime(full))}"
+    return load_logo_data_uri(full)
+
+
+@st.cache_resource
+def header_template() -> str:
+    """Markup header (tanpa subtitle & chip) disusun sekali per proses."""
+    src = logo_src(LOGO_PATH)
+    logo_html = f'<img class="jala-logo" src="{escape(src)}" alt="{escape(BRAND_NAME)} logo"/>' if src else ""
+    return (
+        '<div class="jala-topbar"><div class="jala-brand"><div class="jala-brand-center">'
+        + logo_html.replace("{", "{{").replace("}", "}}")
+        + '<div class="jala-subtitle">{subtitle}</div></div>'
+        + '<div class="jala-chip">{chip}</div></div></div>'
     )
 
 
+def render_header(chip_text: str, subtitle: str):
+    st.markdown(header_template().format(subtitle=subtitle, chip=chip_text), unsafe_allow_html=True)
+
+
 inject_brand_css()
 
 
 # =========================
 # HELPERS
 # =========================
-def get_mode() -> str:
+def get_query_param(name: str) -> str:
     try:
-        return str(st.query_params.get("mode", "")).strip().lower()
+        return str(st.query_params.get(name, "")).strip()
     except Exception:
         qp = st.experimental_get_query_params()
-        return (qp.get("mode", [""])[0] or "").strip().lower()
+        return (qp.get(name, [""])[0] or "").strip()
 
 
-def get_token_from_url() -> str:
-    try:
-        return str(st.query_params.get("token", "")).strip()
-    except Exception:
-        qp = st.experimental_get_query_params()
-        return (qp.get("token", [""])[0] or "").strip()
-
-
-def sanitize_name(text: str) -> str:
-    text = str(text).strip()
-    text = re.sub(r"\s+", " ", text)
-    text = re.sub(r"[^A-Za-z0-9 _.-]", "", text)
-    return text.strip()
+def get_mode() -> str:
+    return get_query_param("mode").lower()
 
 
-def sanitize_phone(text: str) -> str:
-    text = str(text).strip()
-    if text.startswith("+"):
-        return "+" + re.sub(r"\D", "", text[1:])
-    return re.sub(r"\D", "", text)
+def get_token_from_url() -> str:
+    return get_query_param("token")
 
 
 def now_local():
@@ -449,6 +504,7 @@ def now_local():
 
 @st.cache_data(show_spinner=False)
 def build_qr_png(url: str) -> bytes:
+    qrcode = lazy_import("qrcode")
     qr = qrcode.QRCode(
         version=None,
         error_correction=qrcode.constants.ERROR_CORRECT_M,
@@ -463,13 +519,6 @@ def build_qr_png(url: str) -> bytes:
     return buf.getvalue()
 
 
-def make_hyperlink(url: str, label: str = "Bukti Foto") -> str:
-    if not url or url == "-":
-        return "-"
-    safe = url.replace('"', '""')
-    return f'=HYPERLINK("{safe}", "{label}")'
-
-
 def detect_ext_and_mime(mime: str) -> str:
     mime = (mime or "").lower()
     if "png" in mime:
@@ -487,36 +536,6 @@ def get_selfie_bytes(selfie_cam, selfie_upload) -> Tuple[Optional[bytes], str]:
     return None, ".jpg"
 
 
-def optimize_image_bytes(img_bytes: bytes, ext: str) -> Tuple[bytes, str]:
-    if not PIL_AVAILABLE:
-        return img_bytes, ext
-    try:
-        img = Image.open(io.BytesIO(img_bytes))
-        img = ImageOps.exif_transpose(img)
-        if img.mode not in ("RGB", "L"):
-            bg = Image.new("RGB", img.size, (255, 255, 255))
-            if img.mode in ("RGBA", "LA"):
-                bg.paste(img, mask=img.split()[-1])
-            else:
-                bg.paste(img)
-            img = bg
-        else:
-            img = img.convert("RGB")
-
-        w, h = img.size
-        max_side = max(w, h)
-        if max_side > IMG_MAX_SIDE:
-            scale = IMG_MAX_SIDE / float(max_side)
-            new_size = (max(1, int(w * scale)), max(1, int(h * scale)))
-            img = img.resize(new_size, Image.LANCZOS)
-
-        out = io.BytesIO()
-        img.save(out, format="JPEG", quality=IMG_JPEG_QUALITY, optimize=True, progressive=True)
-        return out.getvalue(), ".jpg"
-    except Exception:
-        return img_bytes, ext
-
-
 def escape(s: str) -> str:
     return html_lib.escape(str(s if s is not None else ""))
 
@@ -548,559 +567,208 @@ def render_table(rows: List[Dict], columns: List[str], min_width_px: int = 520):
 
 
 # =========================
-# GOOGLE SHEETS
+# METRICS
 # =========================
-def auto_format_absensi_sheet(ws):
-    try:
-        sheet_id = ws.id
-        row_count = ws.row_count
-        col_widths = [170, 180, 150, 180, 140, 340]
-        requests = []
-
-        for i, w in enumerate(col_widths):
-            requests.append({
-                "updateDimensionProperties": {
-                    "range": {"sheetId": sheet_id, "dimension": "COLUMNS", "startIndex": i, "endIndex": i + 1},
-                    "properties": {"pixelSize": w},
-                    "fields": "pixelSize"
-                }
-            })
-
-        requests.append({
-            "repeatCell": {
-                "range": {"sheetId": sheet_id, "startRowIndex": 0, "endRowIndex": 1},
-                "cell": {"userEnteredFormat": {
-                    "textFormat": {"bold": True},
-                    "horizontalAlignment": "CENTER",
-                    "verticalAlignment": "MIDDLE",
-                    "backgroundColor": {"red": 0.93, "green": 0.95, "blue": 0.99},
-                    "wrapStrategy": "WRAP"
-                }},
-                "fields": "userEnteredFormat(textFormat,horizontalAlignment,verticalAlignment,backgroundColor,wrapStrategy)"
-            }
-        })
-
-        requests.append({
-            "updateSheetProperties": {
-                "properties": {"sheetId": sheet_id, "gridProperties": {"frozenRowCount": 1}},
-                "fields": "gridProperties.frozenRowCount"
-            }
-        })
-
-        requests.append({
-            "repeatCell": {
-                "range": {"sheetId": sheet_id, "startRowIndex": 1, "endRowIndex": row_count},
-                "cell": {"userEnteredFormat": {"verticalAlignment": "MIDDLE", "wrapStrategy": "CLIP"}},
-                "fields": "userEnteredFormat(verticalAlignment,wrapStrategy)"
-            }
-        })
-
-        # Center Timestamp & HP
-        requests.append({
-            "repeatCell": {
-                "range": {"sheetId": sheet_id, "startRowIndex": 1, "endRowIndex": row_count,
-                          "startColumnIndex": 0, "endColumnIndex": 1},
-                "cell": {"userEnteredFormat": {"horizontalAlignment": "CENTER"}},
-                "fields": "userEnteredFormat(horizontalAlignment)"
-            }
-        })
-        requests.append({
-            "repeatCell": {
-                "range": {"sheetId": sheet_id, "startRowIndex": 1, "endRowIndex": row_count,
-                          "startColumnIndex": 2, "endColumnIndex": 3},
-                "cell": {"userEnteredFormat": {"horizontalAlignment": "CENTER"}},
-                "fields": "userEnteredFormat(horizontalAlignment)"
-            }
-        })
-
-        # Wrap Dropbox Path
-        requests.append({
-            "repeatCell": {
-                "range": {"sheetId": sheet_id, "startRowIndex": 1, "endRowIndex": row_count,
-                          "startColumnIndex": 5, "endColumnIndex": 6},
-                "cell": {"userEnteredFormat": {"wrapStrategy": "WRAP"}},
-                "fields": "userEnteredFormat(wrapStrategy)"
-            }
-        })
-
-        ws.spreadsheet.batch_update({"requests": requests})
-    except Exception as e:
-        print(f"Format Absensi Error: {e}")
+def _backend_gauges() -> Dict:
+    gauges = flatten_numeric("sheets", get_sheets_scheduler().metrics())
+    gauges.update(flatten_numeric("pool_gsheet", get_gsheet_pool().stats()))
+    gauges.update(flatten_numeric("pool_dropbox", get_dropbox_pool().stats()))
+    gauges.update(flatten_numeric("submit_admission", get_admission().status()))
+    return gauges
 
 
 @st.cache_resource
-def connect_gsheet():
-    if "gcp_service_account" not in st.secrets:
-        raise RuntimeError("GSheet secrets tidak ditemukan: gcp_service_account")
+def get_metrics() -> LatencyRecorder:
+    return LatencyRecorder(
+        log_json=METRICS_LOG_JSON,
+        textfile=METRICS_TEXTFILE or None,
+        extra_gauges=_backend_gauges,
+    )
 
-    scopes = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
-    creds_dict = dict(st.secrets["gcp_service_account"])
-    if "private_key" in creds_dict:
-        creds_dict["private_key"] = creds_dict["private_key"].replace("\\n", "\n")
 
-    creds = Credentials.from_service_account_info(creds_dict, scopes=scopes)
-    gc = gspread.authorize(creds)
-    return gc.open(SHEET_NAME)
+@st.cache_resource
+def get_profiler() -> RerunProfiler:
+    return RerunProfiler(PROFILE_DIR, keep=PROFILE_KEEP, engine=PROFILE_ENGINE, root=_abs_path("."))
 
 
-def get_or_create_ws(spreadsheet):
-    try:
-        ws = spreadsheet.worksheet(WORKSHEET_NAME)
-    except gspread.WorksheetNotFound:
-        ws = spreadsheet.add_worksheet(title=WORKSHEET_NAME, rows=DEFAULT_SHEET_ROWS, cols=len(SHEET_COLUMNS))
-        ws.append_row(SHEET_COLUMNS, value_input_option="USER_ENTERED")
-        auto_format_absensi_sheet(ws)
-        return ws
+@st.cache_resource
+def get_admission() -> AdmissionController:
+    # 1 antrean per proses: semua session submit lewat sini sebelum menyentuh pool / kuota
+    return AdmissionController(
+        max_inflight=SUBMIT_MAX_INFLIGHT, max_queue=SUBMIT_MAX_QUEUE, max_wait=SUBMIT_MAX_WAIT
+    )
+
 
-    if ws.row_count < DEFAULT_SHEET_ROWS:
-        ws.resize(rows=DEFAULT_SHEET_ROWS)
+def admin_requested() -> bool:
+    # halaman absen publik (link QR) -> data pribadi hanya untuk yang membawa admin_key
+    return bool(ADMIN_KEY) and get_query_param("admin") == ADMIN_KEY
 
-    header = ws.row_values(1)
-    if header != SHEET_COLUMNS:
-        ws.resize(cols=max(ws.col_count, len(SHEET_COLUMNS)))
-        ws.update("A1", [SHEET_COLUMNS], value_input_option="USER_ENTERED")
-        auto_format_absensi_sheet(ws)
-    return ws
+
+def profiling_requested() -> bool:
+    if PROFILE_ENABLED:
+        return True
+    return bool(PROFILE_KEY) and get_query_param("profile") == PROFILE_KEY
 
 
 # =========================
-# DROPBOX
+# BACKEND (absensi.core)
 # =========================
 @st.cache_resource
-def connect_dropbox():
-    if "dropbox" not in st.secrets or "access_token" not in st.secrets["dropbox"]:
-        raise RuntimeError("Dropbox secrets tidak ditemukan: dropbox.access_token")
+def get_core() -> Core:
+    # 1 Core per proses: pool client, scheduler kuota, cursor baris, partisi, rekap store
+    return Core(st.secrets, SETTINGS, base_dir=_abs_path("."))
 
-    dbx = dropbox.Dropbox(st.secrets["dropbox"]["access_token"])
-    dbx.users_get_current_account()
-    return dbx
 
+def get_sheets_scheduler() -> SheetsScheduler:
+    return get_core().scheduler
 
-def upload_selfie_to_dropbox(dbx, img_bytes: bytes, nama: str, ts_file: str, ext: str) -> Tuple[str, str]:
-    clean_name = sanitize_name(nama).replace(" ", "_") or "Unknown"
-    filename = f"{ts_file}_selfie{ext}"
-    path = f"{DROPBOX_ROOT}/{clean_name}/{filename}"
 
-    dbx.files_upload(img_bytes, path, mode=dropbox.files.WriteMode.add)
+def get_gsheet_pool() -> ClientPool:
+    return get_core().gsheet_pool
 
-    settings = SharedLinkSettings(requested_visibility=RequestedVisibility.public)
-    url = "-"
-    try:
-        link = dbx.sharing_create_shared_link_with_settings(path, settings=settings)
-        url = link.url
-    except ApiError as e:
-        try:
-            if e.error.is_shared_link_already_exists():
-                links = dbx.sharing_list_shared_links(path, direct_only=True).links
-                if links:
-                    url = links[0].url
-        except Exception:
-            url = "-"
 
-    url_raw = url.replace("?dl=0", "?raw=1") if url and url != "-" else "-"
-    return url_raw, path
+def use_gsheet():
+    """``with use_gsheet() as sh:`` -> spreadsheet dari pool (eksklusif untuk thread ini)."""
+    return get_core().use_gsheet()
 
 
-# =========================
-# REKAP
-# =========================
-def normalize_posisi(text: str) -> str:
-    t = str(text or "").strip().lower()
-    t = t.replace("&", " dan ")
-    t = re.sub(r"[/,_\\-\\.]+", " ", t)
-    t = re.sub(r"[^a-z0-9\\s]+", " ", t)
-    t = re.sub(r"\\s+", " ", t).strip()
-    return t
-
-
-POSISI_ALIASES: Dict[str, str] = {
-    "spv": "supervisor",
-    "sup": "supervisor",
-    "super visor": "supervisor",
-    "supervisior": "supervisor",
-    "admin": "administrasi",
-    "adm": "administrasi",
-    "kry": "karyawan",
-    "karyawan": "karyawan",
-    "staf": "staff",
-    "staff": "staff",
-    "teknisi": "teknisi",
-    "technician": "teknisi",
-    "driver": "driver",
-    "drv": "driver",
-    "security": "security",
-    "satpam": "security",
-}
-
-
-def smart_canonical_posisi(raw_pos: str, known_canon: List[str]) -> str:
-    p = normalize_posisi(raw_pos)
-    if not p:
-        return ""
-    if p in POSISI_ALIASES:
-        p = POSISI_ALIASES[p]
-    if known_canon:
-        best = difflib.get_close_matches(p, known_canon, n=1, cutoff=0.88)
-        if best:
-            return best[0]
-    return p
+def get_dropbox_pool() -> ClientPool:
+    return get_core().dropbox_pool
 
 
-def display_posisi(canon: str) -> str:
-    if not canon:
-        return "-"
-    return " ".join(w.capitalize() for w in canon.split())
+def use_dropbox():
+    """``with use_dropbox() as dbx:`` -> client Dropbox dari pool."""
+    return get_core().use_dropbox()
 
 
-def parse_date_prefix(ts: str) -> str:
-    s = str(ts or "").strip()
-    if not s:
-        return ""
-    try:
-        dt = datetime.strptime(s, "%d-%m-%Y %H:%M:%S")
-        return dt.strftime("%d-%m-%Y")
-    except Exception:
-        return s[:10]
+def store_selfie(img_bytes: bytes, nama: str, ts_file: str, ext: str) -> Tuple[str, str]:
+    path = selfie_path(DROPBOX_ROOT, nama, ts_file, ext, SETTINGS.dropbox_layout)
+    return get_core().put_selfie(path, img_bytes, metrics=get_metrics()), path
 
 
-def _group_contiguous_rows(rows: List[int]) -> List[Tuple[int, int]]:
-    if not rows:
-        return []
-    rows = sorted(rows)
-    ranges = []
-    start = prev = rows[0]
-    for r in rows[1:]:
-        if r == prev + 1:
-            prev = r
-        else:
-            ranges.append((start, prev))
-            start = prev = r
-    ranges.append((start, prev))
-    return ranges
+def get_roster():
+    # dibaca sekali per proses (TTL roster_ttl_seconds di Core); None kalau tab Roster tidak ada
+    return get_core().roster()
 
 
-@st.cache_data(ttl=30, show_spinner=False)
-def get_rekap_today() -> Dict:
-    sh = connect_gsheet()
-    ws = get_or_create_ws(sh)
-
-    today_str = now_local().strftime("%d-%m-%Y")
-
-    ts_col = ws.col_values(1)
-    if not ts_col or len(ts_col) < 2:
-        return {"today": today_str, "total": 0, "dup_removed": 0, "by_pos": [], "all_people": []}
-
-    match_rows = []
-    for idx, ts in enumerate(ts_col[1:], start=2):
-        if parse_date_prefix(ts) == today_str:
-            match_rows.append(idx)
-
-    if not match_rows:
-        return {"today": today_str, "total": 0, "dup_removed": 0, "by_pos": [], "all_people": []}
-
-    ranges = _group_contiguous_rows(match_rows)
-    data = []
-    for a, b in ranges:
-        chunk = ws.get(f"A{a}:D{b}")
-        if chunk:
-            data.extend(chunk)
-
-    seen_keys = set()
-    dup_removed = 0
-    people_by_pos = defaultdict(list)
-    all_people = []
-    known_canon: List[str] = []
-
-    for r in data:
-        ts = (r[0] if len(r) > 0 else "") or ""
-        nama = (r[1] if len(r) > 1 else "") or ""
-        hp = (r[2] if len(r) > 2 else "") or ""
-        pos = (r[3] if len(r) > 3 else "") or ""
-
-        if parse_date_prefix(ts) != today_str:
-            continue
+# =========================
+# REKAP
+# =========================
+def rekap_revision() -> int:
+    # dengan cache bersama: submit di replica mana pun menaikkan revisi -> cache rekap semua replica kedaluwarsa
+    try:
+        return get_core().rekap_store.revision()
+    except Exception as e:
+        print(f"Shared Cache Error: {e}")
+        return 0
 
-        nama_clean = sanitize_name(nama)
-        hp_clean = sanitize_phone(hp)
-        key = hp_clean if hp_clean else nama_clean.lower().strip()
-        if not key:
-            continue
-
-        if key in seen_keys:
-            dup_removed += 1
-            continue
-        seen_keys.add(key)
-
-        pos_canon = smart_canonical_posisi(pos, known_canon)
-        if pos_canon and pos_canon not in known_canon:
-            known_canon.append(pos_canon)
-
-        who = nama_clean if nama_clean else (hp_clean if hp_clean else "Tanpa Nama")
-        who_display = f"{who} ({hp_clean})" if hp_clean and who else who
-
-        all_people.append({
-            "Nama": who,
-            "No HP/WA": hp_clean or "-",
-            "Posisi": display_posisi(pos_canon) if pos_canon else "-",
-            "Timestamp": ts,
-        })
-        people_by_pos[pos_canon if pos_canon else "(tanpa posisi)"].append(who_display)
-
-    by_pos = []
-    for canon, people in people_by_pos.items():
-        by_pos.append({
-            "Posisi": display_posisi(canon) if canon != "(tanpa posisi)" else "Tanpa Posisi",
-            "Jumlah": len(people),
-            "Yang Hadir": ", ".join(people),
-        })
-    by_pos.sort(key=lambda x: (-x["Jumlah"], x["Posisi"].lower()))
-
-    return {
-        "today": today_str,
-        "total": len(seen_keys),
-        "dup_removed": dup_removed,
-        "by_pos": by_pos,
-        "all_people": all_people,
-    }
+
+@st.cache_data(ttl=30, show_spinner=False)
+def get_rekap_today(rev: int = 0) -> Dict:
+    # hanya partisi yang mencakup hari ini, dan hanya baris setelah high-water mark
+    # (``rev`` hanya key cache; 0 kalau tanpa cache bersama)
+    metrics = get_metrics()
+    with metrics.span("rekap.total"):
+        return get_core().rekap(now_local().date(), metrics=metrics)
 
 
 # =========================
 # EXPORT
 # =========================
-HYPERLINK_RE = re.compile(r'=HYPERLINK\("(?P<url>.*?)"\s*,\s*"(?P<label>.*?)"\)', re.IGNORECASE)
+def _build_export_snapshot(kind: str):
+    return get_core().export_files(kind, ("xlsx", "csv"), day=now_local().date(), metrics=get_metrics())
 
 
-def extract_hyperlink_url(formula_or_value: str) -> str:
-    s = str(formula_or_value or "").strip()
-    if not s:
-        return ""
-    m = HYPERLINK_RE.match(s)
-    if not m:
-        if s.startswith("http://") or s.startswith("https://"):
-            return s
-        return ""
-    url = m.group("url").replace('""', '"')
-    return url
+def _submits_busy() -> bool:
+    # ada submit jalan / antre -> build XLSX background menunggu (CPU & kuota untuk check-in)
+    adm = get_admission().status()
+    return adm["inflight"] > 0 or adm["queue"] > 0
 
 
-def make_csv_bytes(header: List[str], rows: List[List[str]]) -> bytes:
+@st.cache_resource
+def get_export_snapshots() -> ExportSnapshots:
     """
-    CSV rapi untuk Excel Indonesia:
-    - delimiter ';'
-    - tambah baris pertama 'sep=;' agar Excel auto-parse
-    - encoding utf-8-sig agar aman untuk Excel
+    File "Rekap Hari Ini" & "Log Lengkap" (1 objek per proses). Thread background
+    hanya jalan setelah ``.start()`` (setting ``app.export_snapshot`` / tombol admin).
     """
-    buf = io.StringIO()
-    writer = csv.writer(buf, delimiter=";", quoting=csv.QUOTE_MINIMAL)
-    buf.write("sep=;\n")
-    writer.writerow(header)
-    for r in rows:
-        writer.writerow(r)
-    return buf.getvalue().encode("utf-8-sig")
-
-
-def make_xlsx_bytes(
-    sheet_name: str,
-    header: List[str],
-    rows: List[List[str]],
-    hyperlink_col: Optional[int] = None,
-    top_header_lines: Optional[List[str]] = None,
-) -> bytes:
-    if not OPENPYXL_AVAILABLE:
-        raise RuntimeError("openpyxl belum terpasang. Tambahkan 'openpyxl' ke requirements.txt")
-
-    top_header_lines = top_header_lines or []
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = sheet_name[:31]
-
-    n_cols = len(header)
-
-    # --- Styles
-    title_font = Font(bold=True, size=18, color="0A2540")
-    subtitle_font = Font(bold=True, size=12, color="0A2540")
-    center = Alignment(horizontal="center", vertical="center", wrap_text=True)
-
-    header_fill = PatternFill("solid", fgColor="EAF3FF")
-    header_font = Font(bold=True, color="0A2540")
-    header_align = Alignment(horizontal="center", vertical="center", wrap_text=True)
-
-    body_align = Alignment(vertical="top", wrap_text=True)
-
-    current_row = 0
-
-    # --- Top header (3 baris) + merge A..last
-    if top_header_lines:
-        for i, line in enumerate(top_header_lines, start=1):
-            ws.append([line] + [""] * (n_cols - 1))
-            current_row += 1
-
-            ws.merge_cells(start_row=current_row, start_column=1, end_row=current_row, end_column=n_cols)
-            c = ws.cell(row=current_row, column=1)
-            c.alignment = center
-            c.font = title_font if i == 1 else subtitle_font
-
-            ws.row_dimensions[current_row].height = 26 if i == 1 else 18
-
-        # spacer row
-        ws.append([""] * n_cols)
-        current_row += 1
-        ws.row_dimensions[current_row].height = 8
-
-    # --- Table header (kolom-kolom)
-    ws.append(header)
-    current_row += 1
-    table_header_row = current_row
-
-    for col_idx in range(1, n_cols + 1):
-        c = ws.cell(row=table_header_row, column=col_idx)
-        c.fill = header_fill
-        c.font = header_font
-        c.alignment = header_align
-
-    ws.row_dimensions[table_header_row].height = 20
+    return ExportSnapshots(
+        get_core().state_path("exports"),
+        _build_export_snapshot,
+        kinds=("rekap", "log"),
+        interval=EXPORT_SNAPSHOT_SECONDS,
+        min_new_rows=EXPORT_SNAPSHOT_MIN_ROWS,
+        min_gap=EXPORT_SNAPSHOT_MIN_GAP,
+        counter=get_core().rows_counter,
+        day_fn=lambda: now_local().strftime("%d-%m-%Y"),
+        metrics=get_metrics(),
+        thread_hook=_attach_script_ctx,
+        shared=get_core().shared,
+        busy=_submits_busy,
+    )
 
-    # Freeze sampai baris header tabel
-    data_start_row = table_header_row + 1
-    ws.freeze_panes = f"A{data_start_row}"
 
-    # --- Data rows
-    for r in rows:
-        ws.append(r)
-
-    # --- Body alignment
-    for row in ws.iter_rows(min_row=data_start_row, max_row=ws.max_row, min_col=1, max_col=n_cols):
-        for cell in row:
-            cell.alignment = body_align
-
-    # --- Hyperlink handling (kolom URL)
-    if hyperlink_col is not None and 0 <= hyperlink_col < len(header):
-        col_excel = hyperlink_col + 1
-        for row_idx in range(data_start_row, ws.max_row + 1):
-            cell = ws.cell(row=row_idx, column=col_excel)
-            url = str(cell.value or "").strip()
-            if url.startswith("http://") or url.startswith("https://"):
-                cell.value = "Bukti Foto"
-                cell.hyperlink = url
-                cell.font = Font(color="0B66E4", underline="single")
-
-    # --- Column widths
-    preset_widths = {}
-    for i, col_name in enumerate(header):
-        name = col_name.lower().strip()
-        if name in ("no", "nomor"):
-            preset_widths[i + 1] = 6
-        elif "timestamp" in name:
-            preset_widths[i + 1] = 20
-        elif "nama" in name:
-            preset_widths[i + 1] = 24
-        elif "no hp" in name or "wa" in name:
-            preset_widths[i + 1] = 16
-        elif "posisi" in name:
-            preset_widths[i + 1] = 18
-        elif "dropbox" in name:
-            preset_widths[i + 1] = 46
-        elif "bukti" in name or "selfie" in name:
-            preset_widths[i + 1] = 18
-        else:
-            preset_widths[i + 1] = 18
-
-    for col_idx, w in preset_widths.items():
-        ws.column_dimensions[get_column_letter(col_idx)].width = w
-
-    out = io.BytesIO()
-    wb.save(out)
-    return out.getvalue()
-
-
-# ✅ Export rekap hari ini: sudah ada kolom "No"
-def build_export_rekap_today(rekap: Dict) -> Tuple[List[str], List[List[str]]]:
-    header = ["No", "Timestamp", "Nama", "No HP/WA", "Posisi"]
-    rows = []
-    for i, p in enumerate(rekap.get("all_people", []), start=1):
-        rows.append([
-            str(i),
-            str(p.get("Timestamp", "")),
-            str(p.get("Nama", "")),
-            str(p.get("No HP/WA", "")),
-            str(p.get("Posisi", "")),
-        ])
-    return header, rows
-
-
-# ✅ FIX Timestamp export:
-# - A:D ambil FORMATTED_VALUE (biar Timestamp tidak jadi 46082.xxx)
-# - E ambil FORMULA (biar bisa ekstrak URL HYPERLINK)
-# - F ambil FORMATTED_VALUE
-def fetch_log_full() -> Tuple[List[str], List[List[str]]]:
-    sh = connect_gsheet()
-    ws = get_or_create_ws(sh)
-
-    export_header = ["No", COL_TIMESTAMP, COL_NAMA, COL_HP, COL_POSISI, "Bukti Selfie (URL)", COL_DBX_PATH]
-
-    # A:D formatted
-    try:
-        ad = ws.get("A:D", value_render_option="FORMATTED_VALUE")
-    except TypeError:
-        ad = ws.get("A:D")
+@st.cache_resource
+def get_bundle_jobs() -> BundleJobs:
+    # ZIP bukti di thread background (1 job per rentang tanggal), rerun admin hanya membaca progres
+    return BundleJobs(thread_hook=_attach_script_ctx)
 
-    # E formula
-    try:
-        e_col = ws.get("E:E", value_render_option="FORMULA")
-    except TypeError:
-        e_col = ws.get("E:E")
 
-    # F formatted
+# =========================
+# WARM-UP
+# =========================
+def _attach_script_ctx(thread):
+    # biar st.cache_data bisa dipakai dari thread warm-up tanpa warning ScriptRunContext
     try:
-        f_col = ws.get("F:F", value_render_option="FORMATTED_VALUE")
-    except TypeError:
-        f_col = ws.get("F:F")
+        from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+        add_script_run_ctx(thread, get_script_run_ctx())
+    except Exception:
+        pass
 
-    if not ad or len(ad) < 2:
-        return export_header, []
 
-    max_len = max(len(ad), len(e_col) if e_col else 0, len(f_col) if f_col else 0)
+def _warm_gsheet():
+    get_gsheet_pool().warm(min(2, SETTINGS.gsheet_pool_size))
+    with use_gsheet() as sh, sheets_priority(PRIORITY_BACKGROUND):
+        ws = get_core().get_write_ws(sh, now_local())
+        if not get_core().server_append():
+            get_core().row_cursor(ws.id).sync(ws)
 
-    rows = []
-    for i in range(1, max_len):  # start from data row (skip header)
-        row_ad = ad[i] if i < len(ad) else []
-        row_e = e_col[i] if (e_col and i < len(e_col)) else []
-        row_f = f_col[i] if (f_col and i < len(f_col)) else []
 
-        row_ad = (row_ad + [""] * 4)[:4]
-        ts, nama, hp, pos = row_ad
+def _ping_gsheet():
+    with sheets_priority(PRIORITY_BACKGROUND):
+        get_gsheet_pool().each_idle(lambda sh: sh.fetch_sheet_metadata({"fields": "spreadsheetId"}))
 
-        bukti_formula = (row_e[0] if row_e else "") or ""
-        dbx_path = (row_f[0] if row_f else "") or ""
 
-        url = extract_hyperlink_url(bukti_formula)
-        bukti_out = url if url else ""
+def _archive_partitions():
+    # arsip partisi setelah rollover: di thread warm-up, bukan di request check-in yang memicunya
+    get_core().archive_partitions()
 
-        if not (
-            str(ts).strip()
-            or str(nama).strip()
-            or str(hp).strip()
-            or str(pos).strip()
-            or str(bukti_out).strip()
-            or str(dbx_path).strip()
-        ):
-            continue
 
-        rows.append([
-            str(ts).strip(),
-            str(nama).strip(),
-            str(hp).strip(),
-            str(pos).strip(),
-            str(bukti_out).strip(),
-            str(dbx_path).strip(),
-        ])
+def _ping_dropbox():
+    get_dropbox_pool().each_idle(lambda dbx: dbx.users_get_current_account())
 
-    numbered_rows = []
-    for idx, r in enumerate(rows, start=1):
-        numbered_rows.append([str(idx)] + r)
 
-    return export_header, numbered_rows
+@st.cache_resource
+def start_warmup() -> Warmup:
+    """Jalan sekali per proses (dipicu oleh script run pertama setelah deploy / bangun)."""
+    remote = SETTINGS.storage == STORAGE_SHEETS
+    tasks = {
+        "gsheet": _warm_gsheet,
+        "dropbox": lambda: get_dropbox_pool().warm(1),
+        "partisi": lambda: get_core().archive_partitions(force=True),
+    } if remote else {}
+    return Warmup(
+        tasks={**tasks, "rekap": lambda: get_rekap_today(rekap_revision()), "roster": get_roster},
+        pings={"gsheet": _ping_gsheet, "dropbox": _ping_dropbox, "partisi": _archive_partitions} if remote else {},
+        ping_interval=WARMUP_PING_SECONDS,
+        thread_hook=_attach_script_ctx,
+    ).start()
+
+
+if WARMUP_ENABLED:
+    start_warmup()
+    if EXPORT_SNAPSHOT:
+        # tanpa warm-up, thread snapshot mulai saat halaman admin pertama kali dibuka
+        get_export_snapshots().start()
 
 
 # =========================
@@ -1112,6 +780,11 @@ if "submitted_once" not in st.session_state:
     st.session_state.submitted_once = False
 if "selfie_method" not in st.session_state:
     st.session_state.selfie_method = "Upload"
+for _k in ("form_nama", "form_hp", "form_posisi", "roster_filled"):
+    if _k not in st.session_state:
+        st.session_state[_k] = ""
+if "roster_autofill" not in st.session_state:
+    st.session_state.roster_autofill = None
 
 if "export_ready" not in st.session_state:
     st.session_state.export_ready = False
@@ -1121,15 +794,63 @@ if "export_csv" not in st.session_state:
     st.session_state.export_csv = None
 if "export_base_name" not in st.session_state:
     st.session_state.export_base_name = ""
+if "export_snap" not in st.session_state:
+    st.session_state.export_snap = None
 
 
 # =========================
 # PAGES
 # =========================
-mode = get_mode()
-
 # ===== PAGE: QR / ADMIN
-if mode != "absen":
+def render_admin_info():
+    """Statistik backend proses ini (kuota, latensi, pool, profil) + kontrol snapshot export."""
+    st.write("**Kuota Google Sheets (proses ini):**")
+    st.json(get_sheets_scheduler().metrics())
+    st.write("**Latensi per tahap (ms, proses ini):**")
+    lat = get_metrics().summary()
+    render_table(lat["spans_ms"], columns=["name", "count", "errors", "p50", "p95", "p99", "max"])
+    if lat["values"]:
+        st.caption("Ukuran foto (byte) sebelum/sesudah optimasi")
+        render_table(lat["values"], columns=["name", "count", "p50", "p95", "p99", "max"])
+    st.download_button(
+        "⬇️ Metrics (Prometheus)",
+        data=get_metrics().prometheus_text(),
+        file_name="absensi_metrics.prom",
+        mime="text/plain",
+        use_container_width=True,
+    )
+
+    if SETTINGS.shared_cache:
+        st.write(f"**Cache bersama:** `{SETTINGS.shared_cache.split('@')[-1]}` • revisi rekap {rekap_revision()}")
+    if WARMUP_ENABLED:
+        st.write("**Warm-up backend:**")
+        st.json(start_warmup().status())
+    st.write("**Waktu import (cold start):**")
+    st.json(import_report())
+    st.write("**Cache thumbnail galeri:**")
+    st.json(get_core().thumb_cache.stats())
+    st.write("**Snapshot export:**")
+    snapshots = get_export_snapshots()
+    if EXPORT_SNAPSHOT:
+        snapshots.start()
+    if snapshots.running:
+        st.caption(f"Background aktif • {snapshots.deferred} putaran ditunda karena ada submit")
+        st.json(snapshots.status())
+    elif st.button("▶️ Aktifkan snapshot export otomatis", use_container_width=True):
+        snapshots.start()
+        st.rerun()
+    st.write("**Antrean submit (proses ini):**")
+    st.json(get_admission().status())
+    st.write("**Pool koneksi:**")
+    st.json({"gsheet": get_gsheet_pool().stats(), "dropbox": get_dropbox_pool().stats()})
+    if PROFILE_ENABLED or PROFILE_KEY:
+        st.write(f"**Profil rerun terakhir** (`{PROFILE_DIR}`):")
+        for prof in get_profiler().recent(5):
+            st.caption(f"{prof['label']} • {prof['engine']} • {prof['wall_ms']} ms • {', '.join(prof['files'])}")
+            render_table(prof["top"][:8], columns=["func", "calls", "cum_ms", "self_ms"])
+
+
+def page_qr():
     render_header("QR Absensi", f"{BRAND_TAGLINE} • Scan untuk Absensi")
 
     st.markdown(
@@ -1179,6 +900,12 @@ if mode != "absen":
         st.code(qr_url_effective, language="text")
         st.caption("Gunakan link ini untuk kebutuhan admin. Untuk karyawan, gunakan QR.")
 
+        if admin_requested():
+            render_admin_info()
+        else:
+            # statistik backend, profil & tombol snapshot export: hanya dengan admin_key
+            st.caption("Statistik backend hanya tampil dengan `?admin=<app.admin_key>`.")
+
     st.markdown(
         f"""
 <div style="text-align:center; margin-top: 10px;" class="jala-muted">
@@ -1187,23 +914,208 @@ if mode != "absen":
         """,
         unsafe_allow_html=True,
     )
-    st.stop()
+
+
+def render_selfie_gallery(people: List[Dict]):
+    """Thumbnail selfie yang hadir hari ini (terbaru dulu), per halaman; hanya halaman tampil yang diambil."""
+    q = st.text_input("Cari nama", key="gallery_q", placeholder="Ketik nama...").strip().lower()
+    items = [p for p in reversed(people) if p.get("Dropbox Path") and p["Dropbox Path"] != "-"]
+    if q:
+        items = [p for p in items if q in str(p.get("Nama", "")).lower()]
+    if not items:
+        st.caption("Belum ada selfie yang cocok.")
+        return
+
+    pages = (len(items) + GALLERY_PAGE_SIZE - 1) // GALLERY_PAGE_SIZE
+    if st.session_state.get("gallery_page", 1) > pages:
+        st.session_state.gallery_page = 1
+    page = st.number_input("Halaman", min_value=1, max_value=pages, step=1, key="gallery_page") if pages > 1 else 1
+    chunk = items[(page - 1) * GALLERY_PAGE_SIZE: page * GALLERY_PAGE_SIZE]
+    st.caption(f"{len(items)} selfie • halaman {page}/{pages}")
+
+    try:
+        with get_metrics().span("gallery.thumbnails", n=len(chunk)):
+            thumbs = get_core().thumbnails([p["Dropbox Path"] for p in chunk])
+    except Exception as e:
+        print(f"Thumbnail Error: {e}")
+        st.warning("Thumbnail belum bisa diambil dari Dropbox.")
+        thumbs = {}
+
+    cols = st.columns(GALLERY_COLS)
+    for i, p in enumerate(chunk):
+        with cols[i % GALLERY_COLS]:
+            data = thumbs.get(p["Dropbox Path"])
+            if data:
+                st.image(data, use_container_width=True)
+            else:
+                st.caption("(foto tidak tersedia)")
+            st.caption(f"{p.get('Nama', '-')} • {str(p.get('Timestamp', ''))[11:16]}")
+
+
+def render_evidence_export(date_from, date_to):
+    """ZIP log + selfie untuk audit (admin). Dibuat di background, arsip di disk & bisa dilanjutkan kalau ada file gagal."""
+    if date_from > date_to:
+        st.warning("Tanggal awal harus sebelum tanggal akhir.")
+        return
+    out_path = get_core().evidence_path(date_from, date_to)
+    jobs = get_bundle_jobs()
+    if st.button("📦 Siapkan ZIP Bukti", use_container_width=True):
+
+        def run(progress):
+            with get_metrics().span("export.total"):
+                return get_core().export_evidence(date_from, date_to, out_path=out_path, progress=progress,
+                                                  metrics=get_metrics())
+
+        if not jobs.start(out_path, run):
+            st.info("ZIP untuk rentang ini sedang disiapkan.")
+
+    job = jobs.status(out_path)
+    if job is not None and job["running"]:
+        total = job["total"]
+        st.progress(job["done"] / total if total else 0.0,
+                    text=f"Selfie {job['done']}/{total}" if total else "Membaca log...")
+        if st.button("🔄 Cek progres", use_container_width=True):
+            st.rerun()
+        return
+    if job is not None and job["error"]:
+        st.error("Gagal menyiapkan ZIP bukti.")
+        st.code(job["error"])
+    elif job is not None and job["result"] is not None:
+        res = job["result"]
+        if res["failed"]:
+            st.warning(
+                f"{len(res['failed'])} selfie gagal diunduh. Klik **Siapkan ZIP Bukti** lagi untuk "
+                f"melanjutkan (file yang sudah ada tidak diunduh ulang)."
+            )
+            with st.expander("Detail file gagal"):
+                render_table([{"Path": k, "Error": v} for k, v in res["failed"].items()], columns=["Path", "Error"])
+        else:
+            st.success(f"ZIP siap ✅ ({res['total']} selfie, {res['seconds']:.0f} detik)")
+
+    if os.path.exists(out_path):
+        state = load_json(f"{out_path}.json") or {}
+        if state and not state.get("complete"):
+            st.caption(f"ZIP belum lengkap: {state.get('done', 0)}/{state.get('total', 0)} selfie.")
+        with open(out_path, "rb") as f:
+            st.download_button(
+                "⬇️ Download ZIP",
+                data=f,
+                file_name=os.path.basename(out_path),
+                mime="application/zip",
+                use_container_width=True,
+            )
 
 
 # ===== PAGE: ABSEN
-# ✅ UI timestamp boleh realtime saat render (hanya untuk tampil di header)
-ui_dt = now_local()
-ui_ts_display = ui_dt.strftime("%d-%m-%Y %H:%M:%S")
-render_header("Form Absensi", f"{BRAND_TAGLINE} • {ui_ts_display} ({TZ_NAME})")
-
-if ENABLE_TOKEN and TOKEN_SECRET:
-    incoming_token = get_token_from_url()
-    if incoming_token != TOKEN_SECRET:
-        st.error("Akses tidak valid. Silakan scan QR resmi dari kantor.")
-        st.stop()
+def render_arrivals(rekap: Dict):
+    """Histogram kedatangan + kurva kumulatif per posisi (hitungan per menit sudah ada di rekap)."""
+    default = SETTINGS.arrival_bin_minutes
+    choices = sorted({*BIN_CHOICES, default})
+    bin_minutes = st.radio("Interval", choices, index=choices.index(default), horizontal=True,
+                           format_func=lambda m: f"{m} menit", key="arrival_bin")
+    hist = get_core().arrivals(rekap, bin_minutes=bin_minutes)
+    if not hist["rows"]:
+        st.caption("Belum ada timestamp yang bisa dibaca.")
+        return
+
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Puncak hadir", f"{hist['peak']['Hadir']} / {bin_minutes} mnt", help=f"mulai {hist['peak']['Mulai']}")
+    c2.metric("Puncak scan", f"{hist['peak_scan']['per_menit']} / menit", help=f"mulai {hist['peak_scan']['Mulai']}")
+    c3.metric("Estimasi stasiun QR", hist["stations"],
+              help=f"puncak scan/menit × {hist['checkin_seconds']:.0f} detik per check-in (app.checkin_seconds)")
 
-st.markdown(
+    st.bar_chart(hist["rows"], x="Mulai", y=["Hadir", "Scan"], stack=False)
+    if hist["positions"]:
+        st.caption("Kumulatif per posisi")
+        st.line_chart(hist["cumulative"], x="Mulai", y=hist["positions"])
+
+    st.download_button(
+        "⬇️ Download CSV",
+        data=make_csv_bytes(*build_export_arrivals(hist)),
+        file_name=f"kedatangan_{hist['today'].replace('-', '')}_{bin_minutes}m.csv",
+        mime="text/csv",
+        key="arrival_csv",
+    )
+
+
+def render_absentees(absent: Dict):
+    """Roster dikurangi yang sudah hadir (dihitung inkremental di Core, tanpa baca ulang sheet)."""
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Roster", absent["roster_total"])
+    c2.metric("Sudah hadir", absent["present"])
+    c3.metric("Belum hadir", absent["absent"])
+    if absent["unmatched"]:
+        st.caption(f"{absent['unmatched']} orang hadir tidak ditemukan di roster (No HP/nama beda).")
+    render_table(absent["by_pos"], columns=["Posisi", "Roster", "Hadir", "Belum Hadir"], min_width_px=520)
+    if absent["absent"]:
+        q = st.text_input("Cari nama / posisi", key="absent_query").strip().lower()
+        people = absent["absent_people"]
+        if q:
+            people = [p for p in people if q in p["Nama"].lower() or q in p["Posisi"].lower()]
+        render_table(people, columns=["Nama", "No HP/WA", "Posisi"], min_width_px=520)
+        st.caption("Unduh daftarnya lewat ⬇️ Download Rekap → **Belum Hadir (roster)**.")
+
+
+def render_roster_lookup():
     """
+    Cari karyawan di roster (di luar form supaya langsung rerun) -> Nama, No HP
+    & Posisi kanonik terisi otomatis di form. Halaman absen publik: hanya No HP
+    yang persis cocok (tanpa daftar saran). Admin (``?admin=``): saran prefix
+    No HP / nama seperti biasa.
+    """
+    roster = get_roster()
+    if not roster:
+        return
+    admin = admin_requested()
+    query = st.text_input(
+        "🔎 Cari di daftar karyawan",
+        key="roster_query",
+        placeholder="Ketik No HP/WA atau nama, lalu Enter" if admin else "Ketik No HP/WA lengkap, lalu Enter",
+    )
+    if not query.strip():
+        return
+
+    exact = roster.lookup_phone(query)
+    if exact is not None:
+        matches = [exact]
+    else:
+        # prefix nama / nomor membuka data orang lain -> hanya untuk admin
+        matches = roster.suggest(query, limit=ROSTER_SUGGEST_LIMIT) if admin else []
+    if not matches:
+        st.caption("Tidak ditemukan di daftar karyawan — isi data manual di bawah.")
+        return
+    if len(matches) == 1:
+        pick = matches[0]
+    else:
+        labels = [f"{e['Nama']} • {e['No HP/WA']} • {e['Posisi']}" for e in matches]
+        i = st.selectbox("Pilih karyawan", range(len(matches)), format_func=lambda i: labels[i], key="roster_pick")
+        pick = matches[i]
+
+    # isi form hanya saat pilihan berubah (koreksi manual sesudahnya tidak ditimpa)
+    picked = f"{pick['key']}|{pick['Nama']}"
+    if st.session_state.roster_filled != picked:
+        st.session_state.form_nama = pick["Nama"]
+        st.session_state.form_hp = pick["No HP/WA"]
+        st.session_state.form_posisi = pick["Posisi"]
+        st.session_state.roster_filled = picked
+        st.session_state.roster_autofill = {k: pick[k] for k in ("key", "Nama", "No HP/WA", "Posisi")}
+    st.caption(f"✅ Terdaftar: **{pick['Nama']}** — {pick['Posisi'] or '-'}")
+
+
+def page_absen():
+    # ✅ UI timestamp boleh realtime saat render (hanya untuk tampil di header)
+    ui_dt = now_local()
+    ui_ts_display = ui_dt.strftime("%d-%m-%Y %H:%M:%S")
+    render_header("Form Absensi", f"{BRAND_TAGLINE} • {ui_ts_display} ({TZ_NAME})")
+
+    if ENABLE_TOKEN and TOKEN_SECRET:
+        incoming_token = get_token_from_url()
+        if incoming_token != TOKEN_SECRET:
+            st.error("Akses tidak valid. Silakan scan QR resmi dari kantor.")
+            st.stop()
+
+    st.markdown(
+        """
 <div class="jala-card">
   <div style="font-weight:700; font-size:16px; margin-bottom:6px;">Petunjuk</div>
   <div class="jala-muted">
@@ -1211,250 +1123,366 @@ st.markdown(
     Jika kamera bermasalah, gunakan <b>Upload</b>.
   </div>
 </div>
-    """,
-    unsafe_allow_html=True,
-)
-st.write("")
+        """,
+        unsafe_allow_html=True,
+    )
+    st.write("")
 
-with st.form("form_absen", clear_on_submit=False):
     st.subheader("1) Data Karyawan")
-    nama = st.text_input("Nama Lengkap", placeholder="Contoh: Andi Saputra")
-    no_hp = st.text_input("No HP/WA", placeholder="Contoh: 08xxxxxxxxxx atau +628xxxxxxxxxx")
-    posisi = st.text_input("Posisi / Jabatan", placeholder="Contoh: Driver / Teknisi / Supervisor")
-
-    st.markdown('<div class="jala-divider"></div>', unsafe_allow_html=True)
-
-    st.subheader("2) Selfie Kehadiran")
-    method = st.radio(
-        "Metode selfie",
-        options=["Upload (lebih stabil)", "Kamera (jika HP mendukung)"],
-        index=0 if st.session_state.selfie_method == "Upload" else 1,
-        horizontal=False,
-    )
-    st.session_state.selfie_method = "Upload" if method.startswith("Upload") else "Kamera"
+    render_roster_lookup()
 
-    selfie_cam = None
-    selfie_upload = None
+    with st.form("form_absen", clear_on_submit=False):
+        nama = st.text_input("Nama Lengkap", key="form_nama", placeholder="Contoh: Andi Saputra")
+        no_hp = st.text_input("No HP/WA", key="form_hp", placeholder="Contoh: 08xxxxxxxxxx atau +628xxxxxxxxxx")
+        posisi = st.text_input("Posisi / Jabatan", key="form_posisi", placeholder="Contoh: Driver / Teknisi / Supervisor")
 
-    if st.session_state.selfie_method == "Kamera":
-        st.caption("Jika kamera blank/lemot, pilih Upload.")
-        selfie_cam = st.camera_input("Ambil selfie")
-    else:
-        st.caption("Foto akan dioptimalkan otomatis agar hemat kuota.")
-        selfie_upload = st.file_uploader("Upload foto selfie", type=["jpg", "jpeg", "png"])
+        st.markdown('<div class="jala-divider"></div>', unsafe_allow_html=True)
 
-    st.markdown('<div class="jala-divider"></div>', unsafe_allow_html=True)
+        st.subheader("2) Selfie Kehadiran")
+        method = st.radio(
+            "Metode selfie",
+            options=["Upload (lebih stabil)", "Kamera (jika HP mendukung)"],
+            index=0 if st.session_state.selfie_method == "Upload" else 1,
+            horizontal=False,
+        )
+        st.session_state.selfie_method = "Upload" if method.startswith("Upload") else "Kamera"
 
-    submit = st.form_submit_button(
-        "✅ Submit Absensi",
-        disabled=st.session_state.saving or st.session_state.submitted_once,
-        use_container_width=True,
-    )
+        selfie_cam = None
+        selfie_upload = None
 
-if submit:
-    if st.session_state.submitted_once:
-        st.warning("Absensi sudah tersimpan. Jika ingin absen lagi, refresh halaman.")
-        st.stop()
+        if st.session_state.selfie_method == "Kamera":
+            st.caption("Jika kamera blank/lemot, pilih Upload.")
+            selfie_cam = st.camera_input("Ambil selfie")
+        else:
+            st.caption("Foto akan dioptimalkan otomatis agar hemat kuota.")
+            selfie_upload = st.file_uploader("Upload foto selfie", type=["jpg", "jpeg", "png"])
 
-    # ✅ Timestamp HARUS dibuat saat tombol submit ditekan (biar akurat)
-    save_dt = now_local()
-    ts_display = save_dt.strftime("%d-%m-%Y %H:%M:%S")
-    ts_file = save_dt.strftime("%Y-%m-%d_%H-%M-%S")
-
-    nama_clean = sanitize_name(nama)
-    hp_clean = sanitize_phone(no_hp)
-    posisi_final = str(posisi).strip()
-    img_bytes, ext = get_selfie_bytes(selfie_cam, selfie_upload)
-
-    errors = []
-    if not nama_clean:
-        errors.append("• Nama wajib diisi.")
-    if not hp_clean or len(hp_clean.replace("+", "")) < 8:
-        errors.append("• No HP/WA wajib diisi (minimal 8 digit).")
-    if not posisi_final:
-        errors.append("• Posisi wajib diisi.")
-    if img_bytes is None:
-        errors.append("• Selfie wajib (kamera atau upload).")
-
-    if errors:
-        st.error("Mohon lengkapi dulu:\n\n" + "\n".join(errors))
-        st.stop()
+        st.markdown('<div class="jala-divider"></div>', unsafe_allow_html=True)
 
-    st.session_state.saving = True
-    try:
-        with st.spinner("Menyimpan absensi..."):
-            img_bytes_opt, ext_opt = optimize_image_bytes(img_bytes, ext)
+        submit = st.form_submit_button(
+            "✅ Submit Absensi",
+            disabled=st.session_state.saving or st.session_state.submitted_once,
+            use_container_width=True,
+        )
 
-            sh = connect_gsheet()
-            ws = get_or_create_ws(sh)
-            dbx = connect_dropbox()
+    if submit:
+        if st.session_state.submitted_once:
+            st.warning("Absensi sudah tersimpan. Jika ingin absen lagi, refresh halaman.")
+            st.stop()
 
-            link_selfie, dbx_path = upload_selfie_to_dropbox(dbx, img_bytes_opt, nama_clean, ts_file, ext_opt)
-            link_cell = make_hyperlink(link_selfie, "Bukti Foto")
+        # ✅ Timestamp HARUS dibuat saat tombol submit ditekan (biar akurat)
+        save_dt = now_local()
+        ts_display = save_dt.strftime("%d-%m-%Y %H:%M:%S")
+        ts_file = save_dt.strftime("%Y-%m-%d_%H-%M-%S")
 
-            ws.append_row(
-                [ts_display, nama_clean, hp_clean, posisi_final, link_cell, dbx_path],
-                value_input_option="USER_ENTERED"
-            )
+        nama_clean = sanitize_name(nama)
+        hp_clean = sanitize_phone(no_hp)
+        posisi_final = str(posisi).strip()
+        # No HP ada di roster -> format nomor kanonik; Nama/Posisi roster hanya kalau isian otomatis tidak diubah
+        roster = get_roster()
+        entry = roster.lookup_phone(hp_clean) if roster and hp_clean else None
+        nama_clean, hp_clean, posisi_final = apply_roster_entry(
+            nama_clean, hp_clean, posisi_final, entry, st.session_state.roster_autofill
+        )
+        img_bytes, ext = get_selfie_bytes(selfie_cam, selfie_upload)
+
+        errors = []
+        if not nama_clean:
+            errors.append("• Nama wajib diisi.")
+        if not hp_clean or len(hp_clean.replace("+", "")) < 8:
+            errors.append("• No HP/WA wajib diisi (minimal 8 digit).")
+        if not posisi_final:
+            errors.append("• Posisi wajib diisi.")
+        if img_bytes is None:
+            errors.append("• Selfie wajib (kamera atau upload).")
+
+        if errors:
+            st.error("Mohon lengkapi dulu:\n\n" + "\n".join(errors))
+            st.stop()
+
+        st.session_state.saving = True
+        metrics = get_metrics()
+        queue_box = st.empty()
+
+        def show_queue(position: int, eta: float):
+            queue_box.info(f"⏳ Banyak yang sedang absen. Antrean ke-{position}, perkiraan ±{max(1, round(eta))} detik...")
+
+        def show_saved():
+            get_rekap_today.clear()
+            st.session_state.submitted_once = True
+            st.success("Absensi berhasil tersimpan. Terima kasih ✅")
 
-        get_rekap_today.clear()
-        st.session_state.submitted_once = True
-        st.success("Absensi berhasil tersimpan. Terima kasih ✅")
+            if st.button("↩️ Isi ulang (reset form)", use_container_width=True):
+                st.session_state.saving = False
+                st.session_state.submitted_once = False
+                st.session_state.selfie_method = "Upload"
+                st.rerun()
 
-        if st.button("↩️ Isi ulang (reset form)", use_container_width=True):
-            st.session_state.saving = False
-            st.session_state.submitted_once = False
-            st.session_state.selfie_method = "Upload"
-            st.rerun()
+        def show_not_saved():
+            st.warning(
+                "Server sedang ramai. Data belum tersimpan, "
+                f"coba Submit lagi dalam {get_admission().retry_after()} detik 🙏"
+            )
 
-    except AuthError:
-        st.error("Dropbox token tidak valid. Hubungi admin.")
-    except Exception as e:
-        st.error("Gagal menyimpan absensi.")
-        with st.expander("Detail error (untuk admin)"):
-            st.code(str(e))
-    finally:
-        st.session_state.saving = False
+        # True setelah request tulis baris dikirim: error sesudahnya belum tentu berarti baris tidak tertulis
+        writing = False
+        dbx_path = ""
+        try:
+            # antre dulu (posisi + perkiraan waktu tampil di queue_box), baru pipeline simpan
+            with get_admission().admit(on_wait=show_queue) as admitted, st.spinner("Menyimpan absensi..."), \
+                    sheets_priority(PRIORITY_SUBMIT), metrics.span("submit.total"):
+                queue_box.empty()
+                metrics.record("submit.queue_wait", admitted["waited"])
+                metrics.observe("image_bytes.before", len(img_bytes))
+                with metrics.span("submit.optimize_image"):
+                    img_bytes_opt, ext_opt = optimize_image_bytes(img_bytes, ext, SETTINGS.img_max_side, SETTINGS.img_jpeg_quality)
+                metrics.observe("image_bytes.after", len(img_bytes_opt))
+
+                # foto dulu, baru baris log (storage aktif: Sheets + Dropbox atau SQLite + folder lokal)
+                link_selfie, dbx_path = store_selfie(img_bytes_opt, nama_clean, ts_file, ext_opt)
+                writing = True
+                get_core().append_row(
+                    save_dt, [ts_display, nama_clean, hp_clean, posisi_final, link_selfie, dbx_path], metrics=metrics
+                )
 
+            show_saved()
+
+        except Overloaded as e:
+            queue_box.empty()
+            st.warning(f"Server sedang ramai. Data belum tersimpan, coba Submit lagi dalam {e.retry_after} detik 🙏")
+        except Exception as e:
+            queue_box.empty()
+            if _is_dropbox_auth_error(e):
+                st.error("Dropbox token tidak valid. Hubungi admin.")
+            elif isinstance(e, PoolTimeout) or is_rejected(e) or (not writing and is_retryable(e)):
+                # pool penuh / 429 (ditolak sebelum diproses) / gagal sebelum baris dikirim -> pasti belum tersimpan
+                show_not_saved()
+            elif is_retryable(e):
+                # 5xx / timeout saat tulis: server mungkin sudah menulis barisnya -> cek path selfie dulu
+                try:
+                    with sheets_priority(PRIORITY_SUBMIT):
+                        saved = get_core().has_row(save_dt, dbx_path)
+                except Exception as check_error:
+                    print(f"Submit Check Error: {check_error}")
+                    saved = None
+                if saved:
+                    get_core().note_rows_changed()
+                    show_saved()
+                elif saved is False:
+                    show_not_saved()
+                else:
+                    st.warning(
+                        "Koneksi terputus saat menyimpan, data mungkin sudah tersimpan. "
+                        "Cek Rekap Kehadiran di bawah (🔄 Refresh rekap) sebelum Submit lagi 🙏"
+                    )
+            else:
+                st.error("Gagal menyimpan absensi.")
+                with st.expander("Detail error (untuk admin)"):
+                    st.code(str(e))
+        finally:
+            st.session_state.saving = False
 
-# ===== REKAP UI
-st.write("")
-st.subheader("📊 Rekap Kehadiran (Hari ini)")
 
-try:
-    rekap = get_rekap_today()
+    # ===== REKAP UI
+    st.write("")
+    st.subheader("📊 Rekap Kehadiran (Hari ini)")
 
-    top1, top2 = st.columns([1, 1])
-    with top1:
-        st.metric("Total hadir", rekap["total"])
-    with top2:
-        if st.button("🔄 Refresh rekap", use_container_width=True):
-            get_rekap_today.clear()
-            st.rerun()
+    try:
+        rekap = get_rekap_today(rekap_revision())
+
+        top1, top2 = st.columns([1, 1])
+        with top1:
+            st.metric("Total hadir", rekap["total"])
+        with top2:
+            if st.button("🔄 Refresh rekap", use_container_width=True):
+                get_rekap_today.clear()
+                st.rerun()
 
-    st.caption(f"Tanggal: **{rekap['today']}**")
+        st.caption(f"Tanggal: **{rekap['today']}**")
 
-    if rekap["dup_removed"] > 0:
-        st.info(
-            f"Catatan: terdeteksi **{rekap['dup_removed']}** entri duplikat (No HP/Nama sama) "
-            f"dan tidak dihitung agar rekap akurat."
-        )
+        if rekap["dup_removed"] > 0:
+            st.info(
+                f"Catatan: terdeteksi **{rekap['dup_removed']}** entri duplikat (No HP/Nama sama) "
+                f"dan tidak dihitung agar rekap akurat."
+            )
 
-    if rekap["total"] == 0:
-        st.warning("Belum ada absensi untuk hari ini.")
-    else:
-        st.markdown(
-            """
+        if rekap["total"] == 0:
+            st.warning("Belum ada absensi untuk hari ini.")
+        else:
+            st.markdown(
+                """
 <div class="jala-card" style="margin-bottom: 10px;">
   <div style="font-weight:700; margin-bottom:8px;">Klasifikasi jumlah hadir per posisi</div>
 </div>
-            """,
-            unsafe_allow_html=True,
-        )
-        render_table(rekap["by_pos"], columns=["Posisi", "Jumlah", "Yang Hadir"], min_width_px=640)
-
-        with st.expander("👥 Lihat siapa saja yang sudah datang (detail)"):
-            render_table(rekap["all_people"], columns=["Nama", "No HP/WA", "Posisi", "Timestamp"], min_width_px=640)
-
-    # ===== EXPORT
-    with st.expander("⬇️ Download Rekap (Excel / CSV)"):
-        st.markdown(
-            """
+                """,
+                unsafe_allow_html=True,
+            )
+            render_table(rekap["by_pos"], columns=["Posisi", "Jumlah", "Yang Hadir"], min_width_px=640)
+
+            with st.expander("👥 Lihat siapa saja yang sudah datang (detail)"):
+                render_table(rekap["all_people"], columns=["Nama", "No HP/WA", "Posisi", "Timestamp"], min_width_px=640)
+
+            if admin_requested():
+                with st.expander("🖼️ Galeri selfie hari ini"):
+                    # thumbnail baru diambil kalau galeri dibuka
+                    if st.toggle("Tampilkan galeri", key="gallery_on"):
+                        render_selfie_gallery(rekap["all_people"])
+
+        if rekap["total"] > 0:
+            with st.expander("⏱️ Pola kedatangan (per interval)"):
+                render_arrivals(rekap)
+
+        # daftar orang + No HP yang belum hadir: hanya admin, bukan halaman absen publik
+        absent = get_core().absentees(rekap) if admin_requested() and get_roster() else None
+        if absent is not None:
+            with st.expander(f"🚫 Belum hadir ({absent['absent']} dari {absent['roster_total']} di roster)"):
+                render_absentees(absent)
+
+        # ===== EXPORT
+        with st.expander("⬇️ Download Rekap (Excel / CSV)"):
+            st.markdown(
+                """
 <div class="jala-muted">
 Unduh data dengan format rapi:
 <b>XLSX</b> (paling aman untuk Excel) atau <b>CSV</b> (pakai delimiter <code>;</code> agar tidak jadi 1 kolom).
 </div>
-            """,
-            unsafe_allow_html=True,
-        )
-
-        scope = st.radio(
-            "Pilih data yang diunduh",
-            options=["Rekap Hari Ini (dedup)", "Log Lengkap (semua data)"],
-            index=0,
-            horizontal=False,
-        )
+                """,
+                unsafe_allow_html=True,
+            )
 
-        cA, cB = st.columns([1, 1])
-        with cA:
-            prep = st.button("📦 Siapkan File", use_container_width=True)
-        with cB:
-            if st.button("🧹 Reset file", use_container_width=True):
-                st.session_state.export_ready = False
-                st.session_state.export_xlsx = None
-                st.session_state.export_csv = None
-                st.session_state.export_base_name = ""
-                st.rerun()
+            # ZIP bukti (semua selfie) & daftar belum hadir: hanya admin, bukan halaman absen publik
+            admin = admin_requested()
+            scope = st.radio(
+                "Pilih data yang diunduh",
+                options=export_scopes(admin, roster=admin and bool(get_roster())),
+                index=0,
+                horizontal=False,
+            )
 
-        if prep:
-            try:
-                with st.spinner("Menyiapkan file export..."):
-                    ts_tag = now_local().strftime("%Y-%m-%d_%H-%M")
-
-                    if scope.startswith("Rekap"):
-                        header, rows = build_export_rekap_today(rekap)
-                        base = f"rekap_hadir_{rekap['today'].replace('-', '')}_{ts_tag}"
-                        xlsx = make_xlsx_bytes(
-                            "Rekap Hari Ini",
-                            header,
-                            rows,
-                            hyperlink_col=None,
-                            top_header_lines=EXPORT_TOP_HEADER_LINES,
+            log_from = log_to = None
+            # ZIP bukti selalu per rentang tanggal (default hari ini)
+            need_range = scope.startswith("Bukti")
+            if need_range or (scope.startswith("Log") and st.checkbox("Filter rentang tanggal", value=False)):
+                f1, f2 = st.columns(2)
+                with f1:
+                    log_from = st.date_input("Dari tanggal", value=now_local().date())
+                with f2:
+                    log_to = st.date_input("Sampai tanggal", value=now_local().date())
+
+            if scope.startswith("Bukti") and admin:
+                render_evidence_export(log_from, log_to)
+            else:
+                cA, cB = st.columns([1, 1])
+                with cA:
+                    prep = st.button("📦 Siapkan File", use_container_width=True)
+                with cB:
+                    if st.button("🧹 Reset file", use_container_width=True):
+                        st.session_state.export_ready = False
+                        st.session_state.export_xlsx = None
+                        st.session_state.export_csv = None
+                        st.session_state.export_base_name = ""
+                        st.session_state.export_snap = None
+                        st.rerun()
+
+                # snapshot di disk hanya untuk "Rekap Hari Ini" & "Log Lengkap" tanpa filter tanggal.
+                # Baru dibaca setelah klik "Siapkan File" (rerun biasa tidak menyentuh disk / Sheets)
+                snap_kind = "rekap" if scope.startswith("Rekap") else "log"
+                use_snapshot = not (log_from or log_to) and scope.startswith(("Rekap", "Log"))
+
+                if prep:
+                    metrics = get_metrics()
+                    try:
+                        with st.spinner("Menyiapkan file export..."), metrics.span("export.total"):
+                            snap_meta = None
+                            if use_snapshot:
+                                snapshots = get_export_snapshots()
+                                # thread background jalan -> snapshot terjadwal cukup; selain itu maks. umur fresh
+                                max_age = EXPORT_SNAPSHOT_SECONDS if snapshots.running else EXPORT_SNAPSHOT_FRESH
+                                snap_meta = snapshots.refresh(snap_kind, max_age=max_age)
+                                base = snap_meta["base"]
+                                xlsx = snapshots.read(snap_meta, "xlsx")
+                                csv_b = snapshots.read(snap_meta, "csv")
+                            elif not scope.startswith("Log"):
+                                kind = {"Rekap": "rekap", "Belum": "belum_hadir", "Pola": "kedatangan"}[scope.split()[0]]
+                                base, files, _ = get_core().export_files(kind, day=now_local().date(), metrics=metrics)
+                                xlsx, csv_b = files["xlsx"], files["csv"]
+                            else:
+                                base, files, _ = get_core().export_files(
+                                    "log", date_from=log_from, date_to=log_to, metrics=metrics
+                                )
+                                xlsx, csv_b = files["xlsx"], files["csv"]
+
+                            st.session_state.export_xlsx = xlsx
+                            st.session_state.export_csv = csv_b
+                            st.session_state.export_base_name = base
+                            st.session_state.export_snap = (
+                                {k: snap_meta[k] for k in ("generated_at", "rows")} if snap_meta else None
+                            )
+                            st.session_state.export_ready = True
+
+                        st.success("File siap diunduh ✅")
+                    except Exception as ex:
+                        st.error("Gagal menyiapkan file export.")
+                        st.code(str(ex))
+
+                dl_xlsx = dl_csv = None
+                dl_base = ""
+                if st.session_state.export_ready and st.session_state.export_xlsx and st.session_state.export_csv:
+                    dl_xlsx, dl_csv = st.session_state.export_xlsx, st.session_state.export_csv
+                    dl_base = st.session_state.export_base_name
+
+                snap = st.session_state.export_snap if dl_xlsx else None
+                if snap:
+                    made = datetime.fromtimestamp(snap["generated_at"], tz=ZoneInfo(TZ_NAME))
+                    st.caption(f"⚡ Dari snapshot {made:%H:%M:%S} ({snap['rows']} baris).")
+
+                if dl_xlsx and dl_csv:
+                    st.write("")
+                    d1, d2 = st.columns(2)
+                    with d1:
+                        st.download_button(
+                            "⬇️ Download XLSX",
+                            data=dl_xlsx,
+                            file_name=f"{dl_base}.xlsx",
+                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                            use_container_width=True,
                         )
-                        csv_b = make_csv_bytes(header, rows)
-                    else:
-                        header, rows = fetch_log_full()
-                        base = f"log_absensi_{ts_tag}"
-                        # hyperlink_col = kolom "Bukti Selfie (URL)" => index 5 (karena ada kolom "No" di depan)
-                        xlsx = make_xlsx_bytes(
-                            "Log Absensi",
-                            header,
-                            rows,
-                            hyperlink_col=5,
-                            top_header_lines=EXPORT_TOP_HEADER_LINES,
+                    with d2:
+                        st.download_button(
+                            "⬇️ Download CSV",
+                            data=dl_csv,
+                            file_name=f"{dl_base}.csv",
+                            mime="text/csv",
+                            use_container_width=True,
                         )
-                        csv_b = make_csv_bytes(header, rows)
-
-                    st.session_state.export_xlsx = xlsx
-                    st.session_state.export_csv = csv_b
-                    st.session_state.export_base_name = base
-                    st.session_state.export_ready = True
-
-                st.success("File siap diunduh ✅")
-            except Exception as ex:
-                st.error("Gagal menyiapkan file export.")
-                st.code(str(ex))
-
-        if st.session_state.export_ready and st.session_state.export_xlsx and st.session_state.export_csv:
-            st.write("")
-            d1, d2 = st.columns(2)
-            with d1:
-                st.download_button(
-                    "⬇️ Download XLSX",
-                    data=st.session_state.export_xlsx,
-                    file_name=f"{st.session_state.export_base_name}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    use_container_width=True,
-                )
-            with d2:
-                st.download_button(
-                    "⬇️ Download CSV",
-                    data=st.session_state.export_csv,
-                    file_name=f"{st.session_state.export_base_name}.csv",
-                    mime="text/csv",
-                    use_container_width=True,
-                )
 
-except Exception as e:
-    st.warning("Rekap kehadiran belum bisa ditampilkan (cek koneksi GSheet).")
-    with st.expander("Detail error (untuk admin)"):
-        st.code(str(e))
+    except Exception as e:
+        st.warning("Rekap kehadiran belum bisa ditampilkan (cek koneksi GSheet).")
+        with st.expander("Detail error (untuk admin)"):
+            st.code(str(e))
 
-st.markdown(
-    f"""
+    st.markdown(
+        f"""
 <div style="text-align:center; margin-top: 14px;" class="jala-muted">
   © {BRAND_TAGLINE} • Absensi QR
 </div>
-    """,
-    unsafe_allow_html=True,
-)
+        """,
+        unsafe_allow_html=True,
+    )
+
+
+# =========================
+# RUN
+# =========================
+def run_page():
+    if get_mode() != "absen":
+        page_qr()
+    else:
+        page_absen()
+
+
+if profiling_requested():
+    with get_profiler().profile("absen" if get_mode() == "absen" else "qr"):
+        run_page()
+else:
+    run_page()
@@ -0,0 +1,82 @@
+"""
+Benchmark cold start: waktu import dependency per skenario, tiap run di proses
+Python baru (seperti container yang baru bangun).
+
+    python -m bench.coldstart            # median dari 5 run per skenario
+    python -m bench.coldstart --runs 10
+
+"eager" = semua import di awal script (perilaku sebelum lazy import);
+skenario lain = yang benar-benar di-load per mode setelah lazy import.
+Hanya waktu import yang diukur, bukan run ``app.py`` lengkap.
+"""
+import argparse
+import platform
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+SCENARIOS: Dict[str, List[str]] = {
+    "eager (semua di awal)": [
+        "streamlit", "gspread", "google.oauth2.service_account", "dropbox",
+        "qrcode", "PIL.Image", "PIL.ImageOps", "openpyxl", "openpyxl.styles", "openpyxl.utils",
+    ],
+    "mode QR": ["streamlit", "qrcode"],
+    "mode absen (rekap)": ["streamlit", "gspread", "google.oauth2.service_account", "dropbox"],
+    "mode absen + submit": ["streamlit", "gspread", "google.oauth2.service_account", "dropbox", "PIL.Image", "PIL.ImageOps"],
+}
+
+# nama distribusi untuk dicetak versinya bersama hasil
+PACKAGES = ["streamlit", "gspread", "google-auth", "dropbox", "qrcode", "pillow", "openpyxl"]
+
+_SNIPPET = """
+import time, importlib
+t0 = time.perf_counter()
+for m in {mods!r}:
+    importlib.import_module(m)
+print(time.perf_counter() - t0)
+"""
+
+
+def run_once(mods: List[str]) -> Optional[float]:
+    res = subprocess.run(
+        [sys.executable, "-c", _SNIPPET.format(mods=mods)],
+        capture_output=True, text=True,
+    )
+    if res.returncode != 0:
+        return None
+    return float(res.stdout.strip().splitlines()[-1])
+
+
+def versions() -> Dict[str, str]:
+    from importlib import metadata
+
+    out = {}
+    for pkg in PACKAGES:
+        try:
+            out[pkg] = metadata.version(pkg)
+        except metadata.PackageNotFoundError:
+            out[pkg] = "-"
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    print(f"Python {platform.python_version()} | {platform.platform()} | {platform.machine()}")
+    print(" ".join(f"{k}={v}" for k, v in versions().items()))
+    print(f"waktu import saja, median dari {args.runs} run\n")
+    print(f"{'skenario':<26} {'median ms':>10} {'min ms':>10}")
+    for name, mods in SCENARIOS.items():
+        times = [run_once(mods) for _ in range(args.runs)]
+        ok = [t for t in times if t is not None]
+        if not ok:
+            print(f"{name:<26} {'(dependency belum terpasang)':>22}")
+            continue
+        print(f"{name:<26} {statistics.median(ok) * 1000:>10.1f} {min(ok) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""
+Backend palsu in-memory untuk benchmark: permukaan worksheet/spreadsheet
+gspread dan client Dropbox yang dipakai app, dengan latency buatan per call.
+
+    ws = FakeWorksheet("Log", rows=make_log_rows(10_000), latency=0.05)
+    sh = FakeSpreadsheet([ws])
+    dbx = FakeDropbox(latency=0.2)
+
+``latency`` = detik per call, ditambah ``per_row`` detik untuk tiap baris
+yang dibaca/ditulis; ``calls`` = jumlah call per method.
+
+``ensure_dropbox_sdk()`` memasang modul ``dropbox`` minimal (tipe yang dipakai
+``upload_selfie`` / ``shared_link_url``) kalau SDK asli belum terpasang, supaya
+benchmark submit jalan tanpa dependency Dropbox.
+"""
+import itertools
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from types import ModuleType, SimpleNamespace
+from typing import Dict, List, Optional
+
+from absensi.lazy import optional_import
+from absensi.sheets import col_letter
+
+LOG_HEADER = ["Timestamp", "Nama", "No HP/WA", "Posisi", "Bukti Selfie", "Dropbox Path"]
+POSISI = ["Driver", "Teknisi", "Teknisi Lapangan", "Supervisor", "Admin", "Staff Gudang", "Sales", "Security"]
+
+_RANGE_RE = re.compile(r"^([A-Z]+)?(\d+)?(?::([A-Z]+)?(\d+)?)?$")
+
+
+def _col_index(letters: str) -> int:
+    n = 0
+    for ch in letters:
+        n = n * 26 + (ord(ch) - 64)
+    return n
+
+
+def make_log_rows(n: int, day: Optional[datetime] = None, people: int = 400, seed: int = 1) -> List[List[str]]:
+    """``n`` baris log (tanpa header) tersebar mundur dari ``day``, ~``people`` orang per hari."""
+    rnd = random.Random(seed)
+    day = day or datetime.now()
+    per_day = max(1, people)
+    rows = []
+    for i in range(n):
+        d = day - timedelta(days=(n - 1 - i) // per_day)
+        ts = d.replace(hour=7, minute=0, second=0) + timedelta(seconds=(i % per_day) * 20)
+        pid = rnd.randrange(people * 2)
+        nama = f"Karyawan {pid:04d}"
+        path = f"/Absensi_Selfie/Karyawan_{pid:04d}/{ts:%Y-%m-%d_%H-%M-%S}_selfie.jpg"
+        rows.append([
+            ts.strftime("%d-%m-%Y %H:%M:%S"),
+            nama,
+            f"08{pid:010d}",
+            POSISI[pid % len(POSISI)],
+            f'=HYPERLINK("https://dl.example.com/s/{pid:06d}?raw=1", "Bukti Foto")',
+            path,
+        ])
+    return rows
+
+
+def ensure_dropbox_sdk() -> bool:
+    """
+    Pakai SDK ``dropbox`` asli kalau terpasang; kalau tidak, daftarkan modul
+    pengganti berisi ``files.WriteMode`` / ``RelocationPath``, ``sharing.SharedLinkSettings`` /
+    ``RequestedVisibility`` dan ``exceptions.ApiError``. Return True kalau
+    pengganti yang dipakai.
+    """
+    if optional_import("dropbox") is not None:
+        return False
+
+    files = ModuleType("dropbox.files")
+    files.WriteMode = SimpleNamespace(add="add", overwrite="overwrite")
+    files.RelocationPath = lambda from_path, to_path: SimpleNamespace(from_path=from_path, to_path=to_path)
+
+    sharing = ModuleType("dropbox.sharing")
+    sharing.RequestedVisibility = SimpleNamespace(public="public")
+    sharing.SharedLinkSettings = lambda **kw: SimpleNamespace(**kw)
+
+    exceptions = ModuleType("dropbox.exceptions")
+
+    class ApiError(Exception):
+        def __init__(self, error=None):
+            super().__init__(error)
+            self.error = error
+
+    exceptions.ApiError = ApiError
+
+    root = ModuleType("dropbox")
+    root.files, root.sharing, root.exceptions = files, sharing, exceptions
+    for mod in (root, files, sharing, exceptions):
+        sys.modules[mod.__name__] = mod
+    return True
+
+
+def ensure_gspread() -> bool:
+    """
+    Pakai ``gspread`` asli kalau terpasang; kalau tidak, daftarkan modul pengganti
+    berisi ``WorksheetNotFound`` (yang ditangkap ``PartitionManager`` / ``Core``).
+    Return True kalau pengganti yang dipakai.
+    """
+    if optional_import("gspread") is not None:
+        return False
+    root = ModuleType("gspread")
+
+    class WorksheetNotFound(Exception):
+        pass
+
+    root.WorksheetNotFound = WorksheetNotFound
+    sys.modules[root.__name__] = root
+    return True
+
+
+class _Latency:
+    def __init__(self, latency: float = 0.0, per_row: float = 0.0):
+        self.latency = float(latency)
+        self.per_row = float(per_row)
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def _hit(self, method: str, rows: int = 0):
+        with self._lock:
+            self.calls[method] += 1
+        delay = self.latency + self.per_row * rows
+        if delay > 0:
+            time.sleep(delay)
+
+
+class FakeWorksheet(_Latency):
+    """Subset ``gspread.Worksheet``: col_values, get, row_values, update, append_row, resize, add_rows, batch_update."""
+
+    _ids = itertools.count(1000)
+
+    def __init__(self, title: str = "Log", rows: Optional[List[List[str]]] = None, header: Optional[List[str]] = None,
+                 row_count: Optional[int] = None, col_count: int = 6, latency: float = 0.0, per_row: float = 0.0,
+                 spreadsheet=None):
+        super().__init__(latency, per_row)
+        self.id = next(self._ids)
+        self.title = title
+        self.spreadsheet = spreadsheet
+        self.col_count = col_count
+        self._cells: List[List[str]] = [list(header or LOG_HEADER)] + [list(r) for r in (rows or [])]
+        self.row_count = max(row_count or 0, len(self._cells) + 100)
+        # data dibaca/ditulis dari banyak thread (load test); latency tetap di luar lock
+        self._data = threading.RLock()
+
+    # ---------- helpers
+    def _parse(self, rng: str):
+        m = _RANGE_RE.match(rng.replace("$", "").upper())
+        if not m:
+            raise ValueError(f"Range tidak didukung: {rng}")
+        c1, r1, c2, r2 = m.groups()
+        c1 = _col_index(c1) if c1 else 1
+        r1 = int(r1) if r1 else 1
+        if rng.find(":") < 0:
+            return c1, r1, c1, r1
+        c2 = _col_index(c2) if c2 else self.col_count
+        r2 = int(r2) if r2 else None
+        return c1, r1, c2, r2
+
+    def _value(self, v: str, render: Optional[str]) -> str:
+        if render != "FORMULA" and isinstance(v, str) and v.startswith("=HYPERLINK("):
+            m = re.search(r',\s*"(.*?)"\)$', v)
+            return m.group(1) if m else v
+        return v
+
+    def _last_row(self) -> int:
+        n = len(self._cells)
+        while n > 1 and not any(str(v).strip() for v in self._cells[n - 1]):
+            n -= 1
+        return n
+
+    # ---------- read
+    def col_values(self, col: int, value_render_option: Optional[str] = None) -> List[str]:
+        with self._data:
+            out = [(r[col - 1] if len(r) >= col else "") for r in self._cells]
+        while out and not str(out[-1]).strip():
+            out.pop()
+        self._hit("col_values", len(out))
+        return [self._value(v, value_render_option) for v in out]
+
+    def row_values(self, row: int, value_render_option: Optional[str] = None) -> List[str]:
+        self._hit("row_values", 1)
+        r = self._cells[row - 1] if 0 < row <= len(self._cells) else []
+        out = [self._value(v, value_render_option) for v in r]
+        while out and not str(out[-1]).strip():
+            out.pop()
+        return out
+
+    def get(self, rng: str, value_render_option: Optional[str] = None, **_) -> List[List[str]]:
+        c1, r1, c2, r2 = self._parse(rng)
+        with self._data:
+            last = min(r2 or len(self._cells), len(self._cells))
+            chunk = [list(r) for r in self._cells[r1 - 1:last]]
+        out = []
+        for r in chunk:
+            vals = [self._value(v, value_render_option) for v in r[c1 - 1:c2]]
+            while vals and not str(vals[-1]).strip():
+                vals.pop()
+            out.append(vals)
+        while out and not out[-1]:
+            out.pop()
+        self._hit("get", len(out))
+        return out
+
+    def get_all_values(self) -> List[List[str]]:
+        return self.get(f"A1:{col_letter(self.col_count)}")
+
+    # ---------- write
+    def update(self, rng, values=None, value_input_option: Optional[str] = None, **_):
+        if values is None:  # gspread lama: update(values, range)
+            rng, values = "A1", rng
+        c1, r1, _, _ = self._parse(rng)
+        end = r1 + len(values) - 1
+        if end > self.row_count:
+            raise ValueError(f"Range ({rng}) exceeds grid limits. Max rows: {self.row_count}")
+        with self._data:
+            while len(self._cells) < end:
+                self._cells.append([])
+            for i, vals in enumerate(values):
+                row = self._cells[r1 - 1 + i]
+                need = c1 - 1 + len(vals)
+                row.extend([""] * max(0, need - len(row)))
+                row[c1 - 1:need] = [str(v) for v in vals]
+        self._hit("update", len(values))
+        return {"updatedRange": rng}
+
+    def append_row(self, values, value_input_option: Optional[str] = None, **_):
+        with self._data:
+            row = self._last_row() + 1
+            if row > self.row_count:
+                self.row_count = row
+            while len(self._cells) < row:
+                self._cells.append([])
+            self._cells[row - 1] = [str(v) for v in values]
+        self._hit("append_row", 1)
+        return {"updates": {"updatedRange": f"A{row}"}}
+
+    def add_rows(self, n: int):
+        self.row_count += int(n)
+        self._hit("add_rows")
+
+    def resize(self, rows: Optional[int] = None, cols: Optional[int] = None):
+        if rows is not None:
+            self.row_count = int(rows)
+            del self._cells[self.row_count:]
+        if cols is not None:
+            self.col_count = int(cols)
+        self._hit("resize")
+
+    def batch_update(self, data, **_):
+        for item in data:
+            self.update(item["range"], item["values"])
+        self._hit("batch_update")
+
+    def format(self, *_, **__):
+        self._hit("format")
+
+    def copy_to(self, spreadsheet_id: str) -> Dict:
+        dest = FakeSpreadsheet.by_id[spreadsheet_id]
+        ws = dest.add_worksheet(f"Copy of {self.title}", rows=self.row_count, cols=self.col_count)
+        with self._data:
+            ws._cells = [list(r) for r in self._cells]
+        self._hit("copy_to")
+        return {"sheetId": ws.id, "title": ws.title}
+
+    def update_title(self, title: str):
+        if self.spreadsheet is not None:
+            if title in self.spreadsheet._ws:
+                raise ValueError(f'A sheet with the name "{title}" already exists.')
+            self.spreadsheet._ws.pop(self.title, None)
+            self.spreadsheet._ws[title] = self
+        self.title = title
+        self._hit("update_title")
+
+    @property
+    def data_rows(self) -> int:
+        return self._last_row() - 1
+
+
+class FakeSpreadsheet(_Latency):
+    """
+    Subset ``gspread.Spreadsheet``: worksheet, worksheets, get_worksheet_by_id, add_worksheet,
+    del_worksheet, batch_update, fetch_sheet_metadata.
+    """
+
+    by_id: Dict[str, "FakeSpreadsheet"] = {}  # tujuan FakeWorksheet.copy_to
+
+    def __init__(self, worksheets: Optional[List[FakeWorksheet]] = None, title: str = "Absensi_Karyawan",
+                 latency: float = 0.0):
+        super().__init__(latency)
+        self.id = f"fake-{id(self):x}"
+        FakeSpreadsheet.by_id[self.id] = self
+        self.title = title
+        self._ws: Dict[str, FakeWorksheet] = {}
+        for ws in worksheets or []:
+            ws.spreadsheet = self
+            self._ws[ws.title] = ws
+        self.batch_requests = 0
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        self._hit("worksheet")
+        try:
+            return self._ws[title]
+        except KeyError:
+            # pakai exception gspread asli kalau terpasang (PartitionManager menangkap itu)
+            raise getattr(optional_import("gspread"), "WorksheetNotFound", KeyError)(title)
+
+    def worksheets(self) -> List[FakeWorksheet]:
+        self._hit("worksheets")
+        return list(self._ws.values())
+
+    def get_worksheet_by_id(self, sheet_id: int) -> FakeWorksheet:
+        self._hit("get_worksheet_by_id")
+        ws = next((w for w in self._ws.values() if w.id == sheet_id), None)
+        if ws is None:
+            raise getattr(optional_import("gspread"), "WorksheetNotFound", KeyError)(sheet_id)
+        return ws
+
+    def del_worksheet(self, ws: FakeWorksheet):
+        self._hit("del_worksheet")
+        self._ws.pop(ws.title, None)
+
+    def add_worksheet(self, title: str, rows: int = 1000, cols: int = 6, **_) -> FakeWorksheet:
+        self._hit("add_worksheet")
+        if title in self._ws:
+            raise ValueError(f'A sheet with the name "{title}" already exists.')
+        ws = FakeWorksheet(title, rows=[], header=[], row_count=rows, col_count=cols,
+                           latency=self.latency, spreadsheet=self)
+        ws._cells = [[]]
+        self._ws[title] = ws
+        return ws
+
+    def batch_update(self, body: Dict):
+        self.batch_requests += len(body.get("requests", []))
+        self._hit("batch_update")
+        return {"replies": []}
+
+    def fetch_sheet_metadata(self, params: Optional[Dict] = None):
+        self._hit("fetch_sheet_metadata")
+        return {"sheets": [{"properties": {"sheetId": ws.id, "title": ws.title}} for ws in self._ws.values()]}
+
+
+class FakeDropbox(_Latency):
+    """Client Dropbox palsu untuk ``upload_selfie`` (files_upload + shared link)."""
+
+    def __init__(self, latency: float = 0.0, per_mb: float = 0.0, fail_every: int = 0):
+        super().__init__(latency)
+        self.per_mb = float(per_mb)
+        self.fail_every = int(fail_every)
+        self.files: Dict[str, int] = {}
+        self._links: Dict[str, str] = {}
+
+    def users_get_current_account(self):
+        self._hit("users_get_current_account")
+        return SimpleNamespace(email="bench@example.com")
+
+    def files_upload(self, data: bytes, path: str, mode=None, **_):
+        self._hit("files_upload")
+        if self.per_mb > 0:
+            time.sleep(self.per_mb * len(data) / 1e6)
+        if self.fail_every and self.calls["files_upload"] % self.fail_every == 0:
+            raise ConnectionError("fake upload gagal")
+        self.files[path] = len(data)
+        return SimpleNamespace(path_display=path, size=len(data))
+
+    def sharing_create_shared_link_with_settings(self, path: str, settings=None):
+        self._hit("sharing_create_shared_link_with_settings")
+        url = self._links.setdefault(path, f"https://www.dropbox.com/s/{abs(hash(path)) % 10 ** 10:010d}/x?dl=0")
+        return SimpleNamespace(url=url, path_lower=path.lower())
+
+    def sharing_list_shared_links(self, path: str, direct_only: bool = False):
+        self._hit("sharing_list_shared_links")
+        url = self._links.get(path)
+        return SimpleNamespace(links=[SimpleNamespace(url=url)] if url else [])
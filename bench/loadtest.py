@@ -0,0 +1,268 @@
+"""
+Load test alur form absen: N user simulasi datang bersamaan (arrival Poisson),
+tiap user = 1 thread seperti 1 script run Streamlit, lewat jalur yang sama
+dengan app: antrean submit (``AdmissionController.admit``), lalu
+``Core.put_selfie`` + ``Core.append_row`` (pool client, scheduler kuota Sheets,
+partisi, tulis baris sesuai ``app.row_write``) dan ``Core.rekap``, tapi ke
+backend palsu (bench.fakes).
+
+    python -m bench.loadtest                                  # ramp 0.5 -> 20 user/detik
+    python -m bench.loadtest --rates 1,2,4,8 --stage-seconds 60
+    python -m bench.loadtest --no-quota --sheets-latency-ms 120 --dropbox-latency-ms 400
+    python -m bench.loadtest --rows 100000 --max-p95-ms 8000 --json hasil.json
+
+Contoh sizing event 1.000 orang: kalau 80% datang dalam 20 menit, rata-rata
+~0,7 user/detik dengan puncak beberapa kali lipat -> cari stage tertinggi yang
+p95-nya masih wajar dan error rate 0.
+
+Per stage dilaporkan: throughput, p50/p95/p99 latency submit (termasuk antre,
+sampai rekap setelah submit tampil), error rate (``Overloaded`` = ditolak
+antrean), in-flight maksimum, dan RSS high-water mark proses. SDK ``dropbox``
+dan Pillow opsional (tanpa Pillow, foto tidak dioptimasi).
+"""
+import argparse
+import io
+import itertools
+import json
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Dict, List
+
+from absensi.admission import AdmissionController
+from absensi.config import Settings
+from absensi.core import Core
+from absensi.images import optimize_image_bytes
+from absensi.lazy import optional_import
+from absensi.metrics import percentile
+from absensi.quota import PRIORITY_SUBMIT, ScheduledSpreadsheet, sheets_priority
+from absensi.selfie import selfie_path
+from bench.fakes import FakeDropbox, FakeSpreadsheet, FakeWorksheet, ensure_dropbox_sdk, make_log_rows
+
+
+def _rss_mb() -> float:
+    # ru_maxrss: KB di Linux, byte di macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+class TTLCache:
+    """Tiruan ``st.cache_data(ttl=...)`` untuk 1 key: 1 thread menghitung, sisanya menunggu."""
+
+    def __init__(self, fn, ttl: float):
+        self.fn = fn
+        self.ttl = float(ttl)
+        self._lock = threading.Lock()
+        self._value = None
+        self._at = 0.0
+
+    def get(self):
+        with self._lock:
+            if self._value is None or (time.monotonic() - self._at) > self.ttl:
+                self._value = self.fn()
+                self._at = time.monotonic()
+            return self._value
+
+    def clear(self):
+        with self._lock:
+            self._value = None
+
+
+class FakeCore(Core):
+    """``Core`` app yang client Sheets / Dropbox-nya backend palsu (sisanya kode yang sama)."""
+
+    def __init__(self, sh: FakeSpreadsheet, dbx: FakeDropbox, settings: Settings, base_dir: str):
+        self._fake_sh = sh
+        self._fake_dbx = dbx
+        super().__init__({}, settings=settings, base_dir=base_dir, rekap_snapshot=False)
+
+    def connect_gsheet(self):
+        return ScheduledSpreadsheet(self._fake_sh, self.scheduler)
+
+    def connect_dropbox(self):
+        return self._fake_dbx
+
+
+class Backend:
+    """Padanan resource proses app (``st.cache_resource``) di atas backend palsu."""
+
+    def __init__(self, args):
+        self.args = args
+        sheets_latency = args.sheets_latency_ms / 1000.0
+        self.ws = FakeWorksheet("Log", rows=make_log_rows(args.rows), latency=sheets_latency)
+        self.sh = FakeSpreadsheet([self.ws], latency=sheets_latency)
+        self.dbx = FakeDropbox(latency=args.dropbox_latency_ms / 1000.0)
+
+        unlimited = 10 ** 9
+        settings = Settings({
+            "quota_read_per_min": unlimited if args.no_quota else args.quota_read_per_min,
+            "quota_write_per_min": unlimited if args.no_quota else args.quota_write_per_min,
+            "quota_burst": args.quota_burst,
+            "gsheet_pool_size": args.gsheet_pool,
+            "dropbox_pool_size": args.dropbox_pool,
+            "pool_timeout": args.pool_timeout,
+            "row_write": args.row_write,
+        })
+        self.core = FakeCore(self.sh, self.dbx, settings, tempfile.mkdtemp(prefix="absensi-loadtest-"))
+        # sama dengan get_admission() di app.py
+        self.admission = AdmissionController(
+            max_inflight=args.submit_max_inflight, max_queue=args.submit_max_queue, max_wait=args.submit_max_wait
+        )
+        self.rekap = TTLCache(self.core.rekap, ttl=30)
+
+
+class Session:
+    """1 user: buka form (rekap), isi, submit (antre dulu), lalu rerun menampilkan rekap terbaru."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, backend: Backend, photo: bytes):
+        self.b = backend
+        self.photo = photo
+        self.n = next(self._ids)
+
+    def run(self) -> Dict:
+        b, args = self.b, self.b.args
+        out = {"ok": True, "error": ""}
+        try:
+            b.rekap.get()
+            if args.think_seconds > 0:
+                time.sleep(random.expovariate(1.0 / args.think_seconds))
+
+            t0 = time.perf_counter()
+            now = b.core.now()
+            nama = f"Load User {self.n:05d}"
+            with b.admission.admit(), sheets_priority(PRIORITY_SUBMIT):
+                img, ext = optimize_image_bytes(self.photo, ".jpg")
+                path = selfie_path("/Absensi_Selfie", nama, now.strftime("%Y-%m-%d_%H-%M-%S"), ext)
+                url = b.core.put_selfie(path, img)
+                b.core.append_row(now, [now.strftime("%d-%m-%Y %H:%M:%S"), nama, f"08{self.n:010d}",
+                                        "Teknisi", url, path])
+            b.rekap.clear()
+            b.rekap.get()
+            out["latency"] = time.perf_counter() - t0
+        except Exception as e:
+            out["ok"] = False
+            out["error"] = type(e).__name__
+        return out
+
+
+def _photo(args) -> bytes:
+    Image = optional_import("PIL.Image")
+    if Image is None:
+        return b"\xff\xd8" + b"0" * args.photo_kb * 1024
+    img = Image.effect_noise((1200, 1600), 64).convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def run_stage(backend: Backend, photo: bytes, rate: float, seconds: float) -> Dict:
+    results: List[Dict] = []
+    lock = threading.Lock()
+    inflight = [0, 0]  # sekarang, maksimum
+
+    def user():
+        with lock:
+            inflight[0] += 1
+            inflight[1] = max(inflight[1], inflight[0])
+        res = Session(backend, photo).run()
+        res["end"] = time.monotonic()
+        with lock:
+            inflight[0] -= 1
+            results.append(res)
+
+    start = time.monotonic()
+    threads = []
+    t = start
+    while True:
+        t += random.expovariate(rate)
+        if t - start > seconds:
+            break
+        time.sleep(max(0.0, t - time.monotonic()))
+        th = threading.Thread(target=user, daemon=True)
+        th.start()
+        threads.append(th)
+    for th in threads:
+        th.join()
+
+    lat = sorted(r["latency"] for r in results if r["ok"])
+    errors = Counter(r["error"] for r in results if not r["ok"])
+    elapsed = (max((r["end"] for r in results), default=start) - start) or seconds
+    return {
+        "rate": rate,
+        "arrivals": len(threads),
+        "completed": len(lat),
+        "errors": sum(errors.values()),
+        "error_rate": round(sum(errors.values()) / max(1, len(results)), 4),
+        "error_types": dict(errors),
+        "throughput": round(len(lat) / elapsed, 3),
+        "p50_ms": round(percentile(lat, 0.50) * 1000.0, 1),
+        "p95_ms": round(percentile(lat, 0.95) * 1000.0, 1),
+        "p99_ms": round(percentile(lat, 0.99) * 1000.0, 1),
+        "max_ms": round((lat[-1] if lat else 0.0) * 1000.0, 1),
+        "max_inflight": inflight[1],
+        "rss_peak_mb": round(_rss_mb(), 1),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rates", default="0.5,1,2,5,10,20", help="arrival rate per stage (user/detik), pisah koma")
+    ap.add_argument("--stage-seconds", type=float, default=30)
+    ap.add_argument("--rows", type=int, default=10000, help="baris log yang sudah ada di sheet palsu")
+    ap.add_argument("--think-seconds", type=float, default=0.0, help="rata-rata waktu isi form (tidak diukur)")
+    ap.add_argument("--sheets-latency-ms", type=float, default=80)
+    ap.add_argument("--dropbox-latency-ms", type=float, default=250)
+    ap.add_argument("--photo-kb", type=int, default=300, help="ukuran foto dummy kalau Pillow tidak ada")
+    ap.add_argument("--gsheet-pool", type=int, default=4)
+    ap.add_argument("--dropbox-pool", type=int, default=4)
+    ap.add_argument("--pool-timeout", type=float, default=30)
+    ap.add_argument("--quota-read-per-min", type=float, default=60)
+    ap.add_argument("--quota-write-per-min", type=float, default=60)
+    ap.add_argument("--quota-burst", type=int, default=10)
+    ap.add_argument("--no-quota", action="store_true", help="tanpa batas kuota Sheets (ukur CPU/IO saja)")
+    ap.add_argument("--row-write", default="append", choices=["auto", "append", "cursor"], help="app.row_write")
+    ap.add_argument("--submit-max-inflight", type=int, default=4)
+    ap.add_argument("--submit-max-queue", type=int, default=40)
+    ap.add_argument("--submit-max-wait", type=float, default=45)
+    ap.add_argument("--max-p95-ms", type=float, default=0, help="hentikan ramp kalau p95 melewati batas ini")
+    ap.add_argument("--json", default="", help="simpan hasil per stage ke file JSON")
+    args = ap.parse_args(argv)
+
+    ensure_dropbox_sdk()
+    backend = Backend(args)
+    photo = _photo(args)
+    rates = [float(r) for r in args.rates.split(",") if r.strip()]
+
+    print(f"{'rate/s':>7} {'arrive':>7} {'ok':>6} {'err%':>6} {'thru/s':>7} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'inflight':>8} {'rss MB':>7}")
+    stages = []
+    for rate in rates:
+        st = run_stage(backend, photo, rate, args.stage_seconds)
+        stages.append(st)
+        print(f"{st['rate']:>7.2f} {st['arrivals']:>7} {st['completed']:>6} {st['error_rate'] * 100:>6.1f} "
+              f"{st['throughput']:>7.2f} {st['p50_ms']:>9.1f} {st['p95_ms']:>9.1f} {st['p99_ms']:>9.1f} "
+              f"{st['max_inflight']:>8} {st['rss_peak_mb']:>7.1f}"
+              + (f"  {st['error_types']}" if st["errors"] else ""))
+        if args.max_p95_ms and st["p95_ms"] > args.max_p95_ms:
+            print(f"p95 > {args.max_p95_ms:.0f} ms -> ramp dihentikan.")
+            break
+
+    core = backend.core
+    print("Antrean submit:", json.dumps(backend.admission.status()))
+    print("Kuota Sheets:", json.dumps(core.scheduler.metrics()))
+    print("Pool:", json.dumps({"gsheet": core.gsheet_pool.stats(), "dropbox": core.dropbox_pool.stats()}))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "stages": stages}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
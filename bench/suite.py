@@ -0,0 +1,198 @@
+"""
+Benchmark pipeline app terhadap backend palsu (bench.fakes), tanpa akun
+Google / Dropbox sungguhan. Tiap kasus diulang beberapa round per ukuran log
+dan dilaporkan min / median / mean / stddev seperti pytest-benchmark.
+
+    python -m bench.suite                              # 1k, 10k, 100k baris
+    python -m bench.suite --sizes 1000,10000 --rounds 5
+    python -m bench.suite --latency-ms 80 --dropbox-latency-ms 300
+    python -m bench.suite --only rekap --json hasil.json
+
+Kasus:
+  rekap.full         get_rekap_today saat state kosong (scan kolom A + baca baris hari ini)
+  rekap.incremental  get_rekap_today setelah 1 baris baru (baca dari high-water mark)
+  export.fetch_log   collect_log_rows (A:D, E formula, F -> baris export)
+  export.csv         make_csv_bytes
+  export.xlsx        make_xlsx_bytes (butuh openpyxl)
+  image.optimize     optimize_image_bytes foto 3000x4000 (butuh Pillow)
+  submit.full        optimize + pilih tab + upload Dropbox + tulis baris
+
+Kasus yang dependency-nya belum terpasang ditandai "(skip)". SDK ``dropbox``
+tidak wajib: tanpa SDK dipakai pengganti dari ``bench.fakes.ensure_dropbox_sdk``.
+"""
+import argparse
+import io
+import json
+import statistics
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from absensi.export import collect_log_rows, make_csv_bytes, make_hyperlink, make_xlsx_bytes
+from absensi.images import optimize_image_bytes
+from absensi.lazy import optional_import
+from absensi.partitions import PartitionManager
+from absensi.rekap import RekapStore
+from absensi.selfie import selfie_path, upload_selfie
+from absensi.sheets import RowCursor
+from bench.fakes import LOG_HEADER, FakeDropbox, FakeSpreadsheet, FakeWorksheet, ensure_dropbox_sdk, make_log_rows
+
+EXPORT_HEADER = ["No"] + LOG_HEADER[:4] + ["Bukti Selfie (URL)", LOG_HEADER[5]]
+
+
+class Skip(Exception):
+    pass
+
+
+def run_case(fn: Callable, rounds: int, setup: Optional[Callable] = None) -> Dict:
+    """``setup()`` (tidak diukur) -> arg untuk ``fn(arg)``; 1 round pemanasan tidak dihitung."""
+    times = []
+    for i in range(rounds + 1):
+        arg = setup() if setup else None
+        t0 = time.perf_counter()
+        fn(arg)
+        dt = time.perf_counter() - t0
+        if i > 0:
+            times.append(dt)
+    return {
+        "rounds": len(times),
+        "min": min(times),
+        "max": max(times),
+        "mean": statistics.mean(times),
+        "median": statistics.median(times),
+        "stddev": statistics.stdev(times) if len(times) > 1 else 0.0,
+    }
+
+
+def _require(name: str):
+    mod = optional_import(name)
+    if mod is None:
+        raise Skip(f"{name} belum terpasang")
+    return mod
+
+
+def _sample_jpeg() -> bytes:
+    Image = _require("PIL.Image")
+    img = Image.linear_gradient("L").resize((3000, 4000)).convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=92)
+    return buf.getvalue()
+
+
+def build_cases(size: int, args) -> Dict[str, Dict]:
+    latency = args.latency_ms / 1000.0
+    today = datetime.now()
+    day = today.strftime("%d-%m-%Y")
+    rows = make_log_rows(size, day=today, people=args.people)
+
+    def log_ws() -> FakeWorksheet:
+        ws = FakeWorksheet("Log", rows=rows, latency=latency)
+        FakeSpreadsheet([ws])
+        return ws
+
+    export_rows = collect_log_rows([log_ws()])
+
+    cases: Dict[str, Dict] = {}
+
+    cases["rekap.full"] = {
+        "setup": lambda: (RekapStore("bench"), log_ws()),
+        "fn": lambda a: a[0].refresh(day, [a[1]]),
+    }
+
+    def rekap_warm():
+        store, ws = RekapStore("bench"), log_ws()
+        store.refresh(day, [ws])
+        ws.append_row([today.strftime("%d-%m-%Y %H:%M:%S"), "Karyawan Baru", "081234567890", "Teknisi", "-", "-"])
+        return store, ws
+
+    cases["rekap.incremental"] = {"setup": rekap_warm, "fn": lambda a: a[0].refresh(day, [a[1]])}
+
+    cases["export.fetch_log"] = {"setup": log_ws, "fn": lambda ws: collect_log_rows([ws])}
+    cases["export.csv"] = {"fn": lambda _: make_csv_bytes(EXPORT_HEADER, export_rows)}
+
+    def xlsx(_):
+        _require("openpyxl")
+        make_xlsx_bytes("Log Absensi", EXPORT_HEADER, export_rows, hyperlink_col=5, top_header_lines=["Bench"])
+
+    cases["export.xlsx"] = {"fn": xlsx}
+
+    def submit_setup():
+        jpeg = _sample_jpeg() if optional_import("PIL.Image") is not None else b"\xff\xd8" + b"0" * 300_000
+        ws = log_ws()
+        sh = ws.spreadsheet
+        cursor = RowCursor(n_cols=len(LOG_HEADER), verify_col=LOG_HEADER.index("Dropbox Path"))
+        cursor.sync(ws)  # proses yang sudah hangat
+        parts = PartitionManager(base_title="Log")
+        dbx = FakeDropbox(latency=args.dropbox_latency_ms / 1000.0)
+        return jpeg, sh, cursor, parts, dbx
+
+    def submit(a):
+        jpeg, sh, cursor, parts, dbx = a
+        now = datetime.now()
+        img, ext = optimize_image_bytes(jpeg, ".jpg")
+        ws = sh.worksheet(parts.write_title(sh, now.date()))
+        path = selfie_path("/Absensi_Selfie", "Karyawan Bench", now.strftime("%Y-%m-%d_%H-%M-%S"), ext)
+        url = upload_selfie(dbx, img, path)
+        row = cursor.append(ws, [now.strftime("%d-%m-%Y %H:%M:%S"), "Karyawan Bench", "081234567890",
+                                 "Teknisi", make_hyperlink(url), path])
+        parts.note_written(ws.title, row)
+
+    cases["submit.full"] = {"setup": submit_setup, "fn": submit}
+    return cases
+
+
+def image_case(args) -> Dict:
+    jpeg = _sample_jpeg()
+    return run_case(lambda _: optimize_image_bytes(jpeg, ".jpg"), args.rounds)
+
+
+def _fmt_row(name: str, size, res: Dict) -> str:
+    ms = {k: res[k] * 1000.0 for k in ("min", "median", "mean", "stddev")}
+    return (f"{name:<20} {size:>8} {ms['min']:>10.2f} {ms['median']:>10.2f} "
+            f"{ms['mean']:>10.2f} {ms['stddev']:>9.2f} {res['rounds']:>6}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="1000,10000,100000", help="jumlah baris log, pisah koma")
+    ap.add_argument("--rounds", type=int, default=3)
+    ap.add_argument("--people", type=int, default=400, help="jumlah absen per hari di data palsu")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="latency per call Sheets palsu")
+    ap.add_argument("--dropbox-latency-ms", type=float, default=0.0, help="latency per call Dropbox palsu")
+    ap.add_argument("--only", default="", help="hanya kasus yang namanya mengandung teks ini")
+    ap.add_argument("--json", default="", help="simpan hasil mentah ke file JSON")
+    args = ap.parse_args(argv)
+
+    ensure_dropbox_sdk()
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results: List[Dict] = []
+
+    print(f"{'kasus':<20} {'baris':>8} {'min ms':>10} {'median ms':>10} {'mean ms':>10} {'stddev':>9} {'rounds':>6}")
+
+    if args.only in "image.optimize":
+        try:
+            res = image_case(args)
+            print(_fmt_row("image.optimize", "-", res))
+            results.append({"case": "image.optimize", "size": None, **res})
+        except Skip as e:
+            print(f"{'image.optimize':<20} {'-':>8}  (skip: {e})")
+
+    for size in sizes:
+        for name, case in build_cases(size, args).items():
+            if args.only and args.only not in name:
+                continue
+            try:
+                res = run_case(case["fn"], args.rounds, case.get("setup"))
+            except Skip as e:
+                print(f"{name:<20} {size:>8}  (skip: {e})")
+                continue
+            print(_fmt_row(name, size, res))
+            results.append({"case": name, "size": size, **res})
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
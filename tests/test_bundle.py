@@ -0,0 +1,118 @@
+import threading
+import zipfile
+
+from absensi.bundle import BundleJobs, build_evidence_zip, entry_names
+from absensi.export import SCOPE_ABSENTEES, SCOPE_EVIDENCE, export_scopes
+
+
+def test_evidence_export_only_for_admin():
+    assert SCOPE_EVIDENCE not in export_scopes(admin=False)
+    assert SCOPE_EVIDENCE not in export_scopes(admin=False, roster=True)
+    assert SCOPE_ABSENTEES not in export_scopes(admin=False, roster=True)
+    assert SCOPE_EVIDENCE in export_scopes(admin=True)
+    assert SCOPE_ABSENTEES in export_scopes(admin=True, roster=True)
+
+
+def test_bundle_job_runs_in_background_once_per_key(tmp_path):
+    out = str(tmp_path / "bukti.zip")
+    release = threading.Event()
+    calls = []
+
+    def download(path):
+        release.wait(5)
+        return path.encode()
+
+    def run(progress):
+        calls.append(1)
+        return build_evidence_zip(out, {"log.csv": b"x"}, ["/Absensi_Selfie/Budi/a.jpg"], download,
+                                  progress=progress, root="/Absensi_Selfie")
+
+    jobs = BundleJobs()
+    assert jobs.start(out, run)
+    # klik kedua saat job masih jalan tidak membuat job baru
+    assert not jobs.start(out, run)
+    assert jobs.status(out)["running"]
+
+    release.set()
+    for _ in range(500):
+        if not jobs.status(out)["running"]:
+            break
+        threading.Event().wait(0.01)
+    job = jobs.status(out)
+    assert job["error"] is None
+    assert job["result"]["complete"]
+    assert (job["done"], job["total"]) == (1, 1)
+    assert len(calls) == 1
+    with zipfile.ZipFile(out) as zf:
+        assert sorted(zf.namelist()) == ["log.csv", "selfie/Budi/a.jpg"]
+
+
+def test_bundle_job_reports_error():
+    jobs = BundleJobs()
+
+    def run(progress):
+        raise RuntimeError("log tidak terbaca")
+
+    jobs.start("k", run)
+    for _ in range(500):
+        if not jobs.status("k")["running"]:
+            break
+        threading.Event().wait(0.01)
+    assert "log tidak terbaca" in jobs.status("k")["error"]
+
+
+def _zip_names(path):
+    with zipfile.ZipFile(path) as zf:
+        return sorted(zf.namelist())
+
+
+def test_resume_rewrites_log_and_adds_new_rows_without_redownload(tmp_path):
+    out = str(tmp_path / "bukti.zip")
+    calls = []
+
+    def download(path):
+        calls.append(path)
+        return path.encode()
+
+    root = "/Absensi_Selfie"
+    build_evidence_zip(out, {"log.csv": b"1 baris"}, [f"{root}/Budi/a.jpg"], download, root=root)
+    res = build_evidence_zip(out, {"log.csv": b"2 baris"}, [f"{root}/Budi/a.jpg", f"{root}/Ani/b.jpg"], download,
+                             root=root)
+
+    assert calls == [f"{root}/Budi/a.jpg", f"{root}/Ani/b.jpg"]
+    assert res["complete"] and res["skipped"] == 1
+    assert _zip_names(out) == ["log.csv", "selfie/Ani/b.jpg", "selfie/Budi/a.jpg"]
+    with zipfile.ZipFile(out) as zf:
+        assert zf.read("log.csv") == b"2 baris"
+
+
+def test_resume_after_crash_keeps_downloaded_parts(tmp_path):
+    out = str(tmp_path / "bukti.zip")
+    paths = [f"/Absensi_Selfie/P{i}/x.jpg" for i in range(4)]
+    calls = []
+
+    def dying(path):
+        if len(calls) >= 2:
+            raise KeyboardInterrupt  # proses mati di tengah unduhan
+        calls.append(path)
+        return b"foto"
+
+    try:
+        build_evidence_zip(out, {"log.csv": b"x"}, paths, dying, workers=1, retries=0, root="/Absensi_Selfie")
+    except KeyboardInterrupt:
+        pass
+    # ZIP sebelumnya belum pernah ditulis, tapi 2 foto sudah aman di folder parts
+    again = []
+    res = build_evidence_zip(out, {"log.csv": b"x"}, paths, lambda p: again.append(p) or b"foto",
+                             root="/Absensi_Selfie")
+    assert len(again) == 2 and set(again).isdisjoint(calls)
+    assert res["complete"]
+    assert len(_zip_names(out)) == 5
+
+
+def test_entry_names_do_not_collide_across_roots():
+    names = entry_names(["/Absensi_Selfie/Budi/a.jpg", "/Lama/Budi/a.jpg", "/lama/budi/A.JPG"],
+                        root="/Absensi_Selfie")
+    assert names["/Absensi_Selfie/Budi/a.jpg"] == "selfie/Budi/a.jpg"
+    assert names["/Lama/Budi/a.jpg"] == "selfie_lain/Lama/Budi/a.jpg"
+    assert len(set(n.lower() for n in names.values())) == 3
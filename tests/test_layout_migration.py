@@ -0,0 +1,67 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from absensi.layout_migration import move_batch, target_path
+from bench.fakes import ensure_dropbox_sdk
+
+
+class _Status:
+    def __init__(self, state: str):
+        self.state = state
+
+    def is_complete(self):
+        return self.state == "complete"
+
+    def is_failed(self):
+        return self.state == "failed"
+
+    def get_failed(self):
+        return "too_many_write_operations"
+
+    def get_async_job_id(self):
+        return "job-1"
+
+
+class _FailingDropbox:
+    """Job move batch async yang gagal total; ``moved`` = file yang sempat pindah sebelum gagal."""
+
+    def __init__(self, moved=()):
+        self.moved = set(moved)
+        self.checks = 0
+
+    def files_move_batch_v2(self, entries, autorename=False):
+        return _Status("in_progress")
+
+    def files_move_batch_check_v2(self, job_id):
+        self.checks += 1
+        return _Status("failed")
+
+    def files_get_metadata(self, path):
+        if path not in self.moved:
+            raise LookupError(path)
+        return SimpleNamespace(path_display=path)
+
+
+@pytest.fixture(autouse=True)
+def _dropbox_sdk():
+    ensure_dropbox_sdk()
+
+
+def test_failed_batch_job_reports_errors_without_waiting_for_timeout():
+    pairs = [("/S/Budi/a.jpg", "/S/2026/01/09/a.jpg"), ("/S/Ani/b.jpg", "/S/2026/01/09/b.jpg")]
+    dbx = _FailingDropbox(moved={"/S/2026/01/09/a.jpg"})
+
+    t0 = time.monotonic()
+    errors = move_batch(dbx, pairs, poll=0.01, timeout=5)
+
+    assert time.monotonic() - t0 < 1
+    assert dbx.checks == 1
+    assert errors[0] is None
+    assert "gagal" in errors[1] and "too_many_write_operations" in errors[1]
+
+
+def test_target_path_moves_person_layout_to_date_layout():
+    new = target_path("/Absensi_Selfie/Budi/2026-01-09_08-15-00_selfie.jpg", "/Absensi_Selfie", "date")
+    assert new.startswith("/Absensi_Selfie/2026/01/09/")
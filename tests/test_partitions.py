@@ -0,0 +1,77 @@
+from datetime import date
+
+import pytest
+
+from absensi.partitions import (
+    ARCHIVE_SPREADSHEET,
+    ARCHIVE_TAB,
+    PARTITION_MONTH,
+    STATUS_ARCHIVED,
+    PartitionManager,
+)
+from bench.fakes import FakeSpreadsheet, FakeWorksheet, ensure_gspread, make_log_rows
+
+
+@pytest.fixture(autouse=True)
+def _gspread():
+    ensure_gspread()
+
+
+def _ensure_ws(sh, title):
+    try:
+        return sh.worksheet(title)
+    except Exception:
+        return sh.add_worksheet(title, rows=100)
+
+
+def _setup(archive_mode, archive_sh=None, months=(1, 2, 3)):
+    sh = FakeSpreadsheet([FakeWorksheet("_Partisi", rows=[], header=["Tab", "Lokasi", "Mulai", "Selesai", "Status"])])
+    parts = PartitionManager("Log", mode=PARTITION_MONTH, archive_mode=archive_mode, archive_keep=0,
+                             archive_name="Arsip", ensure_ws=_ensure_ws, open_archive=lambda _: archive_sh)
+    # rollover tiap bulan; bulan terakhir tetap aktif
+    for m in months:
+        title = parts.write_title(sh, date(2026, m, 10))
+        sh.worksheet(title).update("A2", make_log_rows(2, people=2))
+    return sh, parts
+
+
+def test_rollover_does_not_archive_on_submit_path():
+    sh, parts = _setup(ARCHIVE_TAB)
+    titles = {ws.title for ws in sh.worksheets()}
+    assert {"Log_2026_01", "Log_2026_02", "Log_2026_03"} <= titles
+    assert parts.archive_pending
+
+    assert parts.archive_closed(sh) == 2
+    assert not parts.archive_pending
+    assert {"Arsip_Log_2026_01", "Arsip_Log_2026_02", "Log_2026_03"} <= {ws.title for ws in sh.worksheets()}
+
+
+def test_tab_archive_saves_index_per_entry_and_resumes():
+    sh, parts = _setup(ARCHIVE_TAB)
+    second = sh.worksheet("Log_2026_02")
+    second.update_title = lambda title: (_ for _ in ()).throw(ConnectionError("putus"))
+
+    with pytest.raises(ConnectionError):
+        parts.archive_closed(sh)
+    # tab pertama sudah di-rename -> index langsung menunjuk nama barunya
+    index = {e.title: e.status for e in parts.entries(sh, force=True)}
+    assert index["Arsip_Log_2026_01"] == STATUS_ARCHIVED
+    assert "Log_2026_01" not in index
+
+    del second.update_title
+    assert parts.archive_closed(sh) == 1
+    assert all(e.status == STATUS_ARCHIVED for e in parts.entries(sh, force=True) if "2026_03" not in e.title)
+
+
+def test_spreadsheet_archive_does_not_copy_twice():
+    archive = FakeSpreadsheet([], title="Arsip")
+    sh, parts = _setup(ARCHIVE_SPREADSHEET, archive_sh=archive)
+    # run sebelumnya mati setelah copy + rename, sebelum tab asal dihapus / index disimpan
+    res = sh.worksheet("Log_2026_01").copy_to(archive.id)
+    archive.get_worksheet_by_id(res["sheetId"]).update_title("Log_2026_01")
+
+    assert parts.archive_closed(sh) == 2
+
+    assert sorted(ws.title for ws in archive.worksheets()) == ["Log_2026_01", "Log_2026_02"]
+    assert [ws.title for ws in sh.worksheets() if ws.title.startswith("Log")] == ["Log_2026_03"]
+    assert {e.title: e.location for e in parts.entries(sh, force=True)}["Log_2026_01"] == "Arsip"
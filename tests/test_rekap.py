@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+
+from absensi.rekap import SHARED_STATE_KEY, RekapStore
+from absensi.shared_cache import open_shared_cache
+from bench.fakes import FakeSpreadsheet, FakeWorksheet, make_log_rows
+
+NOW = datetime(2026, 1, 9, 12, 0, 0)
+TODAY = NOW.strftime("%d-%m-%Y")
+YESTERDAY = (NOW - timedelta(days=1)).strftime("%d-%m-%Y")
+
+
+def _ws() -> FakeWorksheet:
+    # 2 hari x 20 baris, urut waktu
+    ws = FakeWorksheet("Log", rows=make_log_rows(40, day=NOW, people=20))
+    FakeSpreadsheet([ws])
+    return ws
+
+
+def _expected(ws, day):
+    return RekapStore("test").refresh(day, [ws])
+
+
+def _store(tmp_path, **kw) -> RekapStore:
+    return RekapStore("test", live_day=lambda: TODAY, **kw)
+
+
+def test_other_day_does_not_replace_live_state(tmp_path):
+    ws = _ws()
+    store = _store(tmp_path)
+    today = store.refresh(TODAY, [ws])
+
+    other = store.refresh(YESTERDAY, [ws])
+
+    assert other["today"] == YESTERDAY
+    assert other["total"] == _expected(ws, YESTERDAY)["total"] > 0
+    assert store.state.day == TODAY
+    assert store.refresh(TODAY, [ws])["total"] == today["total"] > 0
+
+
+def test_other_day_does_not_touch_shared_state(tmp_path):
+    ws = _ws()
+    shared = open_shared_cache("sqlite:///shared.sqlite3", str(tmp_path))
+    replica_a = _store(tmp_path, shared=shared)
+    today = replica_a.refresh(TODAY, [ws])
+    published = shared.get_json(SHARED_STATE_KEY)
+
+    # CLI `rekap --date <kemarin>` dengan shared_cache aktif
+    cli = _store(tmp_path, shared=shared)
+    assert cli.refresh(YESTERDAY, [ws])["total"] == _expected(ws, YESTERDAY)["total"]
+    assert shared.get_json(SHARED_STATE_KEY) == published
+
+    replica_a.invalidate()
+    replica_b = _store(tmp_path, shared=shared)
+    assert replica_b.refresh(TODAY, [ws])["total"] == today["total"]
+
+
+def test_day_rollover_keeps_high_water_mark():
+    rows = make_log_rows(40, day=NOW, people=20)
+    ws = FakeWorksheet("Log", rows=rows[:20])
+    FakeSpreadsheet([ws])
+    live = [YESTERDAY]
+    store = RekapStore("test", live_day=lambda: live[0])
+    store.refresh(YESTERDAY, [ws])
+    reads = ws.calls["col_values"]
+
+    # lewat tengah malam, baris hari ini masuk setelah rekap kemarin
+    live[0] = TODAY
+    for r in rows[20:]:
+        ws.append_row(r)
+    rekap = store.refresh(TODAY, [ws])
+
+    # hari baru lanjut dari hwm kemarin, tanpa scan kolom A lagi
+    assert ws.calls["col_values"] == reads
+    assert rekap["total"] == _expected(ws, TODAY)["total"] > 0
@@ -0,0 +1,68 @@
+from absensi.roster import Roster, apply_roster_entry, header_columns
+
+ROSTER = Roster.from_values([
+    ["Nama", "No HP/WA", "Posisi"],
+    ["Budi Santoso", "081234567890", "Teknisi"],
+    ["Ani Wijaya", "081298765432", "Driver"],
+])
+
+
+def _autofill(entry):
+    return {k: entry[k] for k in ("key", "Nama", "No HP/WA", "Posisi")}
+
+
+def test_lookup_phone_matches_any_format():
+    assert ROSTER.lookup_phone("+62 812-3456-7890")["Nama"] == "Budi Santoso"
+    assert ROSTER.lookup_phone("0812345") is None
+
+
+def test_untouched_autofill_uses_roster_data():
+    budi = ROSTER.lookup_phone("081234567890")
+    got = apply_roster_entry("Budi Santoso", "+6281234567890", "Teknisi", budi, _autofill(budi))
+    assert got == ("Budi Santoso", "081234567890", "Teknisi")
+
+
+def test_manual_corrections_are_not_overwritten():
+    budi = ROSTER.lookup_phone("081234567890")
+    got = apply_roster_entry("Budi S. Santoso", "6281234567890", "Teknisi Lapangan", budi, _autofill(budi))
+    # nomor dinormalisasi, nama & posisi yang dikoreksi tetap
+    assert got == ("Budi S. Santoso", "081234567890", "Teknisi Lapangan")
+
+
+def test_colleague_phone_typo_keeps_typed_name():
+    # isi manual tanpa autofill, nomor salah ketik milik rekan
+    ani = ROSTER.lookup_phone("081298765432")
+    assert apply_roster_entry("Budi Santoso", "081298765432", "Teknisi", ani, None) == \
+        ("Budi Santoso", "081298765432", "Teknisi")
+
+    # autofill Budi lalu nomor diubah ke nomor Ani: nama Budi tidak diganti nama Ani
+    budi = ROSTER.lookup_phone("081234567890")
+    assert apply_roster_entry("Budi Santoso", "081298765432", "Teknisi", ani, _autofill(budi)) == \
+        ("Budi Santoso", "081298765432", "Teknisi")
+
+
+def test_phone_not_in_roster_is_kept():
+    assert apply_roster_entry("Cici", "0811111111", "Sales", None, None) == ("Cici", "0811111111", "Sales")
+
+
+def test_header_columns_match_whole_words():
+    # "Nama Karyawan" mengandung "wa" tapi bukan kolom HP
+    assert header_columns(["Nama Karyawan", "No HP", "Posisi"]) == {"Nama": 0, "No HP/WA": 1, "Posisi": 2}
+    assert header_columns(["No", "Nama", "No WA", "Jabatan"]) == {"Nama": 1, "No HP/WA": 2, "Posisi": 3}
+
+
+def test_header_columns_never_share_an_index():
+    cols = header_columns(["Nama / Jabatan", "Telp"])
+    assert len(set(cols.values())) == 3
+    assert cols["Nama"] == 0 and cols["No HP/WA"] == 1
+
+
+def test_roster_positions_are_canonical():
+    roster = Roster.from_values([
+        ["Nama Karyawan", "No WA", "Jabatan"],
+        ["Budi", "081234567890", "spv"],
+        ["Ani", "081298765432", " SUPERVISOR "],
+        ["Cici", "081211112222", "Teknisi-Lapangan"],
+    ])
+    assert roster.lookup_phone("081234567890")["Nama"] == "Budi"
+    assert [e["Posisi"] for e in roster.entries] == ["Supervisor", "Supervisor", "Teknisi Lapangan"]
@@ -0,0 +1,83 @@
+from absensi.config import Settings
+from absensi.core import Core
+from absensi.sheets import RowCursor
+from bench.fakes import LOG_HEADER, FakeSpreadsheet, FakeWorksheet, ensure_gspread, make_log_rows
+
+
+def _ws(n: int = 3) -> FakeWorksheet:
+    ws = FakeWorksheet("Log", rows=make_log_rows(n))
+    FakeSpreadsheet([ws])
+    return ws
+
+
+def _row(name: str):
+    return ["01-01-2026 07:00:00", name, "081200000000", "Teknisi", "-", f"/Absensi_Selfie/{name}.jpg"]
+
+
+def test_cursor_writes_next_empty_row():
+    ws = _ws(3)
+    cursor = RowCursor(n_cols=len(LOG_HEADER), verify_col=5)
+    assert cursor.append(ws, _row("A")) == 5
+    assert cursor.append(ws, _row("B")) == 6
+    assert ws.row_values(6)[1] == "B"
+
+
+def test_cursor_skips_rows_added_by_another_writer():
+    ws = _ws(3)
+    cursor = RowCursor(n_cols=len(LOG_HEADER), verify_col=5)
+    cursor.sync(ws)
+    # backfill CLI / edit manual menulis di baris yang ditunjuk pointer
+    ws.append_row(_row("Backfill 1"))
+    ws.append_row(_row("Backfill 2"))
+
+    row = cursor.append(ws, _row("Submit"))
+
+    assert row == 7
+    assert ws.row_values(5)[1] == "Backfill 1"
+    assert ws.row_values(6)[1] == "Backfill 2"
+    assert ws.row_values(7)[1] == "Submit"
+    assert cursor.occupied == 1
+    assert cursor.next_row == 8
+
+
+def test_row_write_defaults_to_server_append(tmp_path):
+    assert Core({}, Settings({}), base_dir=str(tmp_path)).server_append()
+    assert not Core({}, Settings({"row_write": "cursor"}), base_dir=str(tmp_path)).server_append()
+    # auto: cursor hanya untuk 1 replica
+    assert not Core({}, Settings({"row_write": "auto"}), base_dir=str(tmp_path)).server_append()
+    shared = Settings({"row_write": "auto", "shared_cache": "sqlite:///shared.sqlite3"})
+    assert Core({}, shared, base_dir=str(tmp_path)).server_append()
+
+
+def test_cursor_rewrites_below_a_row_taken_between_check_and_write():
+    ws = _ws(3)
+    cursor = RowCursor(n_cols=len(LOG_HEADER), verify_col=5)
+    cursor.sync(ws)
+    real_update = ws.update
+
+    def racing_update(rng, values=None, **kw):
+        real_update(rng, values, **kw)
+        if rng.startswith("A5:"):
+            # penulis lain menimpa baris 5 tepat setelah tulis kita
+            real_update("A5:F5", [_row("Lain")])
+
+    ws.update = racing_update
+    assert cursor.append(ws, _row("Submit")) == 6
+    assert ws.row_values(5)[1] == "Lain"
+    assert cursor.overwritten == 1
+
+
+def test_new_tab_starts_small_and_cursor_grows_it(tmp_path):
+    ensure_gspread()
+    core = Core({}, Settings({}), base_dir=str(tmp_path))
+    sh = FakeSpreadsheet([])
+    ws = core.get_or_create_ws(sh, "Log")
+    assert ws.row_count == core.settings.sheet_rows < 1000
+
+    grown = []
+    cursor = RowCursor(n_cols=len(LOG_HEADER), verify_col=5, grow_rows=500, grow_margin=10,
+                       on_grow=lambda w, a, b: grown.append((a, b)))
+    ws.update("A2", [_row(f"P{i}") for i in range(ws.row_count - 5)])
+    cursor.append(ws, _row("Submit"))
+    assert grown == [(core.settings.sheet_rows + 1, core.settings.sheet_rows + 500)]
+    assert ws.row_count == core.settings.sheet_rows + 500
@@ -0,0 +1,48 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+from absensi.storage import SqliteStorage
+
+NOW = datetime(2026, 1, 9, 8, 0, 0)
+
+
+def _row(i, when=NOW):
+    ts = when.strftime("%d-%m-%Y %H:%M:%S")
+    return [ts, f"Orang {i}", f"0812{i:04d}", "Staff", "-", f"/Absensi_Selfie/orang_{i}.jpg"]
+
+
+def test_has_path_uses_day_and_path(tmp_path):
+    store = SqliteStorage(str(tmp_path / "log.sqlite3"), str(tmp_path / "foto"))
+    store.append_row(NOW, _row(1))
+    assert store.has_path(NOW, "/Absensi_Selfie/orang_1.jpg")
+    assert not store.has_path(NOW, "/Absensi_Selfie/orang_2.jpg")
+    assert not store.has_path(NOW + timedelta(days=1), "/Absensi_Selfie/orang_1.jpg")
+    plan = store._conn().execute(
+        "EXPLAIN QUERY PLAN SELECT 1 FROM log WHERE day = ? AND path = ? LIMIT 1", ("2026-01-09", "x")
+    ).fetchall()
+    assert any("log_path" in str(r[-1]) for r in plan)
+
+
+def test_old_file_with_dedup_key_is_migrated(tmp_path):
+    db = str(tmp_path / "log.sqlite3")
+    with sqlite3.connect(db) as conn:
+        conn.executescript("""
+        CREATE TABLE log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, ts TEXT NOT NULL, day TEXT NOT NULL,
+            nama TEXT NOT NULL, hp TEXT NOT NULL, posisi TEXT NOT NULL,
+            link TEXT NOT NULL, path TEXT NOT NULL, dedup_key TEXT NOT NULL
+        );
+        CREATE INDEX log_dedup ON log (day, dedup_key);
+        """)
+        conn.execute(
+            "INSERT INTO log (ts, day, nama, hp, posisi, link, path, dedup_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            ("09-01-2026 07:00:00", "2026-01-09", "Lama", "08120000", "Staff", "-", "/lama.jpg", "08120000"),
+        )
+    conn.close()
+
+    store = SqliteStorage(db, str(tmp_path / "foto"))
+    cols = {r[1] for r in store._conn().execute("PRAGMA table_info(log)")}
+    assert "dedup_key" not in cols
+    store.append_row(NOW, _row(1))
+    assert [r[2] for r in store.read_rows()] == ["Lama", "Orang 1"]
+    assert store.has_path(NOW, "/lama.jpg")
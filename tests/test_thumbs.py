@@ -0,0 +1,23 @@
+from absensi import thumbs
+from absensi.thumbs import ThumbCache
+
+
+def test_misses_are_capped(tmp_path):
+    cache = ThumbCache(str(tmp_path), max_misses=3)
+    for i in range(10):
+        cache.note_miss(f"/Absensi_Selfie/F{i}.jpg")
+    assert cache.stats()["misses"] == 3
+    assert cache.recently_missed("/absensi_selfie/f9.jpg")
+    assert not cache.recently_missed("/Absensi_Selfie/F0.jpg")
+
+
+def test_expired_misses_are_pruned_on_insert(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(thumbs.time, "monotonic", lambda: now[0])
+    cache = ThumbCache(str(tmp_path))
+    for i in range(5):
+        cache.note_miss(f"/a/{i}.jpg")
+    now[0] += thumbs.MISS_TTL + 1
+    cache.note_miss("/a/baru.jpg")
+    assert cache.stats()["misses"] == 1
+    assert cache.recently_missed("/a/baru.jpg")